@@ -7,7 +7,7 @@ a = Analysis(
         ('E:\\PyCharmProjects\\WP快通\\src', 'src')
     ],
     # 核心保留：兜底防止漏装src模块，无模块报错的关键
-    hiddenimports=['src', 'src.main_window'],
+    hiddenimports=['src', 'src.main_window', 'src.utils.log_utils', 'src.utils.history'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
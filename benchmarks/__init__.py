@@ -0,0 +1,22 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+性能基准测试
+
+    python -m benchmarks generate --output corpus --docs 20 --pages 10
+    python -m benchmarks run --corpus corpus --output results.json
+    python -m benchmarks compare baseline.json results.json --threshold 0.1
+"""
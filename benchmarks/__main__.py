@@ -0,0 +1,95 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from .corpus import CONTENT_TYPES, FONT_MODES, generate_corpus
+from .runner import compare_results, run_benchmarks, save_results
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="WP快通 性能基准测试")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="生成测试语料库")
+    gen.add_argument("--output", type=Path, default=Path("corpus"))
+    gen.add_argument("--docs", type=int, default=10)
+    gen.add_argument("--pages", type=int, default=5)
+    gen.add_argument("--content", choices=CONTENT_TYPES, default="text")
+    gen.add_argument("--fonts", choices=FONT_MODES, default="shared")
+    gen.add_argument("--formats", nargs="+", choices=["pdf", "docx"], default=["pdf", "docx"])
+    gen.add_argument("--seed", type=int, default=2026)
+    gen.add_argument("--images", type=int, default=10, help="图片转文档测试用的图片张数")
+
+    run = sub.add_parser("run", help="运行基准测试")
+    run.add_argument("--corpus", type=Path, default=Path("corpus"))
+    run.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--warmup", type=int, default=1)
+    run.add_argument("--only", nargs="*", help="只运行指定前缀的测试，如 pdf. word.merge")
+
+    cmp = sub.add_parser("compare", help="对比两次结果")
+    cmp.add_argument("baseline", type=Path)
+    cmp.add_argument("current", type=Path)
+    cmp.add_argument("--threshold", type=float, default=0.10, help="变慢超过该比例视为回退（默认 0.10）")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        manifest = generate_corpus(args.output, args.docs, args.pages, args.content,
+                                   args.fonts, args.formats, args.seed, args.images)
+        print(f"已生成 {len(manifest['files'])} 个文件到: {args.output}")
+        return 0
+
+    if args.command == "run":
+        if not (args.corpus / "manifest.json").exists():
+            print(f"语料库不存在: {args.corpus}，请先运行 generate")
+            return 1
+        results = run_benchmarks(args.corpus, args.repeat, args.warmup, args.only)
+        save_results(results, args.output)
+        print(f"结果已保存: {args.output}")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, "r", encoding="utf-8") as f:
+        current = json.load(f)
+
+    rows = compare_results(baseline, current, args.threshold)
+    labels = {"missing": "本次缺失", "failed": "本次失败", "skipped": "本次跳过"}
+    for row in rows:
+        if row["current"] is None:
+            print(f"{row['name']:32s} {row['baseline'] * 1000:9.2f} ms -> {labels[row['status']]:>10s}  回退")
+            continue
+        flag = "回退" if row["regression"] else "正常"
+        print(f"{row['name']:32s} {row['baseline'] * 1000:9.2f} ms -> {row['current'] * 1000:9.2f} ms "
+              f"{row['change']:+7.1%}  {flag}")
+
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n{len(regressions)} 项回退（超过阈值 {args.threshold:.0%}，或本次失败、缺失）")
+        return 1
+    print("\n没有发现性能回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import io
+import json
+import random
+from pathlib import Path
+from typing import List
+
+import docx
+from docx.shared import Inches, Pt
+from PIL import Image
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+# reportlab 自带的 TrueType 字体（字体名 -> 文件），会嵌入到PDF中；"unique" 模式下每个文档轮流使用。
+# 标准14字体不嵌入，无法体现共享字体与各自字体的差别。
+EMBEDDED_FONTS = {
+    "Vera": "Vera.ttf",
+    "Vera-Bold": "VeraBd.ttf",
+    "Vera-Italic": "VeraIt.ttf",
+    "Vera-BoldItalic": "VeraBI.ttf",
+}
+FONT_NAMES = list(EMBEDDED_FONTS)
+
+WORDS = (
+    "document merge split convert page paragraph report thesis cover signature "
+    "student teacher chapter section figure table appendix reference abstract "
+    "method result analysis conclusion summary draft final version review"
+).split()
+
+CONTENT_TYPES = ("text", "image")
+FONT_MODES = ("shared", "unique")
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    """生成一句确定性的伪随机文本"""
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _image_bytes(rng: random.Random, width: int, height: int, fmt: str = "JPEG") -> bytes:
+    """生成确定性的噪声图片（模拟拍照扫描页）"""
+    img = Image.frombytes("RGB", (width, height), rng.randbytes(width * height * 3))
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, quality=85)
+    return buffer.getvalue()
+
+
+def _register_font(font: str):
+    """注册要嵌入的 TrueType 字体（只注册一次）"""
+    if font not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(font, EMBEDDED_FONTS[font]))
+
+
+def make_pdf(path: Path, rng: random.Random, pages: int, content: str, font: str):
+    """生成PDF文档（字体子集嵌入文档）"""
+    _register_font(font)
+    c = canvas.Canvas(str(path), pagesize=A4, invariant=1, initialFontName=font)
+    width, height = A4
+    for page in range(pages):
+        if content == "image":
+            image = ImageReader(io.BytesIO(_image_bytes(rng, 640, 880)))
+            c.drawImage(image, 40, 60, width=width - 80, height=height - 120)
+            c.setFont(font, 10)
+            c.drawString(40, 30, f"Page {page + 1}")
+        else:
+            c.setFont(font, 11)
+            y = height - 60
+            while y > 60:
+                c.drawString(40, y, _sentence(rng))
+                y -= 16
+        c.showPage()
+    c.save()
+
+
+def make_docx(path: Path, rng: random.Random, pages: int, content: str, font: str):
+    """生成Word文档（每页以分页符结束）"""
+    doc = docx.Document()
+    for page in range(pages):
+        if content == "image":
+            doc.add_picture(io.BytesIO(_image_bytes(rng, 640, 880)), width=Inches(5.5))
+            doc.add_paragraph(f"Page {page + 1}")
+        else:
+            for _ in range(30):
+                run = doc.add_paragraph().add_run(_sentence(rng))
+                run.font.name = font
+                run.font.size = Pt(11)
+        if page < pages - 1:
+            doc.add_page_break()
+    doc.save(path)
+
+
+def generate_corpus(output_dir: Path, docs: int = 10, pages: int = 5, content: str = "text",
+                    fonts: str = "shared", formats: List[str] = ("pdf", "docx"), seed: int = 2026,
+                    images: int = 10) -> dict:
+    """生成测试语料库，返回清单（同时写入 manifest.json）
+
+    images 为图片转文档测试用的 JPEG 张数（模拟拍照的签字页）。
+    """
+    if content not in CONTENT_TYPES:
+        raise ValueError(f"content 只能是 {CONTENT_TYPES}")
+    if fonts not in FONT_MODES:
+        raise ValueError(f"fonts 只能是 {FONT_MODES}")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        "seed": seed, "docs": docs, "pages": pages,
+        "content": content, "fonts": fonts, "files": [], "images": [],
+    }
+
+    for fmt in formats:
+        # 每种格式使用独立的随机序列，保证只生成一种格式时结果也相同
+        rng = random.Random(f"{seed}-{fmt}")
+        for i in range(docs):
+            font = FONT_NAMES[i % len(FONT_NAMES)] if fonts == "unique" else FONT_NAMES[0]
+            path = output_dir / f"{fmt}_{i:04d}.{fmt}"
+            if fmt == "pdf":
+                make_pdf(path, rng, pages, content, font)
+            elif fmt == "docx":
+                make_docx(path, rng, pages, content, font)
+            else:
+                raise ValueError(f"不支持的格式: {fmt}")
+            manifest["files"].append({
+                "path": path.name, "format": fmt, "pages": pages,
+                "font": font, "size": path.stat().st_size,
+            })
+
+    rng = random.Random(f"{seed}-image")
+    for i in range(images):
+        path = output_dir / f"image_{i:04d}.jpg"
+        path.write_bytes(_image_bytes(rng, 1240, 1754))
+        manifest["images"].append({"path": path.name, "size": path.stat().st_size})
+
+    with open(output_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    return manifest
+
+
+def load_manifest(corpus_dir: Path) -> dict:
+    """读取语料库清单"""
+    with open(corpus_dir / "manifest.json", "r", encoding="utf-8") as f:
+        return json.load(f)
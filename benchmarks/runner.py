@@ -0,0 +1,285 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import logging
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.core import Converter, PDFHandler, WordHandler
+
+from .corpus import load_manifest
+
+
+class Benchmark:
+    """单个基准测试：setup 准备本轮输入，func 是被计时的操作"""
+
+    def __init__(self, name: str, func: Callable, setup: Optional[Callable] = None,
+                 units: float = 1, unit: str = "files", nbytes: int = 0, available: bool = True):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.units = units
+        self.unit = unit
+        self.nbytes = nbytes
+        self.available = available
+
+
+def _measure(bench: Benchmark, work_dir: Path, repeat: int, warmup: int) -> dict:
+    """运行一个基准测试并统计延迟与吞吐量"""
+    if not bench.available:
+        return {"skipped": True}
+
+    timings = []
+    for i in range(warmup + repeat):
+        run_dir = work_dir / f"{bench.name}_{i}"
+        run_dir.mkdir(parents=True)
+        args = bench.setup(run_dir) if bench.setup else (run_dir,)
+
+        started = time.perf_counter()
+        ok = bench.func(*args)
+        elapsed = time.perf_counter() - started
+
+        shutil.rmtree(run_dir, ignore_errors=True)
+        if not ok:
+            return {"failed": True}
+        if i >= warmup:
+            timings.append(elapsed)
+
+    timings.sort()
+    median = statistics.median(timings)
+    return {
+        "repeat": repeat,
+        "mean": statistics.fmean(timings),
+        "median": median,
+        "min": timings[0],
+        "max": timings[-1],
+        "p95": timings[max(0, int(round(len(timings) * 0.95)) - 1)],
+        "throughput": bench.units / median if median else 0.0,
+        "unit": f"{bench.unit}/s",
+        "mb_per_s": bench.nbytes / median / 1e6 if median and bench.nbytes else 0.0,
+    }
+
+
+def build_benchmarks(corpus_dir: Path) -> List[Benchmark]:
+    """为每个处理器操作构建基准测试"""
+    manifest = load_manifest(corpus_dir)
+    files = {"pdf": [], "docx": []}
+    for entry in manifest["files"]:
+        files[entry["format"]].append(corpus_dir / entry["path"])
+
+    pages = manifest["pages"]
+    # 旧版语料库没有图片，相关测试记录为跳过
+    images = [corpus_dir / entry["path"] for entry in manifest.get("images", [])]
+    image_bytes = sum(p.stat().st_size for p in images)
+    on_windows = sys.platform.startswith('win')
+    converter = Converter()
+    benchmarks = []
+
+    for fmt, handler in (("docx", WordHandler()), ("pdf", PDFHandler())):
+        prefix = "word" if fmt == "docx" else "pdf"
+        sources = files[fmt]
+        available = bool(sources)
+        total_bytes = sum(p.stat().st_size for p in sources)
+        first = sources[0] if sources else None
+        first_bytes = first.stat().st_size if first else 0
+
+        def copy_first(run_dir, first=first):
+            target = run_dir / first.name
+            shutil.copyfile(first, target)
+            return target
+
+        benchmarks += [
+            Benchmark(f"{prefix}.create_single_file",
+                      lambda run_dir, h=handler: h.create_single_file("bench", run_dir)),
+            Benchmark(f"{prefix}.create_multiple",
+                      lambda run_dir, h=handler: h.create_multiple(20, "bench", run_dir), units=20),
+            Benchmark(f"{prefix}.merge_files",
+                      lambda run_dir, h=handler, s=sources: h.merge_files(s, run_dir / f"merged{h.file_ext}"),
+                      units=len(sources) * pages, unit="pages", nbytes=total_bytes, available=available),
+            Benchmark(f"{prefix}.split_file",
+                      lambda run_dir, h=handler, f=first: h.split_file(f, max(1, pages // 2), run_dir),
+                      units=pages, unit="pages", nbytes=first_bytes, available=available),
+            Benchmark(f"{prefix}.move_file",
+                      lambda source, target, h=handler: h.move_file(source, target),
+                      setup=lambda run_dir, c=copy_first: (c(run_dir), run_dir / "moved"),
+                      nbytes=first_bytes, available=available),
+        ]
+
+    if files["pdf"]:
+        benchmarks.append(Benchmark(
+            "pdf.optimize",
+            lambda run_dir, f=files["pdf"][0]: bool(PDFHandler().optimize(f, run_dir / "optimized.pdf")),
+            units=pages, unit="pages", nbytes=files["pdf"][0].stat().st_size))
+
+    benchmarks += _extra_benchmarks(files, images, image_bytes, pages)
+
+    # 格式转换依赖 Windows 上的 Word，其他平台记录为跳过
+    if files["docx"]:
+        benchmarks.append(Benchmark(
+            "converter.word_to_pdf",
+            lambda run_dir, f=files["docx"][0]: converter.word_to_pdf(f, run_dir / "converted.pdf"),
+            units=pages, unit="pages", available=on_windows))
+    if files["pdf"]:
+        benchmarks.append(Benchmark(
+            "converter.pdf_to_word",
+            lambda run_dir, f=files["pdf"][0]: converter.pdf_to_word(f, run_dir / "converted.docx"),
+            units=pages, unit="pages", available=on_windows))
+
+    return benchmarks
+
+
+def _copy_all(run_dir: Path, sources: List[Path]) -> List[Path]:
+    """把输入复制到本轮目录（会被原地修改或移走的操作使用）"""
+    targets = []
+    for source in sources:
+        target = run_dir / source.name
+        shutil.copyfile(source, target)
+        targets.append(target)
+    return targets
+
+
+def _extra_benchmarks(files: Dict[str, List[Path]], images: List[Path], image_bytes: int,
+                      pages: int) -> List[Benchmark]:
+    """图片转文档、盖章、元数据、页面变换、批量移动和批量转换的基准测试"""
+    pdf_handler, word_handler = PDFHandler(), WordHandler()
+    pdfs, docxs = files["pdf"], files["docx"]
+    all_files = pdfs + docxs
+    pdf_bytes = sum(p.stat().st_size for p in pdfs)
+    first_pdf = pdfs[0] if pdfs else None
+    first_docx = docxs[0] if docxs else None
+
+    return [
+        Benchmark("pdf.images_to_pdf",
+                  lambda run_dir, s=images: pdf_handler.images_to_pdf(s, run_dir / "images.pdf"),
+                  units=len(images), unit="images", nbytes=image_bytes, available=bool(images)),
+        Benchmark("word.images_to_docx",
+                  lambda run_dir, s=images: word_handler.images_to_docx(s, run_dir / "images.docx"),
+                  units=len(images), unit="images", nbytes=image_bytes, available=bool(images)),
+        Benchmark("word.insert_images",
+                  lambda run_dir, s=images: word_handler.insert_images(
+                      first_docx, s, run_dir / "inserted.docx"),
+                  units=len(images), unit="images", nbytes=image_bytes,
+                  available=bool(images) and first_docx is not None),
+        Benchmark("pdf.stamp",
+                  lambda run_dir, s=pdfs: len(pdf_handler.stamp(s, run_dir, text="DRAFT")) == len(s),
+                  units=len(pdfs) * pages, unit="pages", nbytes=pdf_bytes, available=bool(pdfs)),
+        Benchmark("pdf.set_metadata",
+                  lambda targets: all(r.ok for r in pdf_handler.set_metadata(
+                      targets, lambda p: {"Title": p.stem, "Author": "bench"})),
+                  setup=lambda run_dir, s=pdfs: (_copy_all(run_dir, s),),
+                  units=len(pdfs), nbytes=pdf_bytes, available=bool(pdfs)),
+        Benchmark("pdf.transform",
+                  lambda run_dir, f=first_pdf: pdf_handler.transform(f).rotate(90).crop(36, 36, 36, 36)
+                  .reorder(list(range(pages, 0, -1))).write(run_dir / "transformed.pdf"),
+                  units=pages, unit="pages", nbytes=first_pdf.stat().st_size if first_pdf else 0,
+                  available=first_pdf is not None),
+        Benchmark("base.move_files",
+                  lambda pairs: all(r.ok for r in pdf_handler.move_files(pairs)),
+                  setup=lambda run_dir, s=all_files: (
+                      [(p, run_dir / "moved" / p.name) for p in _copy_all(run_dir, s)],),
+                  units=len(all_files), available=bool(all_files)),
+        # 格式转换依赖 Windows 上的 Word，其他平台记录为跳过
+        Benchmark("converter.convert_batch",
+                  lambda run_dir, s=all_files: len(Converter().convert_batch(s, run_dir)) == len(s),
+                  units=len(all_files), available=bool(all_files) and sys.platform.startswith('win')),
+    ]
+
+
+def run_benchmarks(corpus_dir: Path, repeat: int = 5, warmup: int = 1,
+                   only: Optional[List[str]] = None) -> dict:
+    """运行全部（或指定前缀的）基准测试"""
+    # 处理器在每次操作后都会写一条 INFO 日志，测试期间只保留警告以上
+    logging.getLogger("WP_Express").setLevel(logging.WARNING)
+
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="wp_express_bench_") as temp_dir:
+        for bench in build_benchmarks(corpus_dir):
+            if only and not any(bench.name.startswith(prefix) for prefix in only):
+                continue
+            results[bench.name] = _measure(bench, Path(temp_dir), repeat, warmup)
+            print(f"{bench.name:32s} {_format_result(results[bench.name])}")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": load_manifest(corpus_dir),
+        },
+        "results": results,
+    }
+
+
+def _format_result(result: dict) -> str:
+    """格式化单条结果"""
+    if result.get("skipped"):
+        return "跳过（当前平台不支持）"
+    if result.get("failed"):
+        return "失败"
+    return f"median {result['median'] * 1000:9.2f} ms  {result['throughput']:10.2f} {result['unit']}"
+
+
+def save_results(results: dict, output_path: Path):
+    """保存结果为JSON"""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.10) -> List[dict]:
+    """对比两次结果，返回每个测试的变化
+
+    median 变慢超过阈值视为回退；基线中成功的测试在本次失败或消失也视为回退（status 说明原因）。
+    """
+    rows = []
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if "median" not in base:
+            continue
+        if cur is None or "median" not in cur:
+            if cur is None:
+                status = "missing"
+            elif cur.get("skipped"):
+                status = "skipped"
+            else:
+                status = "failed"
+            rows.append({
+                "name": name,
+                "baseline": base["median"],
+                "current": None,
+                "change": None,
+                "regression": True,
+                "status": status,
+            })
+            continue
+        change = (cur["median"] - base["median"]) / base["median"] if base["median"] else 0.0
+        rows.append({
+            "name": name,
+            "baseline": base["median"],
+            "current": cur["median"],
+            "change": change,
+            "regression": change > threshold,
+            "status": "ok",
+        })
+    return rows
@@ -15,54 +15,189 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import atexit
+import copy
 import json
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_CONFIG = {
+    "version": "1.1.0.2026217",
+    "window": {
+        "width": 1200,
+        "height": 700,
+        "maximized": False
+    },
+    "paths": {
+        "default_save": str(Path.home() / "Desktop")
+    },
+    "options": {
+        "auto_save": True,
+        "show_tooltips": True,
+        # 任务历史保留天数，启动时删除更早的记录，0 表示不删除
+        "history_days": 180
+    },
+    "logging": {
+        "level": "INFO",
+        "json": False,
+        "max_bytes": 10 * 1024 * 1024,
+        "backup_count": 5,
+        "rotate_when": "midnight",
+        "levels": {}
+    },
+    "performance": {
+        # 各类操作的并发数，0 表示使用程序内置的默认值
+        "workers": {
+            "default": 0,
+            "server": 0,
+            "transfer": 8,
+            "validate": 8,
+            "scan": 1,
+            "pdf": 0,
+            "image": 0,
+            "index": 0,
+            "preview": 2,
+            "metadata": 8
+        },
+        # 服务进程池的内存预算（MB），任务峰值内存超过后重建工作进程，0 表示不限制
+        "max_rss_mb": 0,
+        "server_queue_size": 32,
+        "io_buffer_size": 1024 * 1024,
+        "fsync_every": 64,
+        "cache": {
+            "directory_index_dirs": 256,
+            "page_fingerprint_bytes": 64 * 1024 * 1024,
+            "thumbnail_bytes": 256 * 1024 * 1024
+        },
+        "compression_level": 6
+    }
+}
+
+
+def _deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """递归合并配置：用户配置覆盖默认值，缺少的子项保留默认值"""
+    result = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = _deep_merge(result[key], value)
+        else:
+            result[key] = copy.deepcopy(value)
+    return result
 
 
 class Config:
     """配置类"""
 
-    def __init__(self, config_path: Path = None):
+    def __init__(self, config_path: Path = None, save_delay: float = 0.5, reload_interval: float = 1.0):
         self.config_path = config_path or Path.home() / ".WP_Express" / "config.json"
+        self.save_delay = save_delay
+        self.reload_interval = reload_interval
+        self._lock = threading.RLock()
+        self._mtime_ns = None
+        self._checked_at = time.monotonic()
+        self._save_timer: Optional[threading.Timer] = None
+        self._dirty = False
+        self._listeners: List[Callable[["Config"], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
         self.config = self._load_config()
 
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            return None
+
     def _load_config(self) -> Dict[str, Any]:
         """加载配置"""
-        default_config = {
-            "version": "1.1.0.2026217",
-            "window": {
-                "width": 1200,
-                "height": 700,
-                "maximized": False
-            },
-            "paths": {
-                "default_save": str(Path.home() / "Desktop"),
-                "recent_files": []
-            },
-            "options": {
-                "auto_save": True,
-                "show_tooltips": True
-            }
-        }
-
-        if self.config_path.exists():
+        self._mtime_ns = self._file_mtime()
+        if self._mtime_ns is not None:
             try:
                 with open(self.config_path, 'r', encoding='utf-8') as f:
-                    return {**default_config, **json.load(f)}
+                    return _deep_merge(DEFAULT_CONFIG, json.load(f))
             except:
-                return default_config
+                return copy.deepcopy(DEFAULT_CONFIG)
         else:
-            return default_config
+            return copy.deepcopy(DEFAULT_CONFIG)
+
+    def reload_if_changed(self) -> bool:
+        """配置文件被外部修改时重新加载并通知监听者；有尚未保存的修改时以内存为准"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if self._dirty or self._file_mtime() == self._mtime_ns:
+                return False
+            self.config = self._load_config()
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(self)
+            except Exception:
+                pass
+        return True
+
+    def add_listener(self, listener: Callable[["Config"], None]):
+        """配置重新加载后调用 listener(config)"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[["Config"], None]):
+        """移除监听者"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def start_watching(self, interval: float = 2.0):
+        """启动后台线程定期检查配置文件（长时间运行的进程使用）"""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._stop_watching.clear()
+            self._watcher = threading.Thread(target=self._watch, args=(interval,),
+                                             name="ConfigWatcher", daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        """停止后台检查"""
+        self._stop_watching.set()
+        with self._lock:
+            watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.join()
+
+    def _watch(self, interval: float):
+        while not self._stop_watching.wait(interval):
+            self.reload_if_changed()
 
     def save(self):
-        """保存配置"""
-        self.config_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.config_path, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=2, ensure_ascii=False)
+        """保存配置（立即写入，先写临时文件再替换）"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            self.config_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.config_path.with_name(self.config_path.name + ".tmp")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, self.config_path)
+            # 自己写入的修改不触发重新加载
+            self._mtime_ns = self._file_mtime()
+            self._dirty = False
+
+    def flush(self):
+        """立即写入尚未保存的修改"""
+        with self._lock:
+            if self._dirty:
+                self.save()
 
     def get(self, key: str, default=None) -> Any:
         """获取配置值"""
+        if time.monotonic() - self._checked_at >= self.reload_interval:
+            self.reload_if_changed()
+
         keys = key.split('.')
         value = self.config
 
@@ -75,17 +210,22 @@ class Config:
         return value
 
     def set(self, key: str, value: Any):
-        """设置配置值"""
+        """设置配置值（短时间内的多次修改合并为一次写入）"""
         keys = key.split('.')
-        config = self.config
+        with self._lock:
+            config = self.config
 
-        for k in keys[:-1]:
-            if k not in config:
-                config[k] = {}
-            config = config[k]
+            for k in keys[:-1]:
+                if k not in config:
+                    config[k] = {}
+                config = config[k]
 
-        config[keys[-1]] = value
-        self.save()
+            config[keys[-1]] = value
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
 
 
 # 全局配置实例
@@ -97,4 +237,5 @@ def get_config():
     global _config_instance
     if _config_instance is None:
         _config_instance = Config()
+        atexit.register(_config_instance.flush)
     return _config_instance
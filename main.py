@@ -15,6 +15,7 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import multiprocessing
 import sys
 import traceback
 from pathlib import Path
@@ -98,15 +99,30 @@ def setup_logging(root_dir=None):
     # 确保日志文件的目录存在
     log_file.parent.mkdir(parents=True, exist_ok=True)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
-            logging.StreamHandler() if not getattr(sys, 'frozen', False) else logging.NullHandler()
-        ]
+    from config import get_config
+    from src.utils.log_utils import apply_levels, setup_queue_logging
+
+    # 日志写入由后台线程完成，处理器线程只负责入队
+    options = get_config().get("logging", {})
+    setup_queue_logging(
+        log_file,
+        console=not getattr(sys, 'frozen', False),
+        level=options.get("level", "INFO"),
+        json_format=options.get("json", False),
+        max_bytes=options.get("max_bytes", 10 * 1024 * 1024),
+        backup_count=options.get("backup_count", 5),
+        rotate_when=options.get("rotate_when", "midnight"),
+        levels=options.get("levels"),
     )
 
+    # 配置文件修改后更新日志级别，无需重启
+    def on_config_change(config):
+        logging.getLogger().setLevel(str(config.get("logging.level", "INFO")).upper())
+        apply_levels(config.get("logging.levels"))
+
+    get_config().add_listener(on_config_change)
+    get_config().start_watching()
+
     return logging.getLogger("WP_Express")
 
 
@@ -257,6 +273,9 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后的程序中，进程池的工作进程（spawn）会重新执行本文件，必须先交给 multiprocessing 处理
+    multiprocessing.freeze_support()
+
     # 确保UTF-8编码
     if sys.platform.startswith('win'):
         try:
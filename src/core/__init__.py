@@ -18,6 +18,8 @@ limitations under the License.
 from .base import BaseHandler
 from .converter import Converter
 from .pdf_handler import PDFHandler
+from .pipeline import PDFPipeline, WordPipeline
+from .search_index import SearchIndex
 from .word_handler import WordHandler
 
-__all__ = ['BaseHandler', 'WordHandler', 'PDFHandler', 'Converter']
+__all__ = ['BaseHandler', 'WordHandler', 'PDFHandler', 'Converter', 'PDFPipeline', 'WordPipeline', 'SearchIndex']
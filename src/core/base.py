@@ -17,7 +17,12 @@ limitations under the License.
 
 import logging
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
+
+from .near_duplicates import HAVE_NUMPY, skip_near_duplicates
+from ..utils.file_utils import TransferResult, bulk_transfer
+from ..utils.metrics import count_items, count_read, count_written, current_record, instrumented, stage
+from ..utils.validator import FILE_TYPES, PathCheck, validate_paths
 
 
 class BaseHandler:
@@ -40,6 +45,29 @@ class BaseHandler:
             self.logger.error(f"路径验证失败: {e}")
             return False
 
+    def validate_inputs(self, paths: Iterable[Path]) -> List[PathCheck]:
+        """批量验证输入文件：存在、是文件且内容确实是本处理器的格式"""
+        with stage("validate"):
+            return validate_paths(paths, expected_type=FILE_TYPES.get(self.file_ext))
+
+    def check_inputs(self, paths: Iterable[Path]) -> bool:
+        """验证输入文件，记录所有不合格的文件"""
+        failed = [check for check in self.validate_inputs(paths) if not check.ok]
+        for check in failed:
+            self.logger.error(f"输入文件无效: {check.path}（{check.message}）")
+        return not failed
+
+    def drop_duplicates(self, paths: List[Path]) -> List[Path]:
+        """去掉内容相近的重复文档（保留先出现的）；numpy 未安装时不去重"""
+        if not HAVE_NUMPY:
+            self.logger.warning("numpy 未安装，跳过重复文档检测")
+            return list(paths)
+        with stage("fingerprint"):
+            kept, skipped = skip_near_duplicates(paths)
+        for path in skipped:
+            self.logger.info(f"跳过重复文档: {path}")
+        return kept
+
     def create_single_file(self, file_name: str, save_path: Optional[Path] = None) -> bool:
         """创建单个文件 - 子类实现"""
         raise NotImplementedError
@@ -48,7 +76,7 @@ class BaseHandler:
         """批量创建文件 - 子类实现"""
         raise NotImplementedError
 
-    def merge_files(self, source_files: List[Path], output_path: Path) -> bool:
+    def merge_files(self, source_files: List[Path], output_path: Path, skip_duplicates: bool = False) -> bool:
         """合并文件 - 子类实现"""
         raise NotImplementedError
 
@@ -56,13 +84,35 @@ class BaseHandler:
         """拆分文件 - 子类实现"""
         raise NotImplementedError
 
+    @instrumented("file.move_file")
     def move_file(self, source_path: Path, target_path: Path) -> bool:
         """移动文件"""
         try:
             import shutil
-            shutil.move(str(source_path), str(target_path))
+            count_read(source_path)
+            with stage("move"):
+                shutil.move(str(source_path), str(target_path))
+            count_written(target_path)
             self.logger.info(f"文件移动: {source_path} -> {target_path}")
             return True
         except Exception as e:
             self.logger.error(f"文件移动失败: {e}")
             return False
+
+    @instrumented("file.move_files")
+    def move_files(self, pairs: Iterable[Tuple[Path, Path]], workers: Optional[int] = None) -> List[TransferResult]:
+        """批量移动文件，返回每个文件的结果"""
+        with stage("move"):
+            results = bulk_transfer(pairs, move=True, workers=workers)
+
+        moved = [r for r in results if r.ok]
+        count_items(len(moved))
+        record = current_record()
+        if record is not None:
+            record.bytes_written += sum(r.size for r in moved)
+
+        failed = len(results) - len(moved)
+        if failed:
+            self.logger.error(f"批量移动失败 {failed} 个文件")
+        self.logger.info(f"批量移动 {len(moved)} 个文件")
+        return results
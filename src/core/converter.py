@@ -17,7 +17,12 @@ limitations under the License.
 
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
+
+from .near_duplicates import HAVE_NUMPY, skip_near_duplicates
+from ..utils.file_utils import get_directory_index, reserve_filenames
+from ..utils.metrics import count_items, count_read, count_written, instrumented, stage
+from ..utils.output_writer import replace_atomically, temp_path_for
 
 
 class Converter:
@@ -32,6 +37,7 @@ class Converter:
         import logging
         self.logger = logging.getLogger("WP_Express")
 
+    @instrumented("convert.word_to_pdf")
     def word_to_pdf(self, source_path: Path, output_path: Optional[Path] = None) -> bool:
         """Word转PDF"""
         # 检查是否支持转换
@@ -58,13 +64,21 @@ class Converter:
             word_app.DisplayAlerts = 0
 
             # 打开Word文档
-            doc = word_app.Documents.Open(str(source_path))
+            count_read(source_path)
+            with stage("parse"):
+                doc = word_app.Documents.Open(str(source_path))
 
             # 保存为PDF
-            doc.SaveAs(str(output_path), FileFormat=17)  # 17 = wdFormatPDF
+            # 先保存到同目录临时文件，完成后再原子替换，避免留下不完整的输出
+            temp_path = temp_path_for(output_path)
+            with stage("serialize"):
+                doc.SaveAs(str(temp_path), FileFormat=17)  # 17 = wdFormatPDF
+            doc.Close()
+            replace_atomically(temp_path, output_path)
+            count_items(1)
+            count_written(output_path)
 
             # 清理
-            doc.Close()
             word_app.Quit()
             pythoncom.CoUninitialize()
 
@@ -79,6 +93,7 @@ class Converter:
                 pass
             return False
 
+    @instrumented("convert.pdf_to_word")
     def pdf_to_word(self, source_path: Path, output_path: Optional[Path] = None) -> bool:
         """PDF转Word"""
         # 检查是否支持转换
@@ -105,13 +120,21 @@ class Converter:
             word_app.DisplayAlerts = 0
 
             # 打开PDF文档
-            doc = word_app.Documents.Open(str(source_path))
+            count_read(source_path)
+            with stage("parse"):
+                doc = word_app.Documents.Open(str(source_path))
 
             # 保存为Word
-            doc.SaveAs(str(output_path), FileFormat=16)  # 16 = wdFormatDocumentDefault
+            # 先保存到同目录临时文件，完成后再原子替换，避免留下不完整的输出
+            temp_path = temp_path_for(output_path)
+            with stage("serialize"):
+                doc.SaveAs(str(temp_path), FileFormat=16)  # 16 = wdFormatDocumentDefault
+            doc.Close()
+            replace_atomically(temp_path, output_path)
+            count_items(1)
+            count_written(output_path)
 
             # 清理
-            doc.Close()
             word_app.Quit()
             pythoncom.CoUninitialize()
 
@@ -125,3 +148,43 @@ class Converter:
             except:
                 pass
             return False
+
+    def convert_batch(self, source_files: List[Path], output_dir: Optional[Path] = None,
+                      skip_duplicates: bool = False) -> List[Path]:
+        """批量转换：Word 转 PDF、PDF 转 Word（按扩展名判断），返回成功生成的文件
+
+        skip_duplicates 为 True 时先按文本相似度去掉重复提交的文档，只转换第一次出现的。
+        输出文件与已有文件重名时自动改用下一个可用的文件名。
+        """
+        source_files = [Path(p) for p in source_files]
+        if skip_duplicates:
+            if HAVE_NUMPY:
+                with stage("fingerprint"):
+                    source_files, skipped = skip_near_duplicates(source_files)
+                for path in skipped:
+                    self.logger.info(f"跳过重复文档: {path}")
+            else:
+                self.logger.warning("numpy 未安装，跳过重复文档检测")
+
+        jobs = []
+        for source in source_files:
+            suffix = source.suffix.lower()
+            if suffix == ".docx":
+                jobs.append((source, ".pdf", self.word_to_pdf))
+            elif suffix == ".pdf":
+                jobs.append((source, ".docx", self.pdf_to_word))
+            else:
+                self.logger.error(f"不支持转换的文件: {source}")
+        if output_dir is not None:
+            output_dir.mkdir(parents=True, exist_ok=True)
+        targets = reserve_filenames([(output_dir or source.parent) / f"{source.stem}{ext}"
+                                     for source, ext, _ in jobs])
+
+        outputs = []
+        for (source, _, convert), target in zip(jobs, targets):
+            if convert(source, target):
+                outputs.append(target)
+            else:
+                get_directory_index().release(target)
+        self.logger.info(f"批量转换完成: {len(outputs)}/{len(jobs)} 个文件")
+        return outputs
@@ -0,0 +1,267 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import time
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Tuple
+
+from .image_pdf import ImageInfo
+
+try:
+    from docx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+    from docx.opc.packuri import PACKAGE_URI, PackURI
+    from docx.oxml.ns import qn
+    from docx.oxml.shape import CT_Inline
+    from docx.parts.image import ImagePart
+
+    HAVE_DOCX = True
+except ImportError:
+    HAVE_DOCX = False
+
+try:
+    # python-docx 的私有类，新版本中可能改名或移除；没有时保存退回 Document.save()
+    from docx.opc.pkgwriter import _ContentTypesItem
+except ImportError:
+    _ContentTypesItem = None
+
+try:
+    from PIL import Image, ImageOps
+
+    HAVE_PIL = True
+except ImportError:
+    HAVE_PIL = False
+
+EMU_PER_INCH = 914400
+# 图片文件头里没有分辨率时按 Word 的默认值
+DEFAULT_DPI = 96
+_HASH_CHUNK = 1024 * 1024
+
+if HAVE_DOCX:
+    class MediaPart(ImagePart):
+        """按需从源文件读取内容的图片部件：保存时直接从文件复制，不在内存中保留图片数据"""
+
+        def __init__(self, partname: "PackURI", content_type: str, info: ImageInfo, convert: bool):
+            super().__init__(partname, content_type, b"")
+            self.info = info
+            self.convert = convert
+
+        def open_media(self) -> BinaryIO:
+            """打开图片数据；需要转换的图片（带方向标记或 Word 不支持的格式）在这里解码一次"""
+            if not self.convert:
+                return open(self.info.path, "rb")
+            with Image.open(self.info.path) as image:
+                image = ImageOps.exif_transpose(image)
+                output = io.BytesIO()
+                if self.info.format == "jpeg" and image.mode in ("L", "RGB", "CMYK"):
+                    image.save(output, "JPEG", quality=95)
+                else:
+                    image.save(output, "PNG")
+            output.seek(0)
+            return output
+
+        @property
+        def blob(self) -> bytes:
+            with self.open_media() as f:
+                return f.read()
+
+
+def _media_format(info: ImageInfo) -> Tuple[str, str, bool]:
+    """图片在包中的扩展名、内容类型，以及是否需要转换"""
+    # Word 不按 EXIF 方向显示图片，带方向标记的图片需要转正
+    convert = info.orientation != 1
+    if info.format == "jpeg":
+        return "jpg", CT.JPEG, convert
+    if info.format == "png":
+        return "png", CT.PNG, convert
+    return "png", CT.PNG, True
+
+
+def _blob_key(blob: bytes) -> bytes:
+    """内存中图片数据的内容键，与 _content_key 一致"""
+    return len(blob).to_bytes(8, "big") + hashlib.blake2b(blob, digest_size=20).digest()
+
+
+def _content_key(path: Path, size: int) -> bytes:
+    """文件内容哈希，只对大小相同的文件计算"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return size.to_bytes(8, "big") + digest.digest()
+
+
+def unique_images(infos: List[ImageInfo]) -> List[int]:
+    """为每张图片找到内容相同的第一张图片的序号
+
+    同一路径直接合并；不同路径只在文件大小相同时才读取内容比较哈希。
+    """
+    first_by_path: Dict[str, int] = {}
+    sizes: Dict[int, List[int]] = {}
+    owners = list(range(len(infos)))
+    for index, info in enumerate(infos):
+        key = os.path.normcase(os.path.abspath(info.path))
+        if key in first_by_path:
+            owners[index] = first_by_path[key]
+            continue
+        first_by_path[key] = index
+        sizes.setdefault(os.path.getsize(info.path), []).append(index)
+
+    for size, indexes in sizes.items():
+        if len(indexes) < 2:
+            continue
+        first_by_hash: Dict[bytes, int] = {}
+        for index in indexes:
+            first = first_by_hash.setdefault(_content_key(infos[index].path, size), index)
+            owners[index] = first
+
+    # 同一路径的重复项指向的可能是被哈希合并掉的图片
+    return [owners[owner] for owner in owners]
+
+
+def _existing_images(package, sizes: set) -> Dict[bytes, "ImagePart"]:
+    """文档中已有的图片部件，按内容键索引（只哈希大小与新图片相同的部件）"""
+    existing = {}
+    for part in package.iter_parts():
+        if isinstance(part, ImagePart) and not isinstance(part, MediaPart) and len(part.blob) in sizes:
+            existing.setdefault(_blob_key(part.blob), part)
+    return existing
+
+
+def _next_media_number(package) -> int:
+    """word/media 下尚未使用的图片编号"""
+    used = 0
+    for part in package.iter_parts():
+        name = str(part.partname)
+        if name.startswith("/word/media/"):
+            used = max(used, part.partname.idx or 0)
+    return used + 1
+
+
+def _fit(width: float, height: float, max_width: int, max_height: int) -> Tuple[int, int]:
+    """按显示尺寸（EMU）缩小到不超过版心，不放大"""
+    scale = min(1.0, max_width / width, max_height / height)
+    return int(width * scale), int(height * scale)
+
+
+def append_image_pages(document, infos: List[ImageInfo], page_break: bool = True) -> int:
+    """把图片逐页追加到文档末尾，返回新写入的图片部件数
+
+    尺寸只来自文件头；内容相同的图片共用一个部件和关系 ID，与文档中已有图片相同时直接引用已有部件。
+    """
+    if not HAVE_DOCX:
+        raise RuntimeError("python-docx 未安装")
+
+    document_part = document.part
+    package = document_part.package
+    section = document.sections[-1]
+    max_width = int(section.page_width - section.left_margin - section.right_margin)
+    # 段落标记与图片在同一行，留出少量余量避免图片被挤到下一页
+    max_height = int((section.page_height - section.top_margin - section.bottom_margin) * 0.98)
+
+    owners = unique_images(infos)
+    sizes = {index: os.path.getsize(infos[index].path) for index in set(owners)}
+    existing = _existing_images(package, set(sizes.values()))
+    written = 0
+    number = _next_media_number(package)
+    shape_id = document_part.next_id
+    rel_ids: Dict[int, str] = {}
+    body = document.element.body
+    anchor = body.sectPr
+    has_content = any(child.tag != qn("w:sectPr") for child in body)
+
+    for index, info in enumerate(infos):
+        owner = owners[index]
+        if owner not in rel_ids:
+            ext, content_type, convert = _media_format(info)
+            if convert and not HAVE_PIL:
+                raise RuntimeError(f"Pillow 未安装，无法转换图片: {info.path}")
+            # 不需要转换的图片按原文件内容与已有图片比较
+            part = None
+            if not convert and existing:
+                part = existing.get(_content_key(info.path, sizes[owner]))
+            if part is None:
+                part = MediaPart(PackURI(f"/word/media/image{number}.{ext}"), content_type, info, convert)
+                number += 1
+                written += 1
+            rel_ids[owner] = document_part.relate_to(part, RT.IMAGE)
+
+        # 带方向标记的图片在保存时转正，显示尺寸按转正后的宽高计算
+        width, height = info.width, info.height
+        if info.rotation in (90, 270):
+            width, height = height, width
+        dpi = info.dpi or DEFAULT_DPI
+        cx, cy = _fit(width * EMU_PER_INCH / dpi, height * EMU_PER_INCH / dpi, max_width, max_height)
+
+        inline = CT_Inline.new_pic_inline(shape_id, rel_ids[owner], info.path.name, cx, cy)
+        shape_id += 1
+        paragraph = body.makeelement(qn("w:p"), {})
+        properties = paragraph.makeelement(qn("w:pPr"), {})
+        if page_break and (index > 0 or has_content):
+            properties.append(properties.makeelement(qn("w:pageBreakBefore"), {}))
+        properties.append(properties.makeelement(qn("w:spacing"), {qn("w:before"): "0", qn("w:after"): "0"}))
+        paragraph.append(properties)
+        run = paragraph.makeelement(qn("w:r"), {})
+        drawing = run.makeelement(qn("w:drawing"), {})
+        drawing.append(inline)
+        run.append(drawing)
+        paragraph.append(run)
+        if anchor is not None:
+            anchor.addprevious(paragraph)
+        else:
+            body.append(paragraph)
+
+    return written
+
+
+def save_package(document, stream: BinaryIO, buffer_size: int = 1024 * 1024):
+    """保存文档：图片部件从源文件流式复制并以不压缩方式存储（JPEG/PNG 本身已压缩），其他部件照常压缩"""
+    if _ContentTypesItem is None:
+        # 图片部件的内容在保存时才从源文件读入内存
+        document.save(stream)
+        return
+
+    package = document.part.package
+    parts = list(package.iter_parts())
+    for part in parts:
+        part.before_marshal()
+
+    date_time = time.localtime()[:6]
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _ContentTypesItem.from_parts(parts).blob)
+        zf.writestr(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+        for part in parts:
+            if isinstance(part, MediaPart):
+                member = zipfile.ZipInfo(part.partname.membername, date_time)
+                member.compress_type = zipfile.ZIP_STORED
+                with part.open_media() as src:
+                    # 预先给出大小，超过 2GB 时 zipfile 才使用 ZIP64
+                    member.file_size = src.seek(0, os.SEEK_END)
+                    src.seek(0)
+                    with zf.open(member, "w") as dst:
+                        shutil.copyfileobj(src, dst, buffer_size)
+            else:
+                zf.writestr(part.partname.membername, part.blob)
+            if len(part.rels):
+                zf.writestr(part.partname.rels_uri.membername, part.rels.xml)
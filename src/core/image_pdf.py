@@ -0,0 +1,391 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import io
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image
+
+    HAVE_PIL = True
+except ImportError:
+    HAVE_PIL = False
+
+# SOF 标记（不含 DHT/JPG/DAC 占用的 C4、C8、CC）
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_COLOR_SPACES = {1: "/DeviceGray", 3: "/DeviceRGB", 4: "/DeviceCMYK"}
+
+# EXIF 方向 -> (页面顺时针旋转角度, 是否左右镜像)
+_ORIENTATIONS = {
+    1: (0, False), 2: (0, True), 3: (180, False), 4: (180, True),
+    5: (270, True), 6: (90, False), 7: (90, True), 8: (270, False),
+}
+
+
+class ImageInfo:
+    """只读取文件头得到的图片信息"""
+
+    __slots__ = ("path", "format", "width", "height", "components", "bits", "orientation",
+                 "dpi", "adobe", "chunks")
+
+    def __init__(self, path: Path, fmt: str, width: int, height: int, components: int, bits: int = 8):
+        self.path = path
+        self.format = fmt
+        self.width = width
+        self.height = height
+        self.components = components
+        self.bits = bits
+        self.orientation = 1
+        self.dpi: Optional[float] = None
+        self.adobe = False
+        # PNG 的 IDAT 数据块位置 [(偏移, 长度)]
+        self.chunks: List[Tuple[int, int]] = []
+
+    @property
+    def rotation(self) -> int:
+        return _ORIENTATIONS.get(self.orientation, (0, False))[0]
+
+    @property
+    def mirrored(self) -> bool:
+        return _ORIENTATIONS.get(self.orientation, (0, False))[1]
+
+    @property
+    def passthrough(self) -> bool:
+        """能否不经解码直接嵌入 PDF"""
+        if self.format == "jpeg":
+            return self.bits == 8 and self.components in _COLOR_SPACES
+        if self.format == "png":
+            return self.bits == 8 and self.components in (1, 3) and bool(self.chunks)
+        return False
+
+
+class EncodedImage:
+    """已编码、可直接写入PDF的图片数据（如清理后的扫描件）"""
+
+    __slots__ = ("data", "width", "height", "color_space", "bits", "filter")
+
+    def __init__(self, data: bytes, width: int, height: int, color_space: str, bits: int, filter_name: str):
+        self.data = data
+        self.width = width
+        self.height = height
+        self.color_space = color_space
+        self.bits = bits
+        self.filter = filter_name
+
+
+def _exif_orientation(data: bytes) -> int:
+    """从 APP1 Exif 段中读取方向（Orientation，标签 0x0112）"""
+    if not data.startswith(b"Exif\0\0") or len(data) < 14:
+        return 1
+    tiff = data[6:]
+    order = "<" if tiff[:2] == b"II" else ">"
+    try:
+        offset = struct.unpack(order + "I", tiff[4:8])[0]
+        count = struct.unpack(order + "H", tiff[offset:offset + 2])[0]
+        for i in range(count):
+            entry = tiff[offset + 2 + i * 12: offset + 14 + i * 12]
+            tag, kind = struct.unpack(order + "HH", entry[:4])
+            if tag == 0x0112 and kind == 3:
+                value = struct.unpack(order + "H", entry[8:10])[0]
+                return value if value in _ORIENTATIONS else 1
+    except struct.error:
+        pass
+    return 1
+
+
+def _read_jpeg(path: Path, f: BinaryIO) -> Optional[ImageInfo]:
+    """逐段读取 JPEG 标记直到 SOF，跳过压缩数据"""
+    orientation = 1
+    dpi = None
+    adobe = False
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0] - 2
+
+        if code in _SOF_MARKERS:
+            bits, height, width, components = struct.unpack(">BHHB", f.read(6))
+            info = ImageInfo(path, "jpeg", width, height, components, bits)
+            info.orientation = orientation
+            info.dpi = dpi
+            info.adobe = adobe
+            return info
+        if code == 0xE1 and orientation == 1:
+            orientation = _exif_orientation(f.read(length))
+        elif code == 0xE0:
+            segment = f.read(length)
+            if segment.startswith(b"JFIF\0") and len(segment) >= 12:
+                units, x_density = segment[7], struct.unpack(">H", segment[8:10])[0]
+                if units == 1 and x_density > 1:
+                    dpi = float(x_density)
+                elif units == 2 and x_density > 1:
+                    dpi = x_density * 2.54
+        elif code == 0xEE:
+            adobe = f.read(length).startswith(b"Adobe")
+        else:
+            f.seek(length, io.SEEK_CUR)
+
+
+def _read_png(path: Path, f: BinaryIO) -> Optional[ImageInfo]:
+    """读取 PNG 的 IHDR、pHYs 和各 IDAT 块位置"""
+    f.seek(8)
+    length, kind = struct.unpack(">I4s", f.read(8))
+    if kind != b"IHDR":
+        return None
+    width, height, bits, color_type, _, _, interlace = struct.unpack(">IIBBBBB", f.read(13))
+    f.seek(4, io.SEEK_CUR)
+    # 只有不隔行、无透明通道、无调色板的 PNG 可以直接嵌入
+    components = {0: 1, 2: 3}.get(color_type, 0) if not interlace else 0
+    info = ImageInfo(path, "png", width, height, components, bits)
+
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        length, kind = struct.unpack(">I4s", header)
+        if kind == b"IDAT":
+            info.chunks.append((f.tell(), length))
+        elif kind == b"pHYs" and length == 9:
+            x_ppu, _, unit = struct.unpack(">IIB", f.read(9))
+            if unit == 1 and x_ppu:
+                info.dpi = x_ppu * 0.0254
+            f.seek(4, io.SEEK_CUR)
+            continue
+        elif kind in (b"tRNS", b"PLTE"):
+            info.components = 0
+        elif kind == b"IEND":
+            break
+        f.seek(length + 4, io.SEEK_CUR)
+    return info
+
+
+def read_image_info(path: Path) -> Optional[ImageInfo]:
+    """只读取文件头获取图片尺寸、颜色、方向等信息，无法识别时返回 None"""
+    with open(path, "rb") as f:
+        head = f.read(8)
+        if head[:2] == b"\xff\xd8":
+            return _read_jpeg(path, f)
+        if head == _PNG_SIGNATURE:
+            return _read_png(path, f)
+    if not HAVE_PIL:
+        return None
+    # 其他格式交给 Pillow（只打开文件头，不解码像素）
+    try:
+        with Image.open(path) as image:
+            return ImageInfo(path, "other", image.width, image.height, len(image.getbands()))
+    except Exception:
+        return None
+
+
+def read_image_infos(paths: List[Path], workers: int = 1) -> List[Optional[ImageInfo]]:
+    """读取一批图片的文件头；文件头很小，多个文件时并发读取以减少等待"""
+    if workers > 1 and len(paths) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+            return list(executor.map(read_image_info, paths))
+    return [read_image_info(p) for p in paths]
+
+
+def _number(value: float) -> str:
+    """PDF 数值"""
+    text = f"{value:.4f}".rstrip("0").rstrip(".")
+    return text if text not in ("", "-0") else "0"
+
+
+class PdfStreamWriter:
+    """边生成边写出的简易PDF写入器：图片数据直接从源文件复制到输出，内存中只保留对象偏移"""
+
+    def __init__(self, stream: BinaryIO, buffer_size: int = 1024 * 1024):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self._start = stream.tell()
+        self._offsets: Dict[int, int] = {}
+        self._pages: List[int] = []
+        # 1 号对象为目录，2 号对象为页面树，写完所有页面后再写出
+        self._next_id = 3
+        stream.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _alloc(self) -> int:
+        num = self._next_id
+        self._next_id += 1
+        return num
+
+    def _begin(self, num: int):
+        self._offsets[num] = self.stream.tell() - self._start
+        self.stream.write(f"{num} 0 obj\n".encode())
+
+    def _write_object(self, num: int, body: str):
+        self._begin(num)
+        self.stream.write(body.encode("latin-1") + b"\nendobj\n")
+
+    def _write_stream(self, num: int, entries: str, data: bytes):
+        self._begin(num)
+        self.stream.write(f"<< {entries} /Length {len(data)} >>\nstream\n".encode("latin-1"))
+        self.stream.write(data)
+        self.stream.write(b"\nendstream\nendobj\n")
+
+    def _copy_ranges(self, path: Path, ranges: List[Tuple[int, int]]):
+        """把源文件中的若干字节区间原样复制到输出"""
+        with open(path, "rb") as src:
+            for offset, length in ranges:
+                src.seek(offset)
+                remaining = length
+                while remaining:
+                    chunk = src.read(min(self.buffer_size, remaining))
+                    if not chunk:
+                        raise IOError(f"文件被截断: {path}")
+                    self.stream.write(chunk)
+                    remaining -= len(chunk)
+
+    def _image_object(self, info: ImageInfo) -> int:
+        """写出图片 XObject；JPEG 和普通 PNG 原样嵌入，其他图片解码后无损压缩"""
+        num = self._alloc()
+        if info.passthrough and info.format == "jpeg":
+            size = info.path.stat().st_size
+            entries = (f"/Type /XObject /Subtype /Image /Width {info.width} /Height {info.height} "
+                       f"/ColorSpace {_COLOR_SPACES[info.components]} /BitsPerComponent 8 /Filter /DCTDecode")
+            if info.components == 4 and info.adobe:
+                # Adobe 软件写出的 CMYK JPEG 数值是反相的
+                entries += " /Decode [1 0 1 0 1 0 1 0]"
+            self._begin(num)
+            self.stream.write(f"<< {entries} /Length {size} >>\nstream\n".encode())
+            self._copy_ranges(info.path, [(0, size)])
+            self.stream.write(b"\nendstream\nendobj\n")
+        elif info.passthrough and info.format == "png":
+            # IDAT 数据本身就是带 PNG 预测器的 zlib 流
+            size = sum(length for _, length in info.chunks)
+            entries = (f"/Type /XObject /Subtype /Image /Width {info.width} /Height {info.height} "
+                       f"/ColorSpace {_COLOR_SPACES[info.components]} /BitsPerComponent 8 /Filter /FlateDecode "
+                       f"/DecodeParms << /Predictor 15 /Colors {info.components} /BitsPerComponent 8 "
+                       f"/Columns {info.width} >>")
+            self._begin(num)
+            self.stream.write(f"<< {entries} /Length {size} >>\nstream\n".encode())
+            self._copy_ranges(info.path, info.chunks)
+            self.stream.write(b"\nendstream\nendobj\n")
+        else:
+            if not HAVE_PIL:
+                raise RuntimeError(f"Pillow 未安装，无法嵌入图片: {info.path}")
+            with Image.open(info.path) as image:
+                if image.mode in ("RGBA", "LA", "P"):
+                    # 透明部分铺白底
+                    image = image.convert("RGBA")
+                    background = Image.new("RGB", image.size, "white")
+                    background.paste(image, mask=image.getchannel("A"))
+                    image = background
+                elif image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+                color_space = "/DeviceGray" if image.mode == "L" else "/DeviceRGB"
+                data = zlib.compress(image.tobytes(), 6)
+                info.width, info.height = image.width, image.height
+            self._write_stream(num, f"/Type /XObject /Subtype /Image /Width {info.width} /Height {info.height} "
+                                    f"/ColorSpace {color_space} /BitsPerComponent 8 /Filter /FlateDecode", data)
+        return num
+
+    def add_image_page(self, info: ImageInfo, page_size: Optional[Tuple[float, float]] = None,
+                       default_dpi: float = 300):
+        """添加一页图片
+
+        page_size 为显示时的页面尺寸（磅），图片等比缩放居中；为 None 时页面与图片同大（按图片分辨率）。
+        EXIF 方向通过页面 /Rotate 实现，镜像方向在内容流中翻转。
+        """
+        image_id = self._image_object(info)
+        self._image_page(image_id, info.width, info.height, info.rotation, info.mirrored,
+                         info.dpi or default_dpi, page_size)
+
+    def add_encoded_page(self, image: EncodedImage, dpi: float,
+                         page_size: Optional[Tuple[float, float]] = None):
+        """添加一页已编码的图片（方向已经校正）"""
+        image_id = self._alloc()
+        self._write_stream(image_id, f"/Type /XObject /Subtype /Image /Width {image.width} /Height {image.height} "
+                                     f"/ColorSpace {image.color_space} /BitsPerComponent {image.bits} "
+                                     f"/Filter {image.filter}", image.data)
+        self._image_page(image_id, image.width, image.height, 0, False, dpi, page_size)
+
+    def _image_page(self, image_id: int, width: int, height: int, rotation: int, mirrored: bool,
+                    dpi: float, page_size: Optional[Tuple[float, float]]):
+        """写出显示一张图片的页面"""
+        if page_size is None:
+            scale = 72.0 / dpi
+            box_w, box_h = width * scale, height * scale
+            draw_w, draw_h, x, y = box_w, box_h, 0.0, 0.0
+        else:
+            # 页面旋转 90/270 度后显示，所以未旋转的页面框取宽高互换的尺寸
+            box_w, box_h = page_size if rotation in (0, 180) else (page_size[1], page_size[0])
+            scale = min(box_w / width, box_h / height)
+            draw_w, draw_h = width * scale, height * scale
+            x, y = (box_w - draw_w) / 2, (box_h - draw_h) / 2
+
+        if mirrored:
+            matrix = f"{_number(-draw_w)} 0 0 {_number(draw_h)} {_number(x + draw_w)} {_number(y)}"
+        else:
+            matrix = f"{_number(draw_w)} 0 0 {_number(draw_h)} {_number(x)} {_number(y)}"
+        content_id = self._alloc()
+        self._write_stream(content_id, "", f"q {matrix} cm /Im0 Do Q".encode())
+
+        page_id = self._alloc()
+        rotate = f" /Rotate {rotation}" if rotation else ""
+        self._write_object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_number(box_w)} {_number(box_h)}]{rotate} "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"))
+        self._pages.append(page_id)
+
+    def close(self, title: Optional[str] = None):
+        """写出页面树、目录、交叉引用表和文件尾"""
+        kids = " ".join(f"{num} 0 R" for num in self._pages)
+        self._write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>")
+        self._write_object(1, "<< /Type /Catalog /Pages 2 0 R >>")
+
+        info_ref = ""
+        if title:
+            info_id = self._alloc()
+            encoded = "FEFF" + title.encode("utf-16-be").hex().upper()
+            self._write_object(info_id, f"<< /Title <{encoded}> /Producer (WP Express) >>")
+            info_ref = f" /Info {info_id} 0 R"
+
+        size = self._next_id
+        xref_offset = self.stream.tell() - self._start
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for num in range(1, size):
+            offset = self._offsets.get(num)
+            lines.append(f"{offset:010d} 00000 n \n" if offset is not None else "0000000000 00000 f \n")
+        self.stream.write("".join(lines).encode())
+        self.stream.write(f"trailer\n<< /Size {size} /Root 1 0 R{info_ref} >>\n"
+                          f"startxref\n{xref_offset}\n%%EOF\n".encode())
+        self.stream.flush()
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pages)
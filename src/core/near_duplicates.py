@@ -0,0 +1,238 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import logging
+import multiprocessing
+import re
+import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .search_index import extract_units
+from ..utils.settings import default_workers, worker_count
+
+try:
+    import numpy as np
+
+    HAVE_NUMPY = True
+except ImportError:
+    HAVE_NUMPY = False
+
+logger = logging.getLogger("WP_Express")
+
+# 估计相似度（Jaccard）达到该值视为重复
+DEFAULT_THRESHOLD = 0.8
+NUM_PERM = 128
+# 字符 shingle 长度：中文 5 个字约为两三个词
+SHINGLE_SIZE = 5
+# 计算签名时每次处理的 shingle 数，控制临时矩阵大小（NUM_PERM x _BLOCK）
+_BLOCK = 4096
+# LSH 桶内文档数不超过该值时两两比较，否则只与桶内第一个比较
+_PAIRWISE_LIMIT = 32
+# 选择 LSH 参数时误检的权重（漏检为 1 减去该值）
+_FALSE_POSITIVE_WEIGHT = 0.2
+_WHITESPACE = re.compile(r"\s+")
+_SEED = 2026
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> "np.ndarray":
+    """把文本（去掉空白、统一全半角和大小写）切成长度为 size 的字符片段，返回去重后的 64 位哈希"""
+    text = _WHITESPACE.sub("", unicodedata.normalize("NFKC", text).lower())
+    if not text:
+        return np.empty(0, dtype=np.uint64)
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    count = max(1, len(codes) - size + 1)
+    size = min(size, len(codes))
+
+    # 多项式滚动哈希，一次计算所有片段（uint64 溢出即取模）
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        hashes = hashes * np.uint64(1000003) + codes[offset:offset + count]
+    # 再混合一次，让相近片段的哈希分散开
+    hashes ^= hashes >> np.uint64(31)
+    hashes *= np.uint64(0x9E3779B97F4A7C15)
+    hashes ^= hashes >> np.uint64(29)
+    return np.unique(hashes)
+
+
+class MinHasher:
+    """MinHash 签名：NUM_PERM 个乘移位哈希函数下各自的最小值"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = _SEED):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+    def signature(self, hashes: "np.ndarray") -> "np.ndarray":
+        """计算签名，分块处理以限制内存"""
+        signature = np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        for start in range(0, len(hashes), _BLOCK):
+            block = hashes[start:start + _BLOCK]
+            values = (self._a[:, None] * block[None, :] + self._b[:, None]) >> np.uint64(32)
+            np.minimum(signature, values.min(axis=1).astype(np.uint32), out=signature)
+        return signature
+
+
+_hashers: Dict[int, "MinHasher"] = {}
+
+
+def document_signature(path: Path, num_perm: int = NUM_PERM) -> Optional["np.ndarray"]:
+    """提取文档文本并计算签名；没有文本（如扫描件）或无法读取时返回 None"""
+    try:
+        text = "".join(text for _, text in extract_units(Path(path)))
+    except Exception:
+        return None
+    hashes = shingle_hashes(text)
+    if not len(hashes):
+        return None
+    hasher = _hashers.get(num_perm)
+    if hasher is None:
+        hasher = _hashers[num_perm] = MinHasher(num_perm)
+    return hasher.signature(hashes)
+
+
+def _signature_job(args: Tuple[str, int]) -> Optional["np.ndarray"]:
+    """进程池任务"""
+    return document_signature(Path(args[0]), args[1])
+
+
+def _signatures(paths: List[Path], num_perm: int, workers: int) -> Iterator[Optional["np.ndarray"]]:
+    """按顺序计算一批文档的签名；多个文档时在进程池中并行"""
+    jobs = [(str(p), num_perm) for p in paths]
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        for job in jobs:
+            yield _signature_job(job)
+        return
+
+    # 使用 spawn：在多线程进程（GUI、服务）中 fork 不安全
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        pending = deque()
+        for job in jobs:
+            pending.append(executor.submit(_signature_job, job))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def lsh_parameters(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """选择分段数和每段行数，使阈值两侧的误判面积加权和最小
+
+    候选对还要按签名确认，误检只多花一点比较时间，漏检则直接漏掉重复文档，所以漏检权重更高。
+    """
+    best, best_error = (1, num_perm), float("inf")
+    similarity = np.linspace(0, 1, 201)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        probability = 1 - (1 - similarity ** rows) ** bands
+        false_positive = np.where(similarity < threshold, probability, 0).mean()
+        false_negative = np.where(similarity >= threshold, 1 - probability, 0).mean()
+        error = _FALSE_POSITIVE_WEIGHT * false_positive + (1 - _FALSE_POSITIVE_WEIGHT) * false_negative
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+def cluster_signatures(signatures: "np.ndarray", threshold: float = DEFAULT_THRESHOLD) -> List[List[int]]:
+    """用 LSH 分段找出候选对，按签名估计相似度确认后合并为重复簇（每簇按序号排序，只返回两个以上的簇）"""
+    count, num_perm = signatures.shape
+    bands, rows = lsh_parameters(threshold, num_perm)
+    parent = list(range(count))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        if counts.max() < 2:
+            continue
+        # 按桶排序后切分，每个文档只访问一次
+        order = np.argsort(inverse, kind="stable")
+        boundaries = np.cumsum(counts)[:-1]
+        for members in np.split(order, boundaries):
+            if len(members) < 2:
+                continue
+            if len(members) <= _PAIRWISE_LIMIT:
+                sigs = signatures[members]
+                similar = (sigs[:, None, :] == sigs[None, :, :]).mean(axis=2) >= threshold
+                pairs = zip(*np.nonzero(np.triu(similar, 1)))
+            else:
+                similar = (signatures[members] == signatures[members[0]]).mean(axis=1) >= threshold
+                pairs = ((0, j) for j in np.flatnonzero(similar[1:]) + 1)
+            for i, j in pairs:
+                a, b = find(int(members[i])), find(int(members[j]))
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(count):
+        clusters.setdefault(find(i), []).append(i)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def _duplicate_clusters(paths: List[Path], threshold: float, num_perm: int,
+                        workers: Optional[int]) -> List[List[int]]:
+    """重复文档簇（输入中的序号）"""
+    if not HAVE_NUMPY:
+        raise RuntimeError("重复文档检测需要安装 numpy")
+    if len(paths) < 2:
+        return []
+
+    workers = workers or worker_count("index", default_workers())
+    indexes, rows = [], []
+    for index, signature in enumerate(_signatures(paths, num_perm, workers)):
+        if signature is None:
+            logger.debug(f"没有可比较的文本: {paths[index]}")
+            continue
+        indexes.append(index)
+        rows.append(signature)
+    if len(rows) < 2:
+        return []
+
+    clusters = cluster_signatures(np.vstack(rows), threshold)
+    return [[indexes[i] for i in members] for members in clusters]
+
+
+def find_near_duplicates(paths: List[Path], threshold: float = DEFAULT_THRESHOLD, num_perm: int = NUM_PERM,
+                         workers: Optional[int] = None) -> List[List[Path]]:
+    """找出内容相近的文档簇（每簇按输入顺序，第一个视为原件）
+
+    没有可提取文本的文档无法判断，不会被视为重复。
+    """
+    paths = [Path(p) for p in paths]
+    return [[paths[i] for i in members] for members in _duplicate_clusters(paths, threshold, num_perm, workers)]
+
+
+def skip_near_duplicates(paths: List[Path], threshold: float = DEFAULT_THRESHOLD,
+                         workers: Optional[int] = None) -> Tuple[List[Path], List[Path]]:
+    """去掉内容相近的重复文档，返回 (保留的文档, 跳过的文档)，保留的文档维持原顺序"""
+    paths = [Path(p) for p in paths]
+    skipped = set()
+    for members in _duplicate_clusters(paths, threshold, NUM_PERM, workers):
+        skipped.update(members[1:])
+    return ([p for i, p in enumerate(paths) if i not in skipped],
+            [p for i, p in enumerate(paths) if i in skipped])
@@ -0,0 +1,144 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import io
+import zlib
+from typing import BinaryIO, Dict, List, Tuple
+
+try:
+    from pypdf.generic import (ArrayObject, DictionaryObject, NameObject, NumberObject, StreamObject)
+
+    HAVE_PYPDF = True
+except ImportError:
+    HAVE_PYPDF = False
+
+# 每个对象流中最多放入的对象数
+OBJECTS_PER_STREAM = 200
+
+
+def _width(value: int) -> int:
+    """表示 value 需要的字节数"""
+    return max(1, (value.bit_length() + 7) // 8)
+
+
+def _pack_objects(objects: List[Tuple[int, object]], level: int) -> Tuple[bytes, int, int]:
+    """把一组非流对象序列化为对象流数据，返回 (压缩后数据, /N, /First)"""
+    offsets = []
+    body = io.BytesIO()
+    for idnum, obj in objects:
+        offsets.append(f"{idnum} {body.tell()}")
+        obj.write_to_stream(body)
+        body.write(b"\n")
+    header = (" ".join(offsets) + "\n").encode("ascii")
+    return zlib.compress(header + body.getvalue(), level), len(objects), len(header)
+
+
+def write_compact(writer, stream: BinaryIO, level: int = 6, per_stream: int = OBJECTS_PER_STREAM):
+    """以对象流 + 交叉引用流的紧凑格式写出 PdfWriter 中的文档
+
+    字典、数组等非流对象打包进压缩的对象流（/Type /ObjStm），交叉引用表改为压缩的
+    交叉引用流（/Type /XRef），对象多时体积明显小于 pypdf 默认的逐对象写出 + 文本 xref。
+    加密文档按原方式写出。
+    """
+    if writer._encryption is not None:
+        writer.write(stream)
+        return
+
+    writer._resolve_links()
+    objects = writer._objects
+    encrypt_entry = writer._encrypt_entry
+
+    # 条目: (类型, 字段2, 字段3)；1 = 文件偏移，2 = (对象流编号, 流内序号)
+    entries: Dict[int, Tuple[int, int, int]] = {}
+
+    # 偏移量相对于文档开头（stream 当前位置）
+    start = stream.tell()
+
+    def tell() -> int:
+        return stream.tell() - start
+
+    # 对象流和交叉引用流要求 PDF 1.5 及以上
+    version = writer.pdf_header[5:] if writer.pdf_header.startswith("%PDF-") else "1.7"
+    header = "%PDF-1.5" if version < "1.5" else writer.pdf_header
+    stream.write(header.encode() + b"\n%\xE2\xE3\xCF\xD3\n")
+
+    # 流对象必须直接写在文件中；其余对象收集起来放进对象流
+    packable: List[Tuple[int, object]] = []
+    for idnum, obj in enumerate(objects, start=1):
+        if obj is None:
+            continue
+        if isinstance(obj, StreamObject) or obj is encrypt_entry:
+            entries[idnum] = (1, tell(), 0)
+            stream.write(f"{idnum} 0 obj\n".encode())
+            obj.write_to_stream(stream)
+            stream.write(b"\nendobj\n")
+        else:
+            packable.append((idnum, obj))
+
+    next_id = len(objects) + 1
+    for i in range(0, len(packable), per_stream):
+        group = packable[i:i + per_stream]
+        data, count, first = _pack_objects(group, level)
+        objstm_id = next_id
+        next_id += 1
+        for index, (idnum, _) in enumerate(group):
+            entries[idnum] = (2, objstm_id, index)
+
+        objstm = DictionaryObject({
+            NameObject("/Type"): NameObject("/ObjStm"),
+            NameObject("/N"): NumberObject(count),
+            NameObject("/First"): NumberObject(first),
+            NameObject("/Filter"): NameObject("/FlateDecode"),
+            NameObject("/Length"): NumberObject(len(data)),
+        })
+        entries[objstm_id] = (1, tell(), 0)
+        stream.write(f"{objstm_id} 0 obj\n".encode())
+        objstm.write_to_stream(stream)
+        stream.write(b"\nstream\n" + data + b"\nendstream\nendobj\n")
+
+    # 交叉引用流本身也占一个对象编号
+    xref_id = next_id
+    size = xref_id + 1
+    xref_offset = tell()
+    entries[xref_id] = (1, xref_offset, 0)
+
+    w2 = _width(max(value[1] for value in entries.values()))
+    w3 = max(2, _width(max(value[2] for value in entries.values())))
+    rows = bytearray()
+    for idnum in range(size):
+        kind, field2, field3 = entries.get(idnum, (0, 0, 65535 if idnum == 0 else 0))
+        rows += bytes([kind]) + field2.to_bytes(w2, "big") + field3.to_bytes(w3, "big")
+    data = zlib.compress(bytes(rows), level)
+
+    trailer = DictionaryObject({
+        NameObject("/Type"): NameObject("/XRef"),
+        NameObject("/Size"): NumberObject(size),
+        NameObject("/W"): ArrayObject([NumberObject(1), NumberObject(w2), NumberObject(w3)]),
+        NameObject("/Root"): writer.root_object.indirect_reference,
+        NameObject("/Filter"): NameObject("/FlateDecode"),
+        NameObject("/Length"): NumberObject(len(data)),
+    })
+    if writer._info is not None:
+        trailer[NameObject("/Info")] = writer._info.indirect_reference
+    if writer._ID is not None:
+        trailer[NameObject("/ID")] = writer._ID
+
+    stream.write(f"{xref_id} 0 obj\n".encode())
+    trailer.write_to_stream(stream)
+    stream.write(b"\nstream\n" + data + b"\nendstream\nendobj\n")
+    stream.write(f"startxref\n{xref_offset}\n%%EOF\n".encode())
+    stream.flush()
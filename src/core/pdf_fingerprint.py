@@ -0,0 +1,247 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..utils.settings import performance
+
+try:
+    from pypdf.generic import (ArrayObject, DecodedStreamObject, DictionaryObject, IndirectObject,
+                               NameObject, StreamObject)
+
+    HAVE_PYPDF = True
+except ImportError:
+    HAVE_PYPDF = False
+
+# 计算指纹时忽略的键：指向父节点或与页面内容无关
+_SKIPPED_KEYS = {"/Parent", "/P", "/Annots", "/StructParents", "/Metadata", "/PieceInfo", "/LastModified"}
+_WHITESPACE = re.compile(rb"\s+")
+
+# 每个缓存条目除指纹本身以外的估算开销（字节）
+_ENTRY_OVERHEAD = 200
+_DIGEST_SIZE = 16
+
+
+class _Hasher:
+    """计算页面指纹；同一文档中共享的资源（字体、图片）只哈希一次"""
+
+    def __init__(self):
+        self._memo: Dict[Tuple[int, int], bytes] = {}
+
+    def digest(self, obj, depth: int = 0) -> bytes:
+        h = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+        self._update(h, obj, depth, set())
+        return h.digest()
+
+    def _update(self, h, obj, depth: int, active: set):
+        if isinstance(obj, IndirectObject):
+            key = (obj.idnum, obj.generation)
+            cached = self._memo.get(key)
+            if cached is None:
+                if key in active or depth > 32:
+                    # 循环引用或嵌套过深，只记录占位
+                    h.update(b"R")
+                    return
+                active.add(key)
+                sub = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+                self._update(sub, obj.get_object(), depth + 1, active)
+                active.discard(key)
+                cached = self._memo[key] = sub.digest()
+            h.update(b"R" + cached)
+        elif isinstance(obj, StreamObject):
+            # 流使用原始（未解码）数据，省去解压
+            h.update(b"S")
+            self._update_dict(h, obj, depth, active)
+            data = obj._data if obj._data is not None else obj.get_data()
+            h.update(len(data).to_bytes(8, "little"))
+            h.update(data)
+        elif isinstance(obj, DictionaryObject):
+            h.update(b"D")
+            self._update_dict(h, obj, depth, active)
+        elif isinstance(obj, ArrayObject):
+            h.update(b"A%d" % len(obj))
+            for item in obj:
+                self._update(h, item, depth + 1, active)
+        else:
+            h.update(b"V" + repr(obj).encode("utf-8", "replace") + b"\0")
+
+    def _update_dict(self, h, obj, depth: int, active: set):
+        for key in sorted(obj.keys()):
+            if key in _SKIPPED_KEYS:
+                continue
+            h.update(key.encode("utf-8", "replace") + b"=")
+            self._update(h, obj.raw_get(key), depth + 1, active)
+
+    def page(self, page) -> bytes:
+        """页面指纹：规范化后的内容流 + 资源 + 页面尺寸和旋转 + 注释"""
+        h = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+        contents = page.get_contents()
+        data = contents.get_data() if contents is not None else b""
+        # 空白字符的差异不影响渲染结果
+        h.update(_WHITESPACE.sub(b" ", data).strip())
+        h.update(b"|R")
+        resources = page.raw_get("/Resources") if "/Resources" in page else None
+        if resources is not None:
+            self._update(h, resources, 0, set())
+        h.update(b"|M" + repr([float(v) for v in page.mediabox]).encode())
+        h.update(b"|r%d" % (page.get("/Rotate", 0) or 0))
+        # 链接、表单域、签名等注释不同的页面不算重复
+        if "/Annots" in page:
+            h.update(b"|A")
+            self._update(h, page.raw_get("/Annots"), 0, set())
+        return h.digest()
+
+
+def fingerprint_pages(pages) -> List[bytes]:
+    """计算一组页面（同一文档）的指纹"""
+    hasher = _Hasher()
+    return [hasher.page(page) for page in pages]
+
+
+class FingerprintCache:
+    """按输入文件缓存页面指纹（以路径、大小和修改时间为键），总大小超过上限时淘汰最久未用的"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, int, int], List[bytes]]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(path: Path) -> Optional[Tuple[str, int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return os.path.normcase(os.path.abspath(path)), stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def _entry_size(fingerprints: List[bytes]) -> int:
+        return _ENTRY_OVERHEAD + len(fingerprints) * (_DIGEST_SIZE + 40)
+
+    def get(self, path: Path, pages) -> List[bytes]:
+        """返回文件中各页的指纹，缓存未命中时计算并保存"""
+        key = self._key(path)
+        if key is not None:
+            with self._lock:
+                cached = self._entries.get(key)
+                if cached is not None and len(cached) == len(pages):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return cached
+
+        fingerprints = fingerprint_pages(pages)
+        if key is not None:
+            self._put(key, fingerprints)
+        return fingerprints
+
+    def _put(self, key, fingerprints: List[bytes]):
+        limit = self.max_bytes or int(performance("cache.page_fingerprint_bytes", 64 * 1024 * 1024))
+        size = self._entry_size(fingerprints)
+        with self._lock:
+            self.misses += 1
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= self._entry_size(old)
+            self._entries[key] = fingerprints
+            self._size += size
+            while self._size > limit and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= self._entry_size(evicted)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+# 全局指纹缓存实例
+_fingerprint_cache = None
+_fingerprint_cache_lock = threading.Lock()
+
+
+def get_fingerprint_cache() -> FingerprintCache:
+    """获取指纹缓存实例"""
+    global _fingerprint_cache
+    with _fingerprint_cache_lock:
+        if _fingerprint_cache is None:
+            _fingerprint_cache = FingerprintCache()
+    return _fingerprint_cache
+
+
+class SharedPageForms:
+    """把重复页面的内容放进一个共享的表单 XObject，每个副本只保留一条绘制命令"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self._forms: Dict[bytes, Tuple[IndirectObject, object]] = {}
+
+    def add(self, page, fingerprint: bytes):
+        """把页面加入输出；同一指纹的页面共用一个表单 XObject 和内容流"""
+        shared = self._forms.get(fingerprint)
+        if shared is None:
+            written = self.writer.add_page(page)
+            shared = self._forms[fingerprint] = self._to_form(written, len(self._forms))
+            return written
+
+        form_resources, contents_ref = shared
+        copy = self.writer.add_blank_page(1, 1)
+        for key in ("/MediaBox", "/CropBox", "/Rotate"):
+            if key in page:
+                copy[NameObject(key)] = page[key].clone(self.writer)
+        copy[NameObject("/Resources")] = form_resources
+        copy[NameObject("/Contents")] = contents_ref
+        if "/Annots" in page:
+            # 注释属于各个页面自己，复制一份并指向副本页面
+            annots = ArrayObject()
+            for annot in page["/Annots"]:
+                cloned = annot.get_object().clone(self.writer, force_duplicate=True, ignore_fields=("/P",))
+                cloned[NameObject("/P")] = copy.indirect_reference
+                annots.append(cloned.indirect_reference or self.writer._add_object(cloned))
+            copy[NameObject("/Annots")] = annots
+        return copy
+
+    def _to_form(self, written, index: int):
+        """把已写入的页面内容转换为表单 XObject，页面改为引用它"""
+        contents = written.get_contents()
+        form = DecodedStreamObject()
+        form.set_data(contents.get_data() if contents is not None else b"")
+        form[NameObject("/Type")] = NameObject("/XObject")
+        form[NameObject("/Subtype")] = NameObject("/Form")
+        form[NameObject("/BBox")] = ArrayObject(list(written.mediabox))
+        if "/Resources" in written:
+            form[NameObject("/Resources")] = written.raw_get("/Resources")
+        form_ref = self.writer._add_object(form.flate_encode())
+
+        name = NameObject(f"/WPPage{index}")
+        resources = DictionaryObject({NameObject("/XObject"): DictionaryObject({name: form_ref})})
+        draw = DecodedStreamObject()
+        draw.set_data(b"q " + name.encode() + b" Do Q")
+        contents_ref = self.writer._add_object(draw)
+
+        written[NameObject("/Resources")] = resources
+        written[NameObject("/Contents")] = contents_ref
+        return resources, contents_ref
@@ -15,10 +15,24 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import io
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 from .base import BaseHandler
+from .image_pdf import PdfStreamWriter, read_image_infos
+from .pdf_compact import write_compact
+from .pdf_fingerprint import SharedPageForms, get_fingerprint_cache
+from .pdf_linearize import HAVE_PIKEPDF, linearize as linearize_pdf
+from .pdf_metadata import Metadata, MetadataResult, update_metadata_many
+from .pdf_optimize import CATEGORIES, compress_streams, optimize_images
+from .pdf_stamp import STAMP_POSITIONS, StampJob, StampOptions, read_stamp_csv, stamp_documents
+from .pdf_transform import PageTransform
+from .scan_cleanup import CLEANUP_MODES, HAVE_NUMPY, clean_scans
+from ..utils.file_utils import get_directory_index, iter_files, reserve_filenames
+from ..utils.metrics import count_items, count_read, current_record, instrumented, stage
+from ..utils.output_writer import OutputBatch, atomic_output, temp_path_for
+from ..utils.settings import default_workers, performance, worker_count
 
 try:
     from pypdf import PdfWriter, PdfReader
@@ -45,6 +59,27 @@ class PDFHandler(BaseHandler):
         super().__init__()
         self.file_ext = ".pdf"
 
+    def _can_linearize(self, linearize: bool) -> bool:
+        """是否输出线性化 PDF；未安装 pikepdf 时给出警告并按普通格式输出"""
+        if linearize and not HAVE_PIKEPDF:
+            self.logger.warning("pikepdf 未安装，输出未线性化的PDF")
+            return False
+        return linearize
+
+    def _write(self, writer, f, linearize: bool = False, compact: bool = False):
+        """写出 PdfWriter 中的文档
+
+        compact 为 True 时非流对象打包进压缩的对象流，并使用交叉引用流（见 write_compact）。
+        """
+        target = io.BytesIO() if linearize else f
+        if compact:
+            write_compact(writer, target, int(performance("compression_level", 6)))
+        else:
+            writer.write(target)
+        if linearize:
+            linearize_pdf(target.getvalue(), f)
+
+    @instrumented("pdf.create_single_file")
     def create_single_file(self, file_name: str, save_path: Optional[Path] = None) -> bool:
         """创建单个PDF文档"""
         if not HAVE_REPORTLAB:
@@ -66,10 +101,12 @@ class PDFHandler(BaseHandler):
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
             # 创建PDF
-            c = canvas.Canvas(str(output_path), pagesize=A4)
-            c.drawString(100, 750, "这是一个新PDF文档")
-            c.showPage()
-            c.save()
+            with stage("serialize"), atomic_output(output_path) as f:
+                c = canvas.Canvas(f, pagesize=A4)
+                c.drawString(100, 750, "这是一个新PDF文档")
+                c.showPage()
+                c.save()
+            count_items(1)
 
             self.logger.info(f"创建PDF文档: {output_path}")
             return True
@@ -78,12 +115,22 @@ class PDFHandler(BaseHandler):
             self.logger.error(f"创建PDF文档失败: {e}")
             return False
 
-    def create_multiple(self, count: int, prefix: str, save_path: Optional[Path] = None) -> bool:
-        """批量创建PDF文档"""
+    @instrumented("pdf.create_multiple")
+    def create_multiple(self, count: int, prefix: str, save_path: Optional[Path] = None,
+                        linearize: bool = False, compact: bool = False) -> bool:
+        """批量创建PDF文档
+
+        linearize 为 True 时输出线性化（快速 Web 查看）PDF；compact 为 True 时以对象流紧凑写出。
+        """
         if not HAVE_REPORTLAB:
             self.logger.error("reportlab 未安装")
             return False
 
+        if compact and not HAVE_PYPDF:
+            self.logger.warning("pypdf 未安装，按普通格式输出")
+            compact = False
+        linearize = self._can_linearize(linearize)
+        file_paths = []
         try:
             # 确定保存路径
             if save_path:
@@ -94,25 +141,50 @@ class PDFHandler(BaseHandler):
             # 创建文件夹
             folder_path.mkdir(parents=True, exist_ok=True)
 
-            # 批量创建
-            for i in range(1, count + 1):
-                file_name = f"{prefix}_{i}{self.file_ext}"
-                file_path = folder_path / file_name
-
-                c = canvas.Canvas(str(file_path), pagesize=A4)
-                c.drawString(100, 750, f"这是第 {i} 个PDF文档")
-                c.showPage()
-                c.save()
+            # 批量创建（已存在的文件不会被覆盖，改用下一个可用的文件名）
+            file_paths = reserve_filenames(
+                [folder_path / f"{prefix}_{i}{self.file_ext}" for i in range(1, count + 1)])
+            with OutputBatch() as batch:
+                for i, file_path in enumerate(file_paths, start=1):
+                    with stage("serialize"), batch.open(file_path) as f:
+                        buffer = io.BytesIO() if linearize or compact else f
+                        c = canvas.Canvas(buffer, pagesize=A4)
+                        c.drawString(100, 750, f"这是第 {i} 个PDF文档")
+                        c.showPage()
+                        c.save()
+                        if compact:
+                            buffer.seek(0)
+                            self._write(PdfWriter(clone_from=PdfReader(buffer)), f, linearize, compact)
+                        elif linearize:
+                            linearize_pdf(buffer.getvalue(), f)
+                    count_items(1)
 
             self.logger.info(f"批量创建 {count} 个PDF文档到: {folder_path}")
             return True
 
         except Exception as e:
+            # 未写出的文件释放预留的文件名，避免之后的调用无谓地加上 _1 后缀
+            for path in file_paths:
+                if not path.exists():
+                    get_directory_index().release(path)
             self.logger.error(f"批量创建PDF文档失败: {e}")
             return False
 
-    def merge_files(self, source_files: List[Path], output_path: Path) -> bool:
-        """合并PDF文档"""
+    @instrumented("pdf.merge_files")
+    def merge_files(self, source_files: List[Path], output_path: Path, dedup: Optional[str] = None,
+                    skip_duplicates: bool = False, linearize: bool = False, compact: bool = False) -> bool:
+        """合并PDF文档
+
+        dedup 处理内容相同的重复页面（按内容流和资源计算指纹）：
+        "skip" 只保留第一次出现的页面；"share" 保留所有页面位置，但副本引用同一个表单 XObject。
+        skip_duplicates 为 True 时先按文本相似度去掉重复提交的文档（如改名后再次提交的同一篇论文）。
+        linearize 为 True 时输出线性化（快速 Web 查看）PDF，查看器下载到首页部分即可显示。
+        compact 为 True 时以对象流 + 交叉引用流紧凑写出，页面和注释多时体积明显减小。
+        """
+        if dedup not in (None, "skip", "share"):
+            self.logger.error(f"不支持的去重方式: {dedup}")
+            return False
+
         if not HAVE_PYPDF:
             self.logger.error("pypdf 未安装")
             return False
@@ -121,23 +193,58 @@ class PDFHandler(BaseHandler):
             self.logger.error("没有源文件")
             return False
 
+        # 解析之前先排除不存在或内容不符的文件
+        if not self.check_inputs(source_files):
+            return False
+
+        linearize = self._can_linearize(linearize)
         try:
+            if skip_duplicates:
+                source_files = self.drop_duplicates(source_files)
+
             # 确保输出目录存在
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
             # 创建PDF写入器
             pdf_writer = PdfWriter()
+            shared_forms = SharedPageForms(pdf_writer) if dedup == "share" else None
+            seen = set()
+            duplicates = 0
 
             # 合并所有PDF
             for file_path in source_files:
+                count_read(file_path)
                 with open(file_path, 'rb') as f:
-                    pdf_reader = PdfReader(f)
-                    for page in pdf_reader.pages:
-                        pdf_writer.add_page(page)
+                    with stage("parse"):
+                        pdf_reader = PdfReader(f)
+                        pages = pdf_reader.pages
+                    if dedup:
+                        with stage("fingerprint"):
+                            fingerprints = get_fingerprint_cache().get(file_path, pages)
+                    with stage("copy"):
+                        for i, page in enumerate(pages):
+                            if not dedup:
+                                pdf_writer.add_page(page)
+                                continue
+                            fingerprint = fingerprints[i]
+                            if fingerprint in seen:
+                                duplicates += 1
+                                if dedup == "skip":
+                                    continue
+                            seen.add(fingerprint)
+                            if shared_forms is not None:
+                                shared_forms.add(page, fingerprint)
+                            else:
+                                pdf_writer.add_page(page)
+                    count_items(len(pages))
+
+            if duplicates:
+                action = "跳过" if dedup == "skip" else "共享"
+                self.logger.info(f"{action}重复页面 {duplicates} 页")
 
             # 写入输出文件
-            with open(output_path, 'wb') as f:
-                pdf_writer.write(f)
+            with stage("serialize"), atomic_output(output_path) as f:
+                self._write(pdf_writer, f, linearize, compact)
 
             self.logger.info(f"合并PDF文档到: {output_path}")
             return True
@@ -146,12 +253,22 @@ class PDFHandler(BaseHandler):
             self.logger.error(f"合并PDF文档失败: {e}")
             return False
 
-    def split_file(self, source_path: Path, split_pos: int, output_dir: Optional[Path] = None) -> List[Path]:
-        """拆分PDF文档"""
+    @instrumented("pdf.split_file")
+    def split_file(self, source_path: Path, split_pos: int, output_dir: Optional[Path] = None,
+                   linearize: bool = False, compact: bool = False) -> List[Path]:
+        """拆分PDF文档
+
+        linearize 为 True 时输出线性化（快速 Web 查看）PDF；compact 为 True 时以对象流紧凑写出。
+        """
         if not HAVE_PYPDF:
             self.logger.error("pypdf 未安装")
             return []
 
+        if not self.check_inputs([source_path]):
+            return []
+
+        linearize = self._can_linearize(linearize)
+        outputs = []
         try:
             # 确定输出目录
             if output_dir:
@@ -160,9 +277,11 @@ class PDFHandler(BaseHandler):
                 save_dir = source_path.parent
 
             # 打开源PDF
+            count_read(source_path)
             with open(source_path, 'rb') as f:
-                pdf_reader = PdfReader(f)
-                total_pages = len(pdf_reader.pages)
+                with stage("parse"):
+                    pdf_reader = PdfReader(f)
+                    total_pages = len(pdf_reader.pages)
 
                 # 验证拆分位置
                 if split_pos <= 0 or split_pos >= total_pages:
@@ -174,27 +293,270 @@ class PDFHandler(BaseHandler):
                 writer2 = PdfWriter()
 
                 # 拆分页面
-                for i, page in enumerate(pdf_reader.pages):
-                    if i < split_pos:
-                        writer1.add_page(page)
-                    else:
-                        writer2.add_page(page)
+                with stage("copy"):
+                    for i, page in enumerate(pdf_reader.pages):
+                        if i < split_pos:
+                            writer1.add_page(page)
+                        else:
+                            writer2.add_page(page)
+                count_items(total_pages)
 
             # 生成输出路径
             source_name = source_path.stem
-            output1 = save_dir / f"{source_name}_拆分1{self.file_ext}"
-            output2 = save_dir / f"{source_name}_拆分2{self.file_ext}"
+            outputs = reserve_filenames([
+                save_dir / f"{source_name}_拆分1{self.file_ext}",
+                save_dir / f"{source_name}_拆分2{self.file_ext}",
+            ])
+            output1, output2 = outputs
 
-            # 保存拆分后的PDF
-            with open(output1, 'wb') as f:
-                writer1.write(f)
+            # 保存拆分后的PDF（两个文件一起提交）
+            with OutputBatch() as batch:
+                with stage("serialize"):
+                    with batch.open(output1) as f:
+                        self._write(writer1, f, linearize, compact)
 
-            with open(output2, 'wb') as f:
-                writer2.write(f)
+                    with batch.open(output2) as f:
+                        self._write(writer2, f, linearize, compact)
 
             self.logger.info(f"拆分PDF文档: {output1}, {output2}")
             return [output1, output2]
 
         except Exception as e:
+            # 未写出的文件释放预留的文件名，避免之后的调用无谓地加上 _1 后缀
+            for path in outputs:
+                if not path.exists():
+                    get_directory_index().release(path)
             self.logger.error(f"拆分PDF文档失败: {e}")
             return []
+
+    @instrumented("pdf.optimize")
+    def optimize(self, source_path: Path, output_path: Path, target_dpi: int = 150, jpeg_quality: int = 75,
+                 compress_level: Optional[int] = None, object_streams: bool = True,
+                 workers: Optional[int] = None) -> Dict[str, object]:
+        """优化PDF文档：重新压缩内容流、缩小高分辨率图片、以对象流紧凑写出
+
+        返回 {"input_bytes", "output_bytes", "saved": {分类: 节省字节数}}，失败时返回空字典。
+        """
+        if not HAVE_PYPDF:
+            self.logger.error("pypdf 未安装")
+            return {}
+
+        if not self.check_inputs([source_path]):
+            return {}
+
+        try:
+            level = compress_level if compress_level is not None else int(performance("compression_level", 6))
+            input_bytes = source_path.stat().st_size
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+
+            count_read(source_path)
+            with open(source_path, 'rb') as f:
+                with stage("parse"):
+                    writer = PdfWriter(clone_from=PdfReader(f))
+                with stage("compress"):
+                    saved = compress_streams(writer, level)
+                with stage("images"):
+                    saved["images"] = optimize_images(writer, target_dpi, jpeg_quality, workers)
+                count_items(len(writer.pages))
+
+                with stage("serialize"), atomic_output(output_path) as out:
+                    if object_streams:
+                        write_compact(writer, out, level)
+                    else:
+                        writer.write(out)
+
+            output_bytes = output_path.stat().st_size
+            # 其余的差值来自对象流和交叉引用流
+            saved["structure"] = input_bytes - output_bytes - sum(saved.values())
+            report = {
+                "input_bytes": input_bytes,
+                "output_bytes": output_bytes,
+                "saved": {category: saved.get(category, 0) for category in CATEGORIES},
+            }
+
+            self.logger.info(f"优化PDF文档: {output_path}，{input_bytes} -> {output_bytes} 字节")
+            return report
+
+        except Exception as e:
+            self.logger.error(f"优化PDF文档失败: {e}")
+            return {}
+
+    @instrumented("pdf.images_to_pdf")
+    def images_to_pdf(self, image_files: Iterable[Path], output_path: Path,
+                      page_size: Optional[Tuple[float, float]] = None,
+                      workers: Optional[int] = None, cleanup: Optional[str] = None) -> bool:
+        """把图片（如拍照的签字页、扫描件）合成一个PDF，每张图片一页
+
+        JPEG 和普通 PNG 的数据原样嵌入，不解码、不重新压缩；尺寸和 EXIF 方向只从文件头读取。
+        page_size 为 None 时页面与图片同大，否则（如 A4）等比缩放居中。
+        cleanup 为 "gray"（灰度）或 "bw"（黑白）时先清理拍摄的纸张照片：裁边、纠偏、均衡对比度，
+        页面按 A4 长边输出；需要 numpy，未安装时原样嵌入。
+        """
+        image_files = [Path(p) for p in image_files]
+        if not image_files:
+            self.logger.error("没有图片文件")
+            return False
+        if cleanup is not None and cleanup not in CLEANUP_MODES:
+            self.logger.error(f"不支持的清理方式: {cleanup}")
+            return False
+        if cleanup and not HAVE_NUMPY:
+            self.logger.warning("numpy 未安装，跳过扫描件清理")
+            cleanup = None
+
+        try:
+            with stage("parse"):
+                infos = read_image_infos(image_files, workers or worker_count("image", 8))
+
+            invalid = [p for p, info in zip(image_files, infos) if info is None]
+            if invalid:
+                for path in invalid:
+                    self.logger.error(f"无法识别的图片: {path}")
+                return False
+
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with stage("serialize"), atomic_output(output_path) as f:
+                writer = PdfStreamWriter(f, int(performance("io_buffer_size", 1024 * 1024)))
+                if cleanup:
+                    for path, image in zip(image_files, clean_scans(image_files, cleanup, workers=workers)):
+                        # 裁边后的纸张按 A4 长边（11.69 英寸）计算分辨率
+                        writer.add_encoded_page(image, max(image.width, image.height) / 11.69, page_size)
+                        count_read(path)
+                else:
+                    for info in infos:
+                        writer.add_image_page(info, page_size)
+                        count_read(info.path)
+                writer.close(title=output_path.stem)
+            count_items(len(infos))
+
+            if cleanup:
+                self.logger.info(f"图片合成PDF: {output_path}，共 {len(infos)} 页（已清理: {cleanup}）")
+            else:
+                passthrough = sum(1 for info in infos if info.passthrough)
+                self.logger.info(f"图片合成PDF: {output_path}，共 {len(infos)} 页（{passthrough} 张原样嵌入）")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"图片合成PDF失败: {e}")
+            return False
+
+    @instrumented("pdf.stamp")
+    def stamp(self, source_files: List[Path], output_dir: Path, text: str = "DRAFT",
+              csv_path: Optional[Path] = None, position: str = "center", font_size: float = 48,
+              angle: float = 45, opacity: float = 0.3, color: str = "#C00000",
+              workers: Optional[int] = None, compact: bool = True) -> List[Path]:
+        """在每一页上盖章（如 DRAFT 水印、学号），输出为 <原文件名>_盖章.pdf
+
+        印章只渲染一次，放进共享的表单 XObject；每页只追加一条引用它的绘制命令，原内容流不改动。
+        csv_path 给出时按 CSV 逐个文档盖章（此时 source_files 应为空）：file 列为文档路径
+        （相对路径相对于 CSV 所在目录），text 作为模板用同一行的各列填充，如 "{学号} {姓名}"，
+        可选的 output 列为输出文件名。多个文档在进程池中并行处理。
+        返回输出文件列表；单个文档失败时记录错误并跳过。
+        """
+        if position not in STAMP_POSITIONS:
+            self.logger.error(f"不支持的盖章位置: {position}")
+            return []
+
+        if not HAVE_PYPDF or not HAVE_REPORTLAB:
+            self.logger.error("pypdf 或 reportlab 未安装")
+            return []
+
+        try:
+            if csv_path is not None:
+                if source_files:
+                    self.logger.error("指定 CSV 时不能再指定源文件")
+                    return []
+                jobs = read_stamp_csv(csv_path, text)
+            else:
+                jobs = [StampJob(Path(p), text) for p in source_files]
+        except (OSError, ValueError) as e:
+            self.logger.error(f"读取盖章清单失败: {e}")
+            return []
+
+        if not jobs:
+            self.logger.error("没有源文件")
+            return []
+
+        if not self.check_inputs([job.source for job in jobs]):
+            return []
+
+        temp_paths = []
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            outputs = reserve_filenames([
+                output_dir / f"{Path(job.name).stem if job.name else job.source.stem + '_盖章'}{self.file_ext}"
+                for job in jobs])
+            temp_paths = [temp_path_for(path) for path in outputs]
+            options = StampOptions(position, font_size, angle, opacity, color)
+            level = int(performance("compression_level", 6))
+            workers = workers or worker_count("pdf", default_workers())
+
+            written = []
+            with OutputBatch() as batch, stage("stamp"):
+                tasks = [(job.source, temp, job.text) for job, temp in zip(jobs, temp_paths)]
+                results = stamp_documents(tasks, options, compact, level, workers)
+                for job, output, temp, result in zip(jobs, outputs, temp_paths, results):
+                    count_read(job.source)
+                    if isinstance(result, BaseException):
+                        self.logger.error(f"盖章失败: {job.source}: {result}")
+                        get_directory_index().release(output)
+                        continue
+                    batch.add_file(temp, output)
+                    written.append(output)
+                    count_items(result)
+
+            self.logger.info(f"盖章完成 {len(written)}/{len(jobs)} 个PDF文档到: {output_dir}")
+            return written
+
+        except Exception as e:
+            # 进程池中已写完但未提交的临时文件一并删除
+            for temp in temp_paths:
+                temp.unlink(missing_ok=True)
+            self.logger.error(f"盖章失败: {e}")
+            return []
+
+    @instrumented("pdf.set_metadata")
+    def set_metadata(self, paths: Iterable[Path], metadata: Union[Metadata, Callable[[Path], Metadata]],
+                     xmp: bool = True, recursive: bool = True, durable: bool = True,
+                     workers: Optional[int] = None) -> List[MetadataResult]:
+        """批量修改PDF元数据（标题、作者、自定义键等），目录中的PDF一并处理
+
+        以增量更新的方式追加新的信息字典和 XMP，不重写原文件，每个文件只写入几 KB。
+        metadata 为 {"Title": ..., "Author": ...}（值为 None 表示删除），
+        或对每个文件调用的函数，如 lambda p: {"Title": p.stem}。返回每个文件的结果。
+        """
+        if not HAVE_PYPDF:
+            self.logger.error("pypdf 未安装")
+            return []
+
+        files = []
+        for path in paths:
+            path = Path(path)
+            if path.is_dir():
+                files.extend(entry.path for entry in iter_files(path, [self.file_ext], recursive=recursive))
+            else:
+                files.append(path)
+        if not files:
+            self.logger.error("没有PDF文件")
+            return []
+
+        with stage("update"):
+            results = update_metadata_many(files, metadata, xmp, durable, workers or worker_count("metadata", 8))
+
+        updated = [r for r in results if r.ok]
+        count_items(len(updated))
+        record = current_record()
+        if record is not None:
+            record.bytes_written += sum(r.size for r in updated)
+
+        for result in results:
+            if not result.ok:
+                self.logger.error(f"修改元数据失败: {result.path}: {result.error}")
+        self.logger.info(f"修改元数据 {len(updated)}/{len(results)} 个PDF文档")
+        return results
+
+    def transform(self, source_path: Path) -> PageTransform:
+        """页面变换：记录旋转、裁剪、重排、删除操作，调用 write 时一次性写出
+
+        handler.transform(path).rotate(90, "1-3").crop(36, 36, 36, 36).delete("-1").write(output)
+        """
+        return PageTransform(self, source_path)
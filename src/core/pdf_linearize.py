@@ -0,0 +1,37 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import io
+from typing import BinaryIO
+
+try:
+    import pikepdf
+
+    HAVE_PIKEPDF = True
+except ImportError:
+    HAVE_PIKEPDF = False
+
+
+def linearize(data: bytes, stream: BinaryIO):
+    """把完整的 PDF 数据重写为线性化（快速 Web 查看）格式
+
+    首页用到的对象和提示表排在文件开头，按字节范围加载的查看器下载到首页部分即可显示。
+    流数据原样保留（不重新压缩），已有的对象流继续使用，体积与原文件基本相同。
+    """
+    with pikepdf.open(io.BytesIO(data)) as pdf:
+        pdf.save(stream, linearize=True, object_stream_mode=pikepdf.ObjectStreamMode.preserve,
+                 stream_decode_level=pikepdf.StreamDecodeLevel.none, recompress_flate=False)
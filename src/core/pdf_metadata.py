@@ -0,0 +1,375 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import io
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from xml.etree import ElementTree
+
+try:
+    from pypdf import PdfReader
+    from pypdf.generic import (ArrayObject, ByteStringObject, DictionaryObject, IndirectObject, NameObject,
+                               NumberObject, StreamObject, create_string_object)
+
+    HAVE_PYPDF = True
+except ImportError:
+    HAVE_PYPDF = False
+
+# 元数据：{"Title": "...", "Author": "...", "自定义键": "..."}，值为 None 表示删除该项
+Metadata = Dict[str, Optional[str]]
+
+# 在文件末尾这么多字节内查找 startxref
+_TAIL_BYTES = 2048
+
+_NS = {
+    "x": "adobe:ns:meta/",
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "pdf": "http://ns.adobe.com/pdf/1.3/",
+    "xmp": "http://ns.adobe.com/xap/1.0/",
+    "pdfx": "http://ns.adobe.com/pdfx/1.3/",
+}
+# 文档信息字典中的标准键 -> XMP 属性（(命名空间, 名称, 容器类型)）
+_STANDARD_KEYS = {
+    "/Title": ("dc", "title", "Alt"),
+    "/Author": ("dc", "creator", "Seq"),
+    "/Subject": ("dc", "description", "Alt"),
+    "/Keywords": ("pdf", "Keywords", None),
+    "/Producer": ("pdf", "Producer", None),
+    "/Creator": ("xmp", "CreatorTool", None),
+    "/CreationDate": ("xmp", "CreateDate", None),
+    "/ModDate": ("xmp", "ModifyDate", None),
+}
+_DATE_KEYS = ("/CreationDate", "/ModDate")
+_XML_NAME = re.compile(r"^[A-Za-z_][\w.-]*$")
+_PDF_DATE = re.compile(r"D:(\d{4})(\d{2})?(\d{2})?(\d{2})?(\d{2})?(\d{2})?([Zz+-])?(\d{2})?'?(\d{2})?")
+
+
+class MetadataResult:
+    """单个文件的元数据更新结果"""
+
+    __slots__ = ("path", "ok", "size", "error")
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.ok = False
+        self.size = 0
+        self.error = None
+
+    def __repr__(self) -> str:
+        status = f"追加 {self.size} 字节" if self.ok else f"失败: {self.error}"
+        return f"MetadataResult({str(self.path)!r}, {status})"
+
+
+def _pdf_date(timestamp: Optional[float] = None) -> str:
+    """PDF 日期字符串，如 D:20260101120000+08'00'"""
+    local = time.localtime(timestamp)
+    offset = local.tm_gmtoff // 60 if local.tm_gmtoff is not None else 0
+    sign = "+" if offset >= 0 else "-"
+    return time.strftime("D:%Y%m%d%H%M%S", local) + f"{sign}{abs(offset) // 60:02d}'{abs(offset) % 60:02d}'"
+
+
+def _xmp_date(value: str) -> Optional[str]:
+    """PDF 日期转换为 XMP（ISO 8601）日期，无法识别时返回 None"""
+    match = _PDF_DATE.match(value)
+    if match is None:
+        return None
+    year, month, day, hour, minute, second, zone, zone_hour, zone_minute = match.groups()
+    result = f"{year}-{month or '01'}-{day or '01'}T{hour or '00'}:{minute or '00'}:{second or '00'}"
+    if zone in ("Z", "z"):
+        return result + "Z"
+    if zone:
+        return result + f"{zone}{zone_hour or '00'}:{zone_minute or '00'}"
+    return result
+
+
+def _qname(prefix: str, name: str) -> str:
+    return f"{{{_NS[prefix]}}}{name}"
+
+
+def _build_xmp(info: Dict[str, str], existing: Optional[bytes]) -> bytes:
+    """生成与文档信息字典一致的 XMP 数据包；已有 XMP 中的其他属性（如 PDF/A 标识）保留"""
+    root = None
+    if existing:
+        try:
+            for _, (prefix, uri) in ElementTree.iterparse(io.BytesIO(existing), events=("start-ns",)):
+                try:
+                    ElementTree.register_namespace(prefix, uri)
+                except ValueError:
+                    pass
+            root = ElementTree.fromstring(existing)
+        except ElementTree.ParseError:
+            root = None
+    for prefix, uri in _NS.items():
+        ElementTree.register_namespace(prefix, uri)
+
+    if root is None:
+        root = ElementTree.Element(_qname("x", "xmpmeta"))
+    rdf = root if root.tag == _qname("rdf", "RDF") else root.find(_qname("rdf", "RDF"))
+    if rdf is None:
+        rdf = ElementTree.SubElement(root, _qname("rdf", "RDF"))
+    descriptions = rdf.findall(_qname("rdf", "Description"))
+    if not descriptions:
+        description = ElementTree.SubElement(rdf, _qname("rdf", "Description"))
+        description.set(_qname("rdf", "about"), "")
+        descriptions = [description]
+
+    # 先去掉由文档信息字典决定的属性（元素和简写的属性形式），再按当前值重新写入
+    managed = {_qname(prefix, name) for prefix, name, _ in _STANDARD_KEYS.values()}
+    managed.add(_qname("xmp", "MetadataDate"))
+    for description in descriptions:
+        for child in list(description):
+            if child.tag in managed or child.tag.startswith(f"{{{_NS['pdfx']}}}"):
+                description.remove(child)
+        for attribute in list(description.attrib):
+            if attribute in managed or attribute.startswith(f"{{{_NS['pdfx']}}}"):
+                del description.attrib[attribute]
+
+    description = descriptions[0]
+    for key, value in info.items():
+        if key in _STANDARD_KEYS:
+            prefix, name, container = _STANDARD_KEYS[key]
+            if key in _DATE_KEYS:
+                value = _xmp_date(value)
+                if value is None:
+                    continue
+            element = ElementTree.SubElement(description, _qname(prefix, name))
+            if container is None:
+                element.text = value
+                continue
+            items = ElementTree.SubElement(element, _qname("rdf", container))
+            item = ElementTree.SubElement(items, _qname("rdf", "li"))
+            if container == "Alt":
+                item.set("{http://www.w3.org/XML/1998/namespace}lang", "x-default")
+            item.text = value
+        elif _XML_NAME.match(key[1:]):
+            # 自定义键放在 pdfx 命名空间（Acrobat 的约定）；不是合法 XML 名称的键只写入信息字典
+            ElementTree.SubElement(description, _qname("pdfx", key[1:])).text = value
+    ElementTree.SubElement(description, _qname("xmp", "MetadataDate")).text = _xmp_date(_pdf_date())
+
+    body = ElementTree.tostring(root, encoding="unicode")
+    return ('<?xpacket begin="\ufeff" id="W5M0MpCehiHzreSzNTczkc9d"?>\n' + body +
+            '\n<?xpacket end="w"?>').encode("utf-8")
+
+
+def _last_xref(f, file_size: int) -> Tuple[int, bool]:
+    """最后一个交叉引用段的偏移，以及它是否为交叉引用流"""
+    f.seek(max(0, file_size - _TAIL_BYTES))
+    tail = f.read()
+    position = tail.rfind(b"startxref")
+    match = re.match(rb"startxref\s+(\d+)", tail[position:]) if position >= 0 else None
+    if match is None:
+        raise ValueError("找不到 startxref")
+    offset = int(match.group(1))
+    f.seek(offset)
+    head = f.read(32)
+    if head.startswith(b"xref"):
+        return offset, False
+    if re.match(rb"\d+\s+\d+\s+obj", head):
+        return offset, True
+    # 偏移量不对的文件需要完整重写才能修复，增量更新会让引用更加混乱
+    raise ValueError("交叉引用偏移量无效")
+
+
+def _serialize(obj) -> bytes:
+    buffer = io.BytesIO()
+    obj.write_to_stream(buffer)
+    return buffer.getvalue()
+
+
+def _xref_runs(numbers: List[int]) -> List[List[int]]:
+    """把对象编号分成连续的段"""
+    runs = []
+    for number in sorted(numbers):
+        if runs and runs[-1][-1] + 1 == number:
+            runs[-1].append(number)
+        else:
+            runs.append([number])
+    return runs
+
+
+def _merged_info(old_info, metadata: Metadata) -> Tuple[DictionaryObject, Dict[str, str]]:
+    """合并后的信息字典，以及其中的文本值（用于生成 XMP）"""
+    info = DictionaryObject()
+    if old_info is not None:
+        for key in old_info:
+            info[NameObject(key)] = old_info.raw_get(key)
+    names = {NameObject(key if key.startswith("/") else f"/{key}"): value for key, value in metadata.items()}
+    for name, value in names.items():
+        if value is None:
+            info.pop(name, None)
+        else:
+            info[name] = create_string_object(str(value))
+    if "/ModDate" not in names:
+        info[NameObject("/ModDate")] = create_string_object(_pdf_date())
+
+    texts = {}
+    for key in info:
+        value = info[key]
+        # 只有文本值写入 XMP（/Trapped 等名称值不写）
+        if isinstance(value, str) and not isinstance(value, NameObject):
+            texts[key] = str(value)
+    return info, texts
+
+
+def update_metadata(path: Path, metadata: Metadata, xmp: bool = True, durable: bool = True) -> int:
+    """以增量更新的方式修改 PDF 元数据，返回追加的字节数
+
+    原文件内容不变，只在末尾追加新的信息字典（和 XMP 元数据流）、交叉引用段和 trailer（/Prev 指向原交叉引用），
+    I/O 只有几 KB。原文件以交叉引用流结尾时追加的也是交叉引用流。
+    """
+    with open(path, "r+b") as f:
+        file_size = f.seek(0, os.SEEK_END)
+        prev, use_stream = _last_xref(f, file_size)
+        reader = PdfReader(f, strict=False)
+        if reader.is_encrypted:
+            raise ValueError("加密文档不支持增量修改元数据")
+
+        trailer = reader.trailer
+        root_ref = trailer.raw_get("/Root")
+        next_number = int(trailer["/Size"])
+        objects: Dict[int, Tuple[int, bytes]] = {}
+
+        def allocate() -> int:
+            nonlocal next_number
+            next_number += 1
+            return next_number - 1
+
+        old_info_ref = trailer.raw_get("/Info") if "/Info" in trailer else None
+        old_info = old_info_ref.get_object() if old_info_ref is not None else None
+        info, texts = _merged_info(old_info, metadata)
+        if isinstance(old_info_ref, IndirectObject):
+            info_ref = (old_info_ref.idnum, old_info_ref.generation)
+        else:
+            info_ref = (allocate(), 0)
+        objects[info_ref[0]] = (info_ref[1], _serialize(info))
+
+        if xmp:
+            catalog = root_ref.get_object()
+            metadata_ref = catalog.raw_get("/Metadata") if "/Metadata" in catalog else None
+            existing = None
+            if metadata_ref is not None:
+                try:
+                    existing = metadata_ref.get_object().get_data()
+                except Exception:
+                    existing = None
+            packet = _build_xmp(texts, existing)
+            stream = StreamObject()
+            stream[NameObject("/Type")] = NameObject("/Metadata")
+            stream[NameObject("/Subtype")] = NameObject("/XML")
+            stream._data = packet
+            if isinstance(metadata_ref, IndirectObject):
+                objects[metadata_ref.idnum] = (metadata_ref.generation, _serialize(stream))
+            else:
+                # 目录中还没有（或直接内嵌了）XMP：新建元数据流，并追加一个引用它的新版本目录
+                number = allocate()
+                objects[number] = (0, _serialize(stream))
+                new_catalog = DictionaryObject({NameObject(key): catalog.raw_get(key) for key in catalog})
+                new_catalog[NameObject("/Metadata")] = IndirectObject(number, 0, None)
+                objects[root_ref.idnum] = (root_ref.generation, _serialize(new_catalog))
+
+        # 文件标识：第一部分保持不变，第二部分在每次修改后更新
+        old_id = trailer.get("/ID")
+        changed = hashlib.md5(f"{path}{file_size}{time.time_ns()}".encode()).digest()
+        first = bytes(getattr(old_id[0], "original_bytes", old_id[0])) if old_id else changed
+        file_id = ArrayObject([ByteStringObject(first), ByteStringObject(changed)])
+
+        # 追加内容：对象、交叉引用、trailer
+        f.seek(file_size - 1)
+        separator = b"" if f.read(1) in (b"\n", b"\r") else b"\n"
+        update = io.BytesIO()
+        update.write(separator)
+        offsets = {}
+        for number, (generation, data) in sorted(objects.items()):
+            offsets[number] = (file_size + update.tell(), generation)
+            update.write(f"{number} {generation} obj\n".encode() + data + b"\nendobj\n")
+
+        new_trailer = DictionaryObject({
+            NameObject("/Root"): IndirectObject(root_ref.idnum, root_ref.generation, None),
+            NameObject("/Info"): IndirectObject(info_ref[0], info_ref[1], None),
+            NameObject("/Prev"): NumberObject(prev),
+            NameObject("/ID"): file_id,
+        })
+        xref_offset = file_size + update.tell()
+        if use_stream:
+            xref_number = allocate()
+            offsets[xref_number] = (xref_offset, 0)
+            runs = _xref_runs(list(offsets))
+            width = 4 if xref_offset < 2 ** 32 else 8
+            rows = b"".join(bytes([1]) + offsets[n][0].to_bytes(width, "big") + offsets[n][1].to_bytes(2, "big")
+                            for run in runs for n in run)
+            data = zlib.compress(rows)
+            new_trailer.update({
+                NameObject("/Type"): NameObject("/XRef"),
+                NameObject("/Size"): NumberObject(next_number),
+                NameObject("/Index"): ArrayObject([NumberObject(v) for run in runs for v in (run[0], len(run))]),
+                NameObject("/W"): ArrayObject([NumberObject(1), NumberObject(width), NumberObject(2)]),
+                NameObject("/Filter"): NameObject("/FlateDecode"),
+                NameObject("/Length"): NumberObject(len(data)),
+            })
+            update.write(f"{xref_number} 0 obj\n".encode() + _serialize(new_trailer) +
+                         b"\nstream\n" + data + b"\nendstream\nendobj\n")
+        else:
+            update.write(b"xref\n")
+            for run in _xref_runs(list(offsets)):
+                update.write(f"{run[0]} {len(run)}\n".encode())
+                for number in run:
+                    offset, generation = offsets[number]
+                    update.write(f"{offset:010d} {generation:05d} n\r\n".encode())
+            new_trailer[NameObject("/Size")] = NumberObject(next_number)
+            update.write(b"trailer\n" + _serialize(new_trailer) + b"\n")
+        update.write(f"startxref\n{xref_offset}\n%%EOF\n".encode())
+
+        data = update.getvalue()
+        f.seek(file_size)
+        try:
+            f.write(data)
+            f.flush()
+            if durable:
+                os.fsync(f.fileno())
+        except BaseException:
+            # 写到一半失败时截回原长度，文件保持修改前的状态
+            f.truncate(file_size)
+            raise
+    return len(data)
+
+
+def update_metadata_many(paths: Iterable[Path], metadata: Union[Metadata, Callable[[Path], Metadata]],
+                         xmp: bool = True, durable: bool = True, workers: int = 8) -> List[MetadataResult]:
+    """在线程池中批量修改元数据；metadata 可以是对每个文件调用的函数，如 lambda p: {"Title": p.stem}"""
+
+    def run(path: Path) -> MetadataResult:
+        result = MetadataResult(path)
+        try:
+            values = metadata(path) if callable(metadata) else metadata
+            result.size = update_metadata(path, values, xmp, durable)
+            result.ok = True
+        except Exception as e:
+            result.error = str(e)
+        return result
+
+    paths = list(paths)
+    if workers <= 1 or len(paths) <= 1:
+        return [run(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, paths))
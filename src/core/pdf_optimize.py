@@ -0,0 +1,291 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import io
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from ..utils.settings import default_workers, worker_count
+
+try:
+    from pypdf.filters import ASCII85Decode, ASCIIHexDecode
+    from pypdf.generic import IndirectObject, NameObject, NumberObject, StreamObject
+
+    # 可以无损去掉的外层文本编码
+    _ASCII_FILTERS = {
+        "/ASCII85Decode": ASCII85Decode, "/A85": ASCII85Decode,
+        "/ASCIIHexDecode": ASCIIHexDecode, "/AHx": ASCIIHexDecode,
+    }
+    HAVE_PYPDF = True
+except ImportError:
+    HAVE_PYPDF = False
+
+try:
+    from PIL import Image
+
+    HAVE_PIL = True
+except ImportError:
+    HAVE_PIL = False
+
+# 报告中的分类
+CATEGORIES = ("content", "images", "streams", "structure")
+
+# 实际分辨率超过目标的该倍数才重新采样，避免为很小的收益损失画质
+_DOWNSAMPLE_THRESHOLD = 1.25
+# 待处理数据总量低于该值时不启动进程池，直接在当前进程处理
+_POOL_MIN_BYTES = 2 * 1024 * 1024
+
+_COLOR_MODES = {"/DeviceRGB": "RGB", "/DeviceGray": "L"}
+
+
+class ImageJob:
+    """一张需要处理的图片（可在进程间传递）"""
+
+    __slots__ = ("key", "data", "filters", "width", "height", "mode", "new_size", "quality")
+
+    def __init__(self, key, data, filters, width, height, mode, new_size, quality):
+        self.key = key
+        self.data = data
+        self.filters = filters
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.new_size = new_size
+        self.quality = quality
+
+
+def _process_image(job: ImageJob) -> Tuple[bytes, Optional[bytes], Optional[str], int, int]:
+    """去掉 ASCII 编码，需要时缩小并重新编码为 JPEG
+
+    返回 (key, 新数据, 新过滤器, 宽, 高)；结果没有变小时新数据为 None。
+    """
+    data = job.data
+    filters = list(job.filters)
+    while len(filters) > 1 and filters[0] in _ASCII_FILTERS:
+        data = _ASCII_FILTERS[filters.pop(0)].decode(data)
+
+    width, height = job.width, job.height
+    if job.new_size is not None and len(filters) <= 1:
+        if not filters:
+            # 未压缩的原始像素
+            image = Image.frombytes(job.mode, (width, height), data)
+        elif filters[0] == "/DCTDecode":
+            image = Image.open(io.BytesIO(data))
+            # JPEG 可以在解码时按 1/2、1/4、1/8 缩小，省去大部分解码工作
+            image.draft(job.mode, job.new_size)
+        else:
+            image = Image.frombytes(job.mode, (width, height), zlib.decompress(data))
+        if image.mode != job.mode:
+            image = image.convert(job.mode)
+        image = image.resize(job.new_size, Image.Resampling.LANCZOS)
+
+        output = io.BytesIO()
+        image.save(output, "JPEG", quality=job.quality, optimize=True)
+        if len(output.getvalue()) < len(data):
+            data, filters = output.getvalue(), ["/DCTDecode"]
+            width, height = image.width, image.height
+
+    if len(filters) != 1 or len(data) >= len(job.data):
+        return job.key, None, None, job.width, job.height
+    return job.key, data, filters[0], width, height
+
+
+def _stream_size(obj) -> int:
+    """流对象当前（编码后）的数据长度"""
+    data = obj._data if obj._data is not None else b""
+    return len(data)
+
+
+def compress_streams(writer, level: int) -> Dict[str, int]:
+    """重新压缩页面内容流和其他未压缩的流（包括未压缩的图片），返回各分类节省的字节数"""
+    saved = {"content": 0, "streams": 0}
+    content_ids = set()
+
+    for page in writer.pages:
+        contents = page.raw_get("/Contents") if "/Contents" in page else None
+        refs = contents if isinstance(contents, list) else [contents]
+        before = 0
+        for ref in refs:
+            if isinstance(ref, IndirectObject):
+                content_ids.add(ref.idnum)
+                before += _stream_size(ref.get_object())
+        if not before:
+            continue
+        page.compress_content_streams(level)
+        after = page.raw_get("/Contents")
+        if isinstance(after, IndirectObject):
+            content_ids.add(after.idnum)
+            saved["content"] += before - _stream_size(after.get_object())
+
+    for idnum, obj in enumerate(writer._objects, start=1):
+        if idnum in content_ids or not isinstance(obj, StreamObject):
+            continue
+        # 已压缩的流保持原样；未压缩的图片用 Flate 无损压缩，之后仍可重新采样
+        if "/Filter" in obj:
+            continue
+        before = _stream_size(obj)
+        if before < 64:
+            continue
+        encoded = obj.flate_encode(level)
+        after = _stream_size(encoded)
+        if after < before:
+            writer._objects[idnum - 1] = encoded
+            encoded.indirect_reference = IndirectObject(idnum, 0, writer)
+            saved["streams"] += before - after
+    return saved
+
+
+def _filters(image) -> List[str]:
+    """图片的过滤器列表"""
+    filters = image.get("/Filter")
+    if filters is None:
+        return []
+    if isinstance(filters, list):
+        return [str(f) for f in filters]
+    return [str(filters)]
+
+
+def _collect_images(writer):
+    """收集页面上的图片对象，按内容分组（数据和属性都相同的为一组），并记录所在的最大页面尺寸（英寸）"""
+    groups: Dict[bytes, List[IndirectObject]] = {}
+    sizes: Dict[int, Tuple[float, float]] = {}
+    for page in writer.pages:
+        resources = page.get("/Resources")
+        xobjects = resources.get("/XObject") if resources else None
+        if not xobjects:
+            continue
+        size = (float(page.mediabox.width) / 72, float(page.mediabox.height) / 72)
+        for ref in xobjects.get_object().values():
+            if not isinstance(ref, IndirectObject):
+                continue
+            if ref.idnum in sizes:
+                old = sizes[ref.idnum]
+                sizes[ref.idnum] = (max(old[0], size[0]), max(old[1], size[1]))
+                continue
+            image = ref.get_object()
+            if not isinstance(image, StreamObject) or image.get("/Subtype") != "/Image":
+                continue
+            sizes[ref.idnum] = size
+            h = hashlib.blake2b(image._data or b"", digest_size=16)
+            for key in sorted(image.keys()):
+                if key != "/Length":
+                    h.update(f"{key}={image.raw_get(key)!r};".encode())
+            groups.setdefault(h.digest(), []).append(ref)
+    return groups, sizes
+
+
+def _replace_references(writer, mapping: Dict[int, IndirectObject]):
+    """把所有指向重复对象的引用改为指向保留的对象，并删除重复对象"""
+
+    def walk(obj):
+        if isinstance(obj, dict):
+            items = list(obj.items())
+        elif isinstance(obj, list):
+            items = list(enumerate(obj))
+        else:
+            return
+        for key, value in items:
+            if isinstance(value, IndirectObject):
+                target = mapping.get(value.idnum)
+                if target is not None:
+                    obj[key] = target
+            else:
+                walk(value)
+
+    for obj in writer._objects:
+        if obj is not None:
+            walk(obj)
+    for idnum in mapping:
+        writer._objects[idnum - 1] = None
+
+
+def _image_job(key: bytes, image, page_size: Tuple[float, float], target_dpi: int,
+               quality: int) -> Optional[ImageJob]:
+    """图片带 ASCII 编码或分辨率超过目标时生成处理任务"""
+    filters = _filters(image)
+    ascii_wrapped = len(filters) > 1 and filters[0] in _ASCII_FILTERS and "/DecodeParms" not in image
+    inner = [f for f in filters if f not in _ASCII_FILTERS] if ascii_wrapped else filters
+
+    new_size = None
+    mode = _COLOR_MODES.get(image.get("/ColorSpace"))
+    # 带蒙版、解码数组或非 8 位的图片不重新采样
+    resamplable = (HAVE_PIL and mode is not None and image.get("/BitsPerComponent") == 8
+                   and (not inner or inner in (["/DCTDecode"], ["/FlateDecode"]))
+                   and not any(k in image for k in ("/SMask", "/Mask", "/ImageMask", "/Decode", "/DecodeParms"))
+                   and page_size[0] > 0 and page_size[1] > 0)
+    width, height = int(image["/Width"]), int(image["/Height"])
+    if resamplable and not inner and len(image._data or b"") < width * height * len(mode):
+        # 原始像素数据不完整
+        resamplable = False
+    if resamplable:
+        # 按图片铺满页面估算分辨率（实际绘制更小时分辨率更高，缩小后仍不低于目标）
+        dpi = max(width / page_size[0], height / page_size[1])
+        if dpi > target_dpi * _DOWNSAMPLE_THRESHOLD:
+            scale = target_dpi / dpi
+            new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+
+    if new_size is None and not ascii_wrapped:
+        return None
+    return ImageJob(key, image._data, filters, width, height, mode, new_size, quality)
+
+
+def optimize_images(writer, target_dpi: int, quality: int, workers: Optional[int] = None) -> int:
+    """合并重复图片，在进程池中去掉 ASCII 编码并缩小高分辨率图片，返回节省的字节数"""
+    groups, sizes = _collect_images(writer)
+    if not groups:
+        return 0
+
+    saved = 0
+    # 内容相同的图片只保留一个对象
+    mapping = {}
+    for refs in groups.values():
+        for ref in refs[1:]:
+            mapping[ref.idnum] = refs[0]
+            saved += len(ref.get_object()._data or b"")
+    if mapping:
+        _replace_references(writer, mapping)
+
+    jobs = []
+    for key, refs in groups.items():
+        job = _image_job(key, refs[0].get_object(), sizes[refs[0].idnum], target_dpi, quality)
+        if job is not None:
+            jobs.append(job)
+    if not jobs:
+        return saved
+
+    workers = workers or worker_count("image", default_workers())
+    if workers > 1 and len(jobs) > 1 and sum(len(job.data) for job in jobs) >= _POOL_MIN_BYTES:
+        # 使用 spawn：在多线程进程（GUI、服务）中 fork 不安全
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context) as executor:
+            results = list(executor.map(_process_image, jobs))
+    else:
+        results = [_process_image(job) for job in jobs]
+
+    for key, data, filter_name, width, height in results:
+        if data is None:
+            continue
+        image = groups[key][0].get_object()
+        saved += len(image._data) - len(data)
+        image._data = data
+        image[NameObject("/Filter")] = NameObject(filter_name)
+        image[NameObject("/Width")] = NumberObject(width)
+        image[NameObject("/Height")] = NumberObject(height)
+    return saved
@@ -0,0 +1,315 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import csv
+import functools
+import io
+import math
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .pdf_compact import write_compact
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.generic import (ArrayObject, DecodedStreamObject, DictionaryObject, FloatObject,
+                               IndirectObject, NameObject)
+
+    HAVE_PYPDF = True
+except ImportError:
+    HAVE_PYPDF = False
+
+try:
+    from reportlab.lib.colors import HexColor
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.pdfgen import canvas
+
+    HAVE_REPORTLAB = True
+except ImportError:
+    HAVE_REPORTLAB = False
+
+STAMP_POSITIONS = ("center", "top-left", "top-right", "bottom-left", "bottom-right")
+# 角落位置与页边的距离（磅）
+_MARGIN = 36
+# 中文使用 reportlab 内置的 CID 字体（阅读器自带，不需要嵌入）
+_LATIN_FONT = "Helvetica-Bold"
+_CJK_FONT = "STSong-Light"
+
+
+class StampOptions(NamedTuple):
+    """印章样式"""
+    position: str = "center"
+    font_size: float = 48
+    angle: float = 45
+    opacity: float = 0.3
+    color: str = "#C00000"
+
+
+class StampJob(NamedTuple):
+    """一个待盖章的文档"""
+    source: Path
+    text: str
+    name: Optional[str] = None
+
+
+def read_stamp_csv(csv_path: Path, template: str) -> List[StampJob]:
+    """读取盖章清单：file 列为文档路径，template 用同一行的各列填充，可选 output 列为输出文件名"""
+    csv_path = Path(csv_path)
+    try:
+        content = csv_path.read_text(encoding="utf-8-sig")
+    except UnicodeDecodeError:
+        # Excel 在中文系统上默认导出 GBK 编码的 CSV
+        content = csv_path.read_text(encoding="gbk")
+
+    jobs = []
+    for line, row in enumerate(csv.DictReader(io.StringIO(content)), start=2):
+        row = {key.strip(): (value or "").strip() for key, value in row.items() if key}
+        if not row.get("file"):
+            raise ValueError(f"CSV 第 {line} 行缺少 file 列")
+        source = Path(row["file"])
+        if not source.is_absolute():
+            source = csv_path.parent / source
+        try:
+            text = template.format_map(row)
+        except KeyError as e:
+            raise ValueError(f"CSV 中没有列: {e.args[0]}")
+        jobs.append(StampJob(source, text, row.get("output") or None))
+    return jobs
+
+
+def _font_for(text: str) -> str:
+    """选择能显示文字的字体"""
+    if text.isascii():
+        return _LATIN_FONT
+    if _CJK_FONT not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(UnicodeCIDFont(_CJK_FONT))
+    return _CJK_FONT
+
+
+@functools.lru_cache(maxsize=64)
+def render_stamp(text: str, options: StampOptions) -> bytes:
+    """用 reportlab 渲染印章，页面大小正好包住旋转后的文字，返回单页 PDF 数据"""
+    font = _font_for(text)
+    lines = text.splitlines() or [""]
+    leading = options.font_size * 1.2
+    width = max(pdfmetrics.stringWidth(line, font, options.font_size) for line in lines)
+    height = leading * len(lines)
+
+    radians = math.radians(options.angle)
+    cos, sin = abs(math.cos(radians)), abs(math.sin(radians))
+    page_width = width * cos + height * sin + 2
+    page_height = width * sin + height * cos + 2
+
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(page_width, page_height))
+    c.setFillColor(HexColor(options.color))
+    c.setFillAlpha(options.opacity)
+    c.setFont(font, options.font_size)
+    c.translate(page_width / 2, page_height / 2)
+    c.rotate(options.angle)
+    # 多行文字整体垂直居中（基线约在字号的 0.3 倍处）
+    top = height / 2 - leading + (leading - options.font_size * 0.7) / 2
+    for i, line in enumerate(lines):
+        c.drawCentredString(0, top - i * leading, line)
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _visual_to_user(box: Tuple[float, float, float, float], rotation: int) -> Tuple[float, ...]:
+    """页面显示坐标（已按 /Rotate 旋转）到页面用户空间的变换矩阵"""
+    x0, y0, x1, y1 = box
+    if rotation == 90:
+        return 0, 1, -1, 0, x1, y0
+    if rotation == 180:
+        return -1, 0, 0, -1, x1, y1
+    if rotation == 270:
+        return 0, -1, 1, 0, x0, y1
+    return 1, 0, 0, 1, x0, y0
+
+
+def _inherited(page, key: str):
+    """读取页面属性，页面上没有时沿 /Parent 查找继承值"""
+    node = page
+    while node is not None:
+        if key in node:
+            return node.raw_get(key)
+        node = node.get("/Parent")
+    return None
+
+
+class PageStamper:
+    """把印章做成一个共享的表单 XObject，每页只追加一条绘制命令（页面原内容流不改动）"""
+
+    def __init__(self, writer, stamp_pdf: bytes, position: str = "center"):
+        self.writer = writer
+        self.position = position
+
+        stamp_page = PdfReader(io.BytesIO(stamp_pdf)).pages[0]
+        self.width = float(stamp_page.mediabox.width)
+        self.height = float(stamp_page.mediabox.height)
+        form = DecodedStreamObject()
+        form.set_data(stamp_page.get_contents().get_data())
+        form[NameObject("/Type")] = NameObject("/XObject")
+        form[NameObject("/Subtype")] = NameObject("/Form")
+        form[NameObject("/BBox")] = ArrayObject(
+            [FloatObject(0), FloatObject(0), FloatObject(self.width), FloatObject(self.height)])
+        form[NameObject("/Resources")] = stamp_page["/Resources"].get_object().clone(writer)
+        self.form_ref = writer._add_object(form.flate_encode())
+
+        # 页面原内容可能改变了图形状态（未配对的 q/Q、cm），先保存，盖章前恢复
+        save = DecodedStreamObject()
+        save.set_data(b"q\n")
+        self._save_ref = writer._add_object(save)
+        # (资源名, 页面框, 旋转) -> 绘制命令；尺寸相同的页面共用一个内容流
+        self._draws: Dict[Tuple, IndirectObject] = {}
+        # 继承的直接资源字典 -> 改为间接对象后的引用
+        self._shared: Dict[int, IndirectObject] = {}
+
+    def _resource_name(self, page) -> NameObject:
+        """在页面资源中登记表单，返回引用它的名称（避开已有的同名资源）"""
+        raw = _inherited(page, "/Resources")
+        resources = raw.get_object() if raw is not None else DictionaryObject()
+        if "/Resources" not in page:
+            # 继承来的资源改为页面直接引用，不在每页重复写出
+            if not isinstance(raw, IndirectObject):
+                raw = self._shared.get(id(resources))
+                if raw is None:
+                    raw = self._shared[id(resources)] = self.writer._add_object(resources)
+            page[NameObject("/Resources")] = raw
+
+        xobjects = resources.get("/XObject")
+        if xobjects is None:
+            xobjects = resources[NameObject("/XObject")] = DictionaryObject()
+        else:
+            xobjects = xobjects.get_object()
+
+        index = 0
+        while True:
+            name = NameObject(f"/WPStamp{index}" if index else "/WPStamp")
+            if name not in xobjects:
+                xobjects[name] = self.form_ref
+                return name
+            if xobjects.raw_get(name) == self.form_ref:
+                return name
+            index += 1
+
+    def _draw(self, name: NameObject, box: Tuple[float, ...], rotation: int) -> IndirectObject:
+        """把印章放到页面指定位置的绘制命令"""
+        key = (name, box, rotation)
+        ref = self._draws.get(key)
+        if ref is not None:
+            return ref
+
+        x0, y0, x1, y1 = box
+        visual_width, visual_height = (y1 - y0, x1 - x0) if rotation in (90, 270) else (x1 - x0, y1 - y0)
+        if self.position == "center":
+            tx, ty = (visual_width - self.width) / 2, (visual_height - self.height) / 2
+        else:
+            vertical, horizontal = self.position.split("-")
+            tx = _MARGIN if horizontal == "left" else visual_width - self.width - _MARGIN
+            ty = _MARGIN if vertical == "bottom" else visual_height - self.height - _MARGIN
+
+        a, b, c, d, e, f = _visual_to_user(box, rotation)
+        matrix = (a, b, c, d, e + a * tx + c * ty, f + b * tx + d * ty)
+        draw = DecodedStreamObject()
+        draw.set_data(f"Q q {' '.join(f'{v:.4f}'.rstrip('0').rstrip('.') for v in matrix)} cm "
+                      f"{name} Do Q\n".encode())
+        ref = self._draws[key] = self.writer._add_object(draw)
+        return ref
+
+    def stamp(self, page):
+        """在页面上盖章"""
+        name = self._resource_name(page)
+        box = tuple(round(float(v), 4) for v in page.cropbox)
+        ref = self._draw(name, box, int(_inherited(page, "/Rotate") or 0) % 360)
+
+        contents = page.raw_get("/Contents") if "/Contents" in page else None
+        items = []
+        if contents is not None:
+            obj = contents.get_object()
+            if isinstance(obj, ArrayObject):
+                items = list(obj)
+            elif isinstance(contents, IndirectObject):
+                items = [contents]
+            else:
+                items = [self.writer._add_object(obj)]
+        page[NameObject("/Contents")] = ArrayObject([self._save_ref, *items, ref])
+
+
+def stamp_document(source: Path, output: Path, text: str, options: StampOptions,
+                   compact: bool = True, level: int = 6) -> int:
+    """给一个文档的每一页盖章并写出到 output，返回页数"""
+    with open(source, "rb") as f:
+        reader = PdfReader(f)
+        if reader.is_encrypted:
+            reader.decrypt("")
+        writer = PdfWriter(clone_from=reader)
+        stamper = PageStamper(writer, render_stamp(text, options), options.position)
+        for page in writer.pages:
+            stamper.stamp(page)
+
+        with open(output, "wb") as out:
+            if compact:
+                write_compact(writer, out, level)
+            else:
+                writer.write(out)
+    return len(writer.pages)
+
+
+def _stamp_task(source: str, output: str, text: str, options: StampOptions, compact: bool, level: int) -> int:
+    """工作进程中盖章一个文档；失败时删除写了一半的输出"""
+    try:
+        return stamp_document(Path(source), Path(output), text, options, compact, level)
+    except BaseException:
+        try:
+            os.unlink(output)
+        except OSError:
+            pass
+        raise
+
+
+def stamp_documents(tasks: List[Tuple[Path, Path, str]], options: StampOptions, compact: bool = True,
+                    level: int = 6, workers: int = 1) -> Iterator[Union[int, BaseException]]:
+    """按顺序处理一批 (源文件, 输出文件, 文字)，逐个返回页数或异常；多个文档时在进程池中并行"""
+    args = [(str(source), str(output), text, options, compact, level) for source, output, text in tasks]
+    workers = min(workers, len(args))
+    if workers <= 1:
+        for task in args:
+            try:
+                yield _stamp_task(*task)
+            except Exception as e:
+                yield e
+        return
+
+    # 使用 spawn：在多线程进程（GUI、服务）中 fork 不安全
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        pending = deque()
+        for task in args:
+            pending.append(executor.submit(_stamp_task, *task))
+            if len(pending) >= workers * 2:
+                future = pending.popleft()
+                yield future.exception() or future.result()
+        while pending:
+            future = pending.popleft()
+            yield future.exception() or future.result()
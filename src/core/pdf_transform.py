@@ -0,0 +1,212 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+from ..utils.metrics import count_items, count_read, instrumented, stage
+from ..utils.output_writer import atomic_output
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.generic import NameObject, NumberObject, RectangleObject
+
+    HAVE_PYPDF = True
+except ImportError:
+    HAVE_PYPDF = False
+
+# 页码：单个页码、页码列表，或 "1-3,5,-1" 形式的字符串（从 1 开始，负数从末尾数起），None 表示全部页面
+Pages = Union[None, int, str, Iterable[int]]
+
+
+def parse_pages(pages: Pages, count: int) -> List[int]:
+    """把页码解析为从 0 开始的位置列表"""
+    if pages is None:
+        return list(range(count))
+    if isinstance(pages, int):
+        numbers = [pages]
+    elif isinstance(pages, str):
+        numbers = []
+        for part in pages.replace("，", ",").split(","):
+            part = part.strip()
+            if not part:
+                continue
+            start, sep, stop = part.partition("-") if not part.startswith("-") else (part, "", "")
+            if sep:
+                first, last = int(start), int(stop) if stop.strip() else count
+                numbers.extend(range(first, last + 1))
+            else:
+                numbers.append(int(start))
+    else:
+        numbers = [int(n) for n in pages]
+
+    positions = []
+    for number in numbers:
+        position = number - 1 if number > 0 else count + number
+        if number == 0 or not 0 <= position < count:
+            raise ValueError(f"页码超出范围: {number}，总页数: {count}")
+        positions.append(position)
+    return positions
+
+
+def _inherited(page, key: str):
+    """读取页面属性，页面上没有时沿 /Parent 查找继承值"""
+    node = page
+    while node is not None:
+        if key in node:
+            return node[key]
+        node = node.get("/Parent")
+    return None
+
+
+class PageTransform:
+    """PDF 页面变换（旋转、裁剪、重排、删除）：操作先记录下来，写出时一次性应用
+
+    只修改输出中页面字典的 /Rotate 和 /CropBox，内容流和图片原样复制，不解码也不重新压缩。
+    页码都指执行该操作时的页面顺序（即前面的删除、重排已经生效）。
+    """
+
+    def __init__(self, handler, source_path: Path):
+        self.handler = handler
+        self.logger = handler.logger
+        self.source_path = Path(source_path)
+        self._operations: List[Tuple] = []
+
+    def rotate(self, degrees: int, pages: Pages = None) -> "PageTransform":
+        """顺时针旋转（90 的倍数）"""
+        if degrees % 90:
+            raise ValueError(f"旋转角度必须是 90 的倍数: {degrees}")
+        self._operations.append(("rotate", degrees, pages))
+        return self
+
+    def crop(self, left: float = 0, bottom: float = 0, right: float = 0, top: float = 0,
+             pages: Pages = None) -> "PageTransform":
+        """裁掉页边（磅），方向按页面显示时（已旋转）的上下左右"""
+        self._operations.append(("crop", (left, bottom, right, top), pages))
+        return self
+
+    def reorder(self, order: Pages) -> "PageTransform":
+        """按新的顺序排列页面，order 必须包含每一页且只出现一次"""
+        self._operations.append(("reorder", order))
+        return self
+
+    def delete(self, pages: Pages) -> "PageTransform":
+        """删除页面"""
+        self._operations.append(("delete", pages))
+        return self
+
+    def apply_spec(self, operations: Iterable[Dict]) -> "PageTransform":
+        """按列表记录操作，如 [{"op": "rotate", "degrees": 90, "pages": "1-3"}, {"op": "delete", "pages": "-1"}]"""
+        for spec in operations:
+            spec = dict(spec)
+            op = spec.pop("op", None)
+            if op == "rotate":
+                self.rotate(int(spec["degrees"]), spec.get("pages"))
+            elif op == "crop":
+                self.crop(*(float(spec.get(key, 0)) for key in ("left", "bottom", "right", "top")),
+                          pages=spec.get("pages"))
+            elif op == "reorder":
+                self.reorder(spec["order"])
+            elif op == "delete":
+                self.delete(spec["pages"])
+            else:
+                raise ValueError(f"不支持的页面操作: {op}")
+        return self
+
+    def _plan(self, pages: Sequence) -> Tuple[List[int], Dict[int, int], Dict[int, List[float]]]:
+        """依次应用记录的操作，得到输出页面（源页面序号）以及改变了的旋转角度和裁剪框"""
+        order = list(range(len(pages)))
+        rotations: Dict[int, int] = {}
+        boxes: Dict[int, List[float]] = {}
+
+        def rotation_of(index: int) -> int:
+            if index not in rotations:
+                return int(_inherited(pages[index], "/Rotate") or 0) % 360
+            return rotations[index]
+
+        for operation in self._operations:
+            kind = operation[0]
+            if kind == "rotate":
+                _, degrees, spec = operation
+                for position in parse_pages(spec, len(order)):
+                    index = order[position]
+                    rotations[index] = (rotation_of(index) + degrees) % 360
+            elif kind == "crop":
+                _, margins, spec = operation
+                for position in parse_pages(spec, len(order)):
+                    index = order[position]
+                    box = boxes.get(index) or [float(v) for v in pages[index].cropbox]
+                    # 显示方向的 (左, 下, 右, 上) 换算到未旋转的页面坐标
+                    shift = rotation_of(index) // 90
+                    left, bottom, right, top = (margins[(i - shift) % 4] for i in range(4))
+                    box = [box[0] + left, box[1] + bottom, box[2] - right, box[3] - top]
+                    if box[0] >= box[2] or box[1] >= box[3]:
+                        raise ValueError(f"裁剪后页面为空: 第 {position + 1} 页")
+                    boxes[index] = box
+            elif kind == "reorder":
+                positions = parse_pages(operation[1], len(order))
+                if sorted(positions) != list(range(len(order))):
+                    raise ValueError("新的页面顺序必须包含每一页且只出现一次")
+                order = [order[position] for position in positions]
+            elif kind == "delete":
+                removed = set(parse_pages(operation[1], len(order)))
+                order = [index for position, index in enumerate(order) if position not in removed]
+
+        if not order:
+            raise ValueError("所有页面都被删除")
+        return order, rotations, boxes
+
+    @instrumented("pdf.transform")
+    def write(self, output_path: Path, compact: bool = False, linearize: bool = False) -> bool:
+        """读取源文件，应用全部操作并写出（只写一次）"""
+        if not HAVE_PYPDF:
+            self.logger.error("pypdf 未安装")
+            return False
+
+        if not self.handler.check_inputs([self.source_path]):
+            return False
+
+        linearize = self.handler._can_linearize(linearize)
+        try:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+
+            count_read(self.source_path)
+            with open(self.source_path, 'rb') as f:
+                with stage("parse"):
+                    reader = PdfReader(f)
+                    pages = reader.pages
+                    order, rotations, boxes = self._plan(pages)
+
+                with stage("copy"):
+                    writer = PdfWriter()
+                    for index in order:
+                        page = writer.add_page(pages[index])
+                        if index in rotations:
+                            page[NameObject("/Rotate")] = NumberObject(rotations[index])
+                        if index in boxes:
+                            page[NameObject("/CropBox")] = RectangleObject(boxes[index])
+                count_items(len(order))
+
+                with stage("serialize"), atomic_output(output_path) as out:
+                    self.handler._write(writer, out, linearize, compact)
+
+            self.logger.info(f"页面变换: {self.source_path} -> {output_path}，共 {len(order)} 页")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"页面变换失败: {e}")
+            return False
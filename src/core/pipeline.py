@@ -0,0 +1,387 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import contextlib
+import copy
+import io
+import re
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .converter import Converter
+from .pdf_handler import PDFHandler, HAVE_PYPDF
+from .pdf_fingerprint import SharedPageForms, fingerprint_pages, get_fingerprint_cache
+from .pdf_stamp import STAMP_POSITIONS, HAVE_REPORTLAB, PageStamper, StampOptions, render_stamp
+from .word_handler import WordHandler, HAVE_DOCX
+from ..utils.file_utils import get_directory_index, reserve_filenames
+from ..utils.metrics import count_items, instrumented, stage
+from ..utils.output_writer import OutputBatch
+
+if HAVE_PYPDF:
+    from pypdf import PdfReader, PdfWriter
+
+if HAVE_DOCX:
+    import docx
+    from docx.opc.constants import RELATIONSHIP_TYPE as RT
+    from docx.oxml.ns import qn
+
+    # 复制元素时需要重新指向的关系属性（图片、超链接、页眉页脚等）
+    _REL_ATTRS = (qn("r:embed"), qn("r:id"), qn("r:link"), qn("r:pict"))
+
+
+class _Pipeline:
+    """流水线基类：阶段之间直接传递已解析的文档对象，只在最后写出"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.logger = handler.logger
+        self.file_ext = handler.file_ext
+        self._stages = []
+        self._convert = False
+        # 添加阶段时发现的错误（如缺少依赖），run 时直接失败，不写出缺少该阶段的结果
+        self._errors: List[str] = []
+
+    def _fail(self, message: str) -> "_Pipeline":
+        """记录无法添加的阶段"""
+        self.logger.error(message)
+        self._errors.append(message)
+        return self
+
+    def _check(self) -> bool:
+        """run 之前检查添加阶段时是否出错"""
+        if self._errors:
+            self.logger.error(f"流水线配置有误，未执行: {'; '.join(self._errors)}")
+            return False
+        return True
+
+    def _add_stage(self, name: str, func: Callable) -> "_Pipeline":
+        """添加阶段"""
+        self._stages.append((name, func))
+        return self
+
+    def convert(self) -> "_Pipeline":
+        """最后一步：将输出转换为另一种格式"""
+        self._convert = True
+        return self
+
+    def _output_paths(self, count: int, output_dir: Path, name: str, ext: str) -> List[Path]:
+        """生成输出路径（不覆盖已有文件）"""
+        if count == 1:
+            return reserve_filenames([output_dir / f"{name}{ext}"])
+        return reserve_filenames([output_dir / f"{name}_拆分{i}{ext}" for i in range(1, count + 1)])
+
+    def _split_at(self, documents: list, split_pos: int, total: Callable, take: Callable) -> list:
+        """按位置把每个文档拆成两份"""
+        result = []
+        for doc in documents:
+            count = total(doc)
+            if split_pos <= 0 or split_pos >= count:
+                raise ValueError(f"拆分位置无效: {split_pos}，总数: {count}")
+            result.extend([take(doc, 0, split_pos), take(doc, split_pos, count)])
+        return result
+
+    def _split_every(self, documents: list, size: int, total: Callable, take: Callable) -> list:
+        """按固定大小把每个文档拆成多份"""
+        if size <= 0:
+            raise ValueError(f"拆分大小无效: {size}")
+        result = []
+        for doc in documents:
+            count = total(doc)
+            for start in range(0, count, size):
+                result.append(take(doc, start, min(start + size, count)))
+        return result
+
+
+class PDFPipeline(_Pipeline):
+    """PDF处理流水线（合并 → 拆分 → 盖章 → 转换）"""
+
+    def __init__(self, handler: Optional[PDFHandler] = None):
+        super().__init__(handler or PDFHandler())
+        # 执行期间：页面 -> 要盖的章 [(盖章阶段序号, 印章PDF, 位置)]，写出时才盖
+        self._page_stamps: Dict[int, List[Tuple[int, bytes, str]]] = {}
+        # 执行期间：页面 -> 内容指纹（合并时 dedup="share"），写出时相同指纹的页面共用表单 XObject
+        self._page_shares: Dict[int, bytes] = {}
+
+    def merge(self, source_files: List[Path], dedup: Optional[str] = None,
+              skip_duplicates: bool = False) -> "PDFPipeline":
+        """合并：当前文档与源文件按顺序合并为一个文档
+
+        dedup 与 PDFHandler.merge_files 相同："skip" 去掉内容重复的页面；
+        "share" 保留所有页面，写出时同一输出文档中的副本引用同一个表单 XObject。
+        skip_duplicates 为 True 时先按文本相似度去掉重复提交的源文件。
+        """
+        if dedup not in (None, "skip", "share"):
+            return self._fail(f"不支持的去重方式: {dedup}")
+
+        def apply(documents, stack):
+            files = self.handler.drop_duplicates(source_files) if skip_duplicates else source_files
+            pages = [page for doc in documents for page in doc]
+            fingerprints = fingerprint_pages(pages) if dedup else []
+            seen = set()
+            kept = []
+            for file_path in files:
+                f = stack.enter_context(open(file_path, 'rb'))
+                source_pages = PdfReader(f).pages
+                pages.extend(source_pages)
+                if dedup:
+                    fingerprints.extend(get_fingerprint_cache().get(file_path, source_pages))
+            if not dedup:
+                return [pages]
+
+            for page, fingerprint in zip(pages, fingerprints):
+                if fingerprint in seen and dedup == "skip":
+                    continue
+                seen.add(fingerprint)
+                if dedup == "share":
+                    self._page_shares[id(page)] = fingerprint
+                kept.append(page)
+            return [kept]
+
+        return self._add_stage("merge", apply)
+
+    def split(self, split_pos: int) -> "PDFPipeline":
+        """拆分：在指定页码处把每个文档拆成两份"""
+        return self._add_stage("split", lambda documents, stack: self._split_at(
+            documents, split_pos, len, lambda doc, a, b: doc[a:b]))
+
+    def split_every(self, pages_per_part: int) -> "PDFPipeline":
+        """拆分：每 pages_per_part 页一份"""
+        return self._add_stage("split", lambda documents, stack: self._split_every(
+            documents, pages_per_part, len, lambda doc, a, b: doc[a:b]))
+
+    def stamp(self, text: str, position: str = "center", font_size: float = 48, angle: float = 45,
+              opacity: float = 0.3, color: str = "#C00000") -> "PDFPipeline":
+        """盖章：在每一页上加一段文字（如 DRAFT 水印、学号，中文使用 STSong-Light）
+
+        印章只渲染一次；这一阶段只记下要盖章的页面，写出时每个输出文档放进一个共享的表单 XObject，
+        每页只追加一条引用它的绘制命令（同尺寸的页面共用），页面原内容流不改动。
+        """
+        if not HAVE_REPORTLAB:
+            return self._fail("reportlab 未安装，无法盖章")
+        if position not in STAMP_POSITIONS:
+            return self._fail(f"不支持的盖章位置: {position}")
+
+        options = StampOptions(position, font_size, angle, opacity, color)
+        index = len(self._stages)
+
+        def apply(documents, stack):
+            stamp = (index, render_stamp(text, options), position)
+            for doc in documents:
+                for page in doc:
+                    self._page_stamps.setdefault(id(page), []).append(stamp)
+            return documents
+
+        return self._add_stage("stamp", apply)
+
+    @instrumented("pdf.pipeline")
+    def run(self, output_dir: Path, name: str, compact: bool = True) -> List[Path]:
+        """执行流水线，只写出最终结果（批量输出默认以对象流紧凑写出）"""
+        if not HAVE_PYPDF:
+            self.logger.error("pypdf 未安装")
+            return []
+        if not self._check():
+            return []
+
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            self._page_stamps.clear()
+            self._page_shares.clear()
+            with contextlib.ExitStack() as stack:
+                documents = []
+                for stage_name, func in self._stages:
+                    with stage(stage_name):
+                        documents = func(documents, stack)
+                    self.logger.debug(f"PDF流水线阶段完成: {stage_name}，文档数: {len(documents)}")
+
+                outputs = self._output_paths(len(documents), output_dir, name, self.file_ext)
+                with OutputBatch() as batch:
+                    for pages, output_path in zip(documents, outputs):
+                        with stage("serialize"):
+                            writer = PdfWriter()
+                            shared_forms = SharedPageForms(writer) if self._page_shares else None
+                            stampers = {}
+                            for page in pages:
+                                # 盖在写出的副本上，不修改源文档的页面
+                                fingerprint = self._page_shares.get(id(page))
+                                if fingerprint is not None:
+                                    written = shared_forms.add(page, fingerprint)
+                                else:
+                                    written = writer.add_page(page)
+                                for index, stamp_pdf, position in self._page_stamps.get(id(page), ()):
+                                    stamper = stampers.get(index)
+                                    if stamper is None:
+                                        stamper = stampers[index] = PageStamper(writer, stamp_pdf, position)
+                                    stamper.stamp(written)
+                            with batch.open(output_path) as f:
+                                self.handler._write(writer, f, compact=compact)
+                        count_items(len(pages))
+
+            if self._convert:
+                converter = Converter()
+                targets = reserve_filenames([output_path.with_suffix('.docx') for output_path in outputs])
+                for index, (output_path, target) in enumerate(zip(outputs, targets)):
+                    if not converter.pdf_to_word(output_path, target):
+                        for unused in targets[index:]:
+                            get_directory_index().release(unused)
+                        return []
+                    output_path.unlink()
+                outputs = targets
+
+            self.logger.info(f"PDF流水线输出 {len(outputs)} 个文件到: {output_dir}")
+            return outputs
+
+        except Exception as e:
+            self.logger.error(f"PDF流水线执行失败: {e}")
+            return []
+
+
+class WordPipeline(_Pipeline):
+    """Word处理流水线（合并 → 拆分 → 转换）"""
+
+    def __init__(self, handler: Optional[WordHandler] = None):
+        super().__init__(handler or WordHandler())
+
+    @staticmethod
+    def _body_elements(doc) -> list:
+        """文档正文中的块元素（段落、表格等，不含节属性 sectPr）"""
+        return [element for element in doc.element.body if element.tag != qn("w:sectPr")]
+
+    @staticmethod
+    def _relink(source_doc, target_doc, elements):
+        """把复制过来的元素中的关系ID改为目标文档中的关系（图片、超链接等部件一并带过去）"""
+        source_part, target_part = source_doc.part, target_doc.part
+        package = target_part.package
+        partnames = None
+        mapping = {}
+        for node in (node for element in elements for node in element.iter()):
+            if not isinstance(node.tag, str):
+                continue
+            for attr in _REL_ATTRS:
+                rel_id = node.get(attr)
+                if rel_id is None or rel_id not in source_part.rels:
+                    continue
+                if rel_id not in mapping:
+                    rel = source_part.rels[rel_id]
+                    if rel.is_external:
+                        mapping[rel_id] = target_part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+                    elif rel.reltype == RT.IMAGE:
+                        # 图片按内容去重并在目标文档中重新命名
+                        mapping[rel_id] = target_part.get_or_add_image(io.BytesIO(rel.target_part.blob))[0]
+                    else:
+                        part = rel.target_part
+                        if partnames is None:
+                            partnames = {str(p.partname) for p in package.iter_parts()}
+                        if part.package is not package and str(part.partname) in partnames:
+                            # 部件名与目标文档中已有的部件冲突时改名
+                            part.partname = package.next_partname(
+                                re.sub(r"\d*(\.\w+)$", r"%d\1", str(part.partname)))
+                        partnames.add(str(part.partname))
+                        mapping[rel_id] = target_part.relate_to(part, rel.reltype)
+                node.set(attr, mapping[rel_id])
+
+    def _append(self, source_doc, target_doc, elements):
+        """把元素加到目标文档正文的节属性之前"""
+        body = target_doc.element.body
+        self._relink(source_doc, target_doc, elements)
+        for element in elements:
+            if body.sectPr is not None:
+                body.sectPr.addprevious(element)
+            else:
+                body.append(element)
+
+    def _take(self, doc, start: int, stop: int):
+        """取出第 start 到 stop 个块元素组成新文档（沿用源文档的节属性）"""
+        new_doc = docx.Document()
+        body = new_doc.element.body
+        source_sect = doc.element.body.sectPr
+        if source_sect is not None:
+            sect = copy.deepcopy(source_sect)
+            self._relink(doc, new_doc, [sect])
+            if body.sectPr is not None:
+                body.remove(body.sectPr)
+            body.append(sect)
+        self._append(doc, new_doc, [copy.deepcopy(element) for element in self._body_elements(doc)[start:stop]])
+        return new_doc
+
+    def merge(self, source_files: List[Path]) -> "WordPipeline":
+        """合并：当前文档与源文件按顺序合并为一个文档"""
+
+        def apply(documents, stack):
+            docs = list(documents) + [docx.Document(file_path) for file_path in source_files]
+            if not docs:
+                return []
+            base_doc = docs[0]
+            for current_doc in docs[1:]:
+                base_doc.add_page_break()
+                self._append(current_doc, base_doc, self._body_elements(current_doc))
+            return [base_doc]
+
+        return self._add_stage("merge", apply)
+
+    def split(self, split_pos: int) -> "WordPipeline":
+        """拆分：在指定块元素（段落、表格）处把每个文档拆成两份"""
+        return self._add_stage("split", lambda documents, stack: self._split_at(
+            documents, split_pos, lambda doc: len(self._body_elements(doc)), self._take))
+
+    def split_every(self, paragraphs_per_part: int) -> "WordPipeline":
+        """拆分：每 paragraphs_per_part 个块元素（段落、表格）一份"""
+        return self._add_stage("split", lambda documents, stack: self._split_every(
+            documents, paragraphs_per_part, lambda doc: len(self._body_elements(doc)), self._take))
+
+    @instrumented("word.pipeline")
+    def run(self, output_dir: Path, name: str) -> List[Path]:
+        """执行流水线，只写出最终结果"""
+        if not HAVE_DOCX:
+            self.logger.error("python-docx 未安装")
+            return []
+        if not self._check():
+            return []
+
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            documents = []
+            for stage_name, func in self._stages:
+                with stage(stage_name):
+                    documents = func(documents, None)
+                self.logger.debug(f"Word流水线阶段完成: {stage_name}，文档数: {len(documents)}")
+
+            if not self._convert:
+                outputs = self._output_paths(len(documents), output_dir, name, self.file_ext)
+                with OutputBatch() as batch:
+                    for doc, output_path in zip(documents, outputs):
+                        with stage("serialize"), batch.open(output_path) as f:
+                            doc.save(f)
+            else:
+                # Word转PDF需要磁盘上的文档，中间文件放在临时目录中
+                converter = Converter()
+                outputs = self._output_paths(len(documents), output_dir, name, ".pdf")
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    for doc, output_path in zip(documents, outputs):
+                        temp_path = Path(temp_dir) / output_path.with_suffix(self.file_ext).name
+                        doc.save(temp_path)
+                        if not converter.word_to_pdf(temp_path, output_path):
+                            return []
+
+            self.logger.info(f"Word流水线输出 {len(outputs)} 个文件到: {output_dir}")
+            return outputs
+
+        except Exception as e:
+            self.logger.error(f"Word流水线执行失败: {e}")
+            return []
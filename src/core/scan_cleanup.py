@@ -0,0 +1,208 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import io
+import multiprocessing
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .image_pdf import EncodedImage
+from ..utils.settings import default_workers, worker_count
+
+try:
+    import numpy as np
+
+    HAVE_NUMPY = True
+except ImportError:
+    HAVE_NUMPY = False
+
+try:
+    from PIL import Image, ImageOps
+
+    HAVE_PIL = True
+except ImportError:
+    HAVE_PIL = False
+
+CLEANUP_MODES = ("gray", "bw")
+
+# 清理后图片的最长边（像素），约等于 A4 纸 200 dpi
+DEFAULT_MAX_SIDE = 2339
+# 纠偏搜索范围（度）和步长
+_MAX_SKEW = 5.0
+_SKEW_STEP = 0.2
+
+
+def _otsu_threshold(gray: "np.ndarray") -> float:
+    """Otsu 阈值：使前景和背景类间方差最大"""
+    hist = np.bincount(gray.astype(np.uint8).ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    levels = np.arange(256)
+    weight = np.cumsum(hist)
+    mean = np.cumsum(hist * levels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mean[-1] * weight / total - mean) ** 2 / (weight * (total - weight))
+    return float(np.nanargmax(between))
+
+
+def _box_mean(values: "np.ndarray", radius: int) -> "np.ndarray":
+    """用积分图计算每个像素邻域 (2r+1)x(2r+1) 的均值"""
+    padded = np.pad(values, radius + 1, mode="edge")
+    integral = padded.cumsum(axis=0).cumsum(axis=1)
+    size = 2 * radius + 1
+    total = (integral[size:, size:] - integral[:-size, size:]
+             - integral[size:, :-size] + integral[:-size, :-size])
+    return total[:values.shape[0], :values.shape[1]] / (size * size)
+
+
+def find_page_bounds(gray: "np.ndarray") -> Tuple[int, int, int, int]:
+    """估计纸张边界：纸张比背景亮，按行列统计亮像素比例，返回 (top, bottom, left, right)"""
+    height, width = gray.shape
+    # 在缩小后的图上估计，速度快且不受文字干扰
+    step = max(1, max(height, width) // 500)
+    small = gray[::step, ::step]
+    bright = small > _otsu_threshold(small)
+
+    rows = np.flatnonzero(bright.mean(axis=1) > 0.5)
+    cols = np.flatnonzero(bright.mean(axis=0) > 0.5)
+    if len(rows) < small.shape[0] * 0.3 or len(cols) < small.shape[1] * 0.3:
+        # 找不到明显的纸张区域（如已经是扫描件），不裁剪
+        return 0, height, 0, width
+    return (int(rows[0] * step), int(min(height, (rows[-1] + 1) * step)),
+            int(cols[0] * step), int(min(width, (cols[-1] + 1) * step)))
+
+
+def estimate_skew(gray: "np.ndarray") -> float:
+    """投影法估计纠偏角度（度，逆时针为正）：文字行对齐时，行方向投影的方差最大"""
+    step = max(1, max(gray.shape) // 1000)
+    small = gray[::step, ::step]
+    ys, xs = np.nonzero(small <= _otsu_threshold(small))
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > 200000:
+        picked = np.random.default_rng(0).choice(len(ys), 200000, replace=False)
+        ys, xs = ys[picked], xs[picked]
+
+    angles = np.arange(-_MAX_SKEW, _MAX_SKEW + _SKEW_STEP / 2, _SKEW_STEP)
+    radians = np.deg2rad(angles)
+    # 一次计算所有候选角度下每个暗像素所在的行
+    rows = (ys[None, :] * np.cos(radians)[:, None] - xs[None, :] * np.sin(radians)[:, None])
+    rows = np.round(rows - rows.min(axis=1, keepdims=True)).astype(np.int64)
+    length = int(rows.max()) + 1
+    offsets = (np.arange(len(angles)) * length)[:, None]
+    profiles = np.bincount((rows + offsets).ravel(), minlength=len(angles) * length)
+    scores = profiles.reshape(len(angles), length).astype(np.float64).var(axis=1)
+    return float(angles[int(np.argmax(scores))])
+
+
+def normalize_contrast(gray: "np.ndarray") -> "np.ndarray":
+    """去除不均匀光照（除以估计的背景亮度），再把灰度拉伸到 0~255"""
+    radius = max(8, max(gray.shape) // 40)
+    # 背景估计：在缩小的图上取邻域均值，避免大窗口卷积
+    step = max(1, radius // 4)
+    small = gray[::step, ::step]
+    background = _box_mean(np.maximum(small, _box_mean(small, max(1, radius // step))), max(1, radius // step))
+    background = np.repeat(np.repeat(background, step, axis=0), step, axis=1)[:gray.shape[0], :gray.shape[1]]
+    flat = np.clip(gray / np.maximum(background, 1.0) * 255.0, 0, 255)
+
+    low, high = np.percentile(flat, (1, 99))
+    if high - low < 1:
+        return flat
+    return np.clip((flat - low) * (255.0 / (high - low)), 0, 255)
+
+
+def binarize(gray: "np.ndarray", radius: int = 15, k: float = 0.2) -> "np.ndarray":
+    """Sauvola 自适应二值化，返回布尔数组（True 为白）"""
+    mean = _box_mean(gray, radius)
+    sq_mean = _box_mean(gray * gray, radius)
+    std = np.sqrt(np.maximum(sq_mean - mean * mean, 0))
+    threshold = mean * (1 + k * (std / 128.0 - 1))
+    return gray > threshold
+
+
+def clean_scan(path: Path, mode: str = "gray", max_side: int = DEFAULT_MAX_SIDE,
+               crop: bool = True, deskew: bool = True, quality: int = 60) -> EncodedImage:
+    """清理一张拍摄的纸张照片：裁边、纠偏、均衡对比度，输出 8 位灰度 JPEG 或 1 位黑白图"""
+    if mode not in CLEANUP_MODES:
+        raise ValueError(f"不支持的清理方式: {mode}")
+
+    with Image.open(path) as image:
+        # JPEG 在解码时直接缩小，大幅减少解码时间
+        image.draft("L", (max_side, max_side))
+        image = ImageOps.exif_transpose(image).convert("L")
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    gray = np.asarray(image, dtype=np.float32)
+
+    bounds = find_page_bounds(gray) if crop else None
+    if deskew:
+        top, bottom, left, right = bounds or (0, gray.shape[0], 0, gray.shape[1])
+        angle = estimate_skew(gray[top:bottom, left:right])
+        if abs(angle) >= _SKEW_STEP:
+            # 旋转整张照片后重新找边界，纸张倾斜时露出的背景也能裁掉
+            fill = 0 if crop else 255
+            rotated = Image.fromarray(gray.astype(np.uint8)).rotate(
+                angle, resample=Image.Resampling.BICUBIC, fillcolor=fill)
+            gray = np.asarray(rotated, dtype=np.float32)
+            bounds = find_page_bounds(gray) if crop else None
+    if bounds:
+        top, bottom, left, right = bounds
+        gray = gray[top:bottom, left:right]
+
+    gray = normalize_contrast(gray)
+    height, width = gray.shape
+
+    if mode == "bw":
+        # 1 位图：每行按字节对齐打包（1 为白，与 DeviceGray 一致）
+        packed = np.packbits(binarize(gray), axis=1)
+        return EncodedImage(zlib.compress(packed.tobytes(), 9), width, height, "/DeviceGray", 1, "/FlateDecode")
+
+    output = io.BytesIO()
+    Image.fromarray(gray.astype(np.uint8)).save(output, "JPEG", quality=quality, optimize=True)
+    return EncodedImage(output.getvalue(), width, height, "/DeviceGray", 8, "/DCTDecode")
+
+
+def _clean_job(args: Tuple[str, str, int]) -> EncodedImage:
+    """进程池任务"""
+    path, mode, max_side = args
+    return clean_scan(Path(path), mode, max_side)
+
+
+def clean_scans(paths: List[Path], mode: str = "gray", max_side: int = DEFAULT_MAX_SIDE,
+                workers: Optional[int] = None) -> Iterator[EncodedImage]:
+    """按顺序清理一批图片；多张图片时在进程池中并行，同时处理中的图片数有上限以控制内存"""
+    if not HAVE_NUMPY or not HAVE_PIL:
+        raise RuntimeError("扫描件清理需要安装 numpy 和 Pillow")
+
+    jobs = [(str(p), mode, max_side) for p in paths]
+    workers = min(workers or worker_count("image", default_workers()), len(jobs))
+    if workers <= 1:
+        for job in jobs:
+            yield _clean_job(job)
+        return
+
+    # 使用 spawn：在多线程进程（GUI、服务）中 fork 不安全
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        pending = deque()
+        for job in jobs:
+            pending.append(executor.submit(_clean_job, job))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
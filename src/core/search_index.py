@@ -0,0 +1,520 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import hashlib
+import logging
+import math
+import multiprocessing
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from ..utils.settings import default_workers, worker_count
+from ..utils.validator import sniff_file_type
+
+try:
+    from pypdf import PdfReader
+
+    HAVE_PYPDF = True
+except ImportError:
+    HAVE_PYPDF = False
+
+logger = logging.getLogger("WP_Express")
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    units INTEGER NOT NULL DEFAULT 0,
+    length INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_hash ON files (hash);
+
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    term TEXT UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS postings (
+    term_id INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    locations TEXT NOT NULL,
+    PRIMARY KEY (term_id, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_file ON postings (file_id);
+"""
+
+INDEXED_TYPES = {".pdf": "pdf", ".docx": "docx"}
+# 位置的含义：PDF 为页码，Word 为段落序号（均从 1 开始）
+UNITS = {"pdf": "page", "docx": "paragraph"}
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+# 中日韩文字按相邻两字切分，其他文字按字母数字串切分
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af"
+_TOKEN_PATTERN = re.compile(f"[{_CJK}]+|[0-9a-z]+")
+_CJK_PATTERN = re.compile(f"[{_CJK}]")
+
+# BM25 参数
+_K1 = 1.2
+_B = 0.75
+# 每批写入的文件数，以及内存中缓存的词条 ID 数上限
+_COMMIT_EVERY = 50
+_TERM_CACHE_SIZE = 500000
+_HASH_CHUNK = 1024 * 1024
+_SQL_CHUNK = 500
+
+
+def _normalize(path) -> str:
+    """统一路径写法，保证同一文件只有一条记录"""
+    return os.path.normcase(os.path.abspath(str(path)))
+
+
+def tokenize(text: str) -> List[str]:
+    """切分词条：全角转半角、统一小写，中日韩文字切成二元组（单字保留单字），其他按字母数字串"""
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(unicodedata.normalize("NFKC", text).lower()):
+        run = match.group()
+        if _CJK_PATTERN.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def extract_pdf(path: Path) -> Iterator[Tuple[int, str]]:
+    """逐页提取PDF文本，返回 (页码, 文本)"""
+    reader = PdfReader(str(path))
+    if reader.is_encrypted:
+        reader.decrypt("")
+    for number, page in enumerate(reader.pages, start=1):
+        yield number, page.extract_text() or ""
+
+
+def extract_docx(path: Path) -> Iterator[Tuple[int, str]]:
+    """流式解析 word/document.xml，逐段返回 (段落序号, 文本)，不构建整个文档树"""
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as f:
+        number = 0
+        for _, element in ElementTree.iterparse(f, events=("end",)):
+            if element.tag != f"{_W_NS}p":
+                continue
+            parts = []
+            for node in element.iter():
+                if node.tag == f"{_W_NS}t" and node.text:
+                    parts.append(node.text)
+                elif node.tag in (f"{_W_NS}tab", f"{_W_NS}br"):
+                    parts.append(" ")
+            number += 1
+            element.clear()
+            if parts:
+                yield number, "".join(parts)
+
+
+def extract_units(path: Path) -> Iterator[Tuple[int, str]]:
+    """按文件类型提取文本，返回 (页码或段落序号, 文本)；没有扩展名的文件（如上传的文件）按文件头判断"""
+    kind = INDEXED_TYPES.get(Path(path).suffix.lower()) or sniff_file_type(path)
+    if kind not in UNITS:
+        raise ValueError(f"不支持的文件类型: {path}")
+    return extract_pdf(path) if kind == "pdf" else extract_docx(path)
+
+
+def file_hash(path: Path) -> str:
+    """文件内容哈希"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _analyze(path: str) -> Dict[str, Any]:
+    """提取并切分一个文件（在工作进程中执行），返回每个词条的词频和出现位置"""
+    kind = INDEXED_TYPES[Path(path).suffix.lower()]
+    result: Dict[str, Any] = {"path": path, "kind": kind, "units": 0, "length": 0, "terms": {}, "error": None}
+    try:
+        counts: Dict[str, int] = {}
+        locations: Dict[str, List[int]] = {}
+        for location, text in extract_units(Path(path)):
+            result["units"] = location
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+                seen = locations.setdefault(token, [])
+                if not seen or seen[-1] != location:
+                    seen.append(location)
+                result["length"] += 1
+        result["terms"] = {token: (count, ",".join(map(str, locations[token])))
+                           for token, count in counts.items()}
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+    return result
+
+
+def _analyze_all(paths: List[str], workers: int) -> Iterator[Dict[str, Any]]:
+    """按顺序分析一批文件；多个文件时在进程池中并行，同时处理中的文件数有上限以控制内存"""
+    workers = min(workers, len(paths))
+    if workers <= 1:
+        for path in paths:
+            yield _analyze(path)
+        return
+
+    # 使用 spawn：在多线程进程（GUI、服务）中 fork 不安全
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        pending = deque()
+        for path in paths:
+            pending.append(executor.submit(_analyze, path))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _iter_documents(paths: Iterable[Path]) -> Iterator[Path]:
+    """展开文件和目录，得到所有可索引的文档"""
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            for root, dirs, files in os.walk(path):
+                dirs[:] = [d for d in dirs if not d.startswith(".")]
+                for name in files:
+                    if Path(name).suffix.lower() in INDEXED_TYPES and not name.startswith((".", "~$")):
+                        yield Path(root) / name
+        elif path.suffix.lower() in INDEXED_TYPES:
+            yield path
+
+
+class SearchIndex:
+    """PDF/Word 全文倒排索引（SQLite），支持按文件哈希增量更新和 BM25 排序查询"""
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path or Path.home() / ".WP_Express" / "search.db")
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=10, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._term_ids: Dict[str, int] = {}
+        self._migrate()
+
+    def _migrate(self):
+        """创建或升级表结构"""
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                self._conn.executescript(_SCHEMA)
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    # 更新索引
+    def update(self, paths: Iterable[Path], workers: Optional[int] = None) -> Dict[str, int]:
+        """索引文件或目录中的文档，返回各类文件数
+
+        大小和修改时间都没变的文件直接跳过；变了的文件先算哈希，内容没变只更新记录，
+        与已索引文件内容相同时复制其索引，只有新内容才提取文本（在进程池中并行）。
+        """
+        stats = {"indexed": 0, "reused": 0, "unchanged": 0, "failed": 0}
+        candidates = {}
+        for path in _iter_documents(paths):
+            candidates.setdefault(_normalize(path), path)
+
+        with self._lock:
+            known = {row["path"]: row for row in self._conn.execute(
+                "SELECT id, path, size, mtime_ns, hash FROM files")}
+
+        changed = []
+        for key, path in candidates.items():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            row = known.get(key)
+            if row is not None and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+                stats["unchanged"] += 1
+            else:
+                changed.append((key, path, stat))
+        if not changed:
+            return stats
+
+        # 哈希计算主要是读文件，用线程并发
+        with ThreadPoolExecutor(max_workers=min(workers or worker_count("index", 8), len(changed))) as executor:
+            hashes = list(executor.map(lambda item: file_hash(item[1]), changed))
+
+        with self._lock:
+            by_hash = {}
+            for row in self._conn.execute("SELECT id, hash FROM files WHERE error IS NULL"):
+                by_hash.setdefault(row["hash"], row["id"])
+
+        to_analyze: Dict[str, Tuple[os.stat_result, str]] = {}
+        with self._lock, self._conn:
+            for (key, path, stat), digest in zip(changed, hashes):
+                row = known.get(key)
+                if row is not None and row["hash"] == digest:
+                    self._conn.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE id = ?",
+                                       (stat.st_size, stat.st_mtime_ns, row["id"]))
+                    stats["unchanged"] += 1
+                elif digest in by_hash and by_hash[digest] != (row["id"] if row else None):
+                    # 内容与已索引的文件相同（复制、重命名）：直接复制索引
+                    self._copy_entry(by_hash[digest], key, stat)
+                    stats["reused"] += 1
+                else:
+                    to_analyze[key] = (stat, digest)
+
+        workers = workers or worker_count("index", default_workers())
+        batch = []
+        for result in _analyze_all(list(to_analyze), workers):
+            batch.append(result)
+            if result["error"]:
+                stats["failed"] += 1
+                logger.warning(f"无法提取文本: {result['path']}: {result['error']}")
+            else:
+                stats["indexed"] += 1
+            if len(batch) >= _COMMIT_EVERY:
+                self._store_batch(batch, to_analyze)
+                batch = []
+        self._store_batch(batch, to_analyze)
+        logger.info(f"更新全文索引: 新增 {stats['indexed']}，复用 {stats['reused']}，"
+                    f"未变 {stats['unchanged']}，失败 {stats['failed']}")
+        return stats
+
+    def _store_batch(self, batch: List[Dict[str, Any]], files: Dict[str, Tuple[os.stat_result, str]]):
+        """在一个事务中写入一批分析结果"""
+        if not batch:
+            return
+        with self._lock, self._conn:
+            for result in batch:
+                stat, digest = files[result["path"]]
+                self._store(result, stat, digest)
+
+    def _delete_file(self, file_id: int):
+        """删除一个文件的记录和索引"""
+        self._conn.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+        self._conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _upsert_file(self, path: str, stat: os.stat_result, digest: str, kind: str,
+                     units: int, length: int, error: Optional[str]) -> int:
+        """写入文件记录（替换旧记录和旧索引），返回文件ID"""
+        row = self._conn.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None:
+            self._delete_file(row["id"])
+        cursor = self._conn.execute(
+            "INSERT INTO files (path, size, mtime_ns, hash, kind, units, length, error, indexed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, digest, kind, units, length, error, time.time()))
+        return cursor.lastrowid
+
+    def _copy_entry(self, source_id: int, path: str, stat: os.stat_result):
+        """复制内容相同的文件的索引"""
+        source = self._conn.execute("SELECT * FROM files WHERE id = ?", (source_id,)).fetchone()
+        file_id = self._upsert_file(path, stat, source["hash"], source["kind"],
+                                    source["units"], source["length"], None)
+        self._conn.execute(
+            "INSERT INTO postings (term_id, file_id, tf, locations) "
+            "SELECT term_id, ?, tf, locations FROM postings WHERE file_id = ?", (file_id, source_id))
+
+    def _resolve_terms(self, terms: List[str]) -> Dict[str, int]:
+        """词条 -> 词条ID，不存在的词条新建"""
+        if len(self._term_ids) > _TERM_CACHE_SIZE:
+            self._term_ids.clear()
+        missing = [term for term in terms if term not in self._term_ids]
+        if missing:
+            self._conn.executemany("INSERT OR IGNORE INTO terms (term) VALUES (?)", [(t,) for t in missing])
+            for start in range(0, len(missing), _SQL_CHUNK):
+                chunk = missing[start:start + _SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                for row in self._conn.execute(f"SELECT id, term FROM terms WHERE term IN ({marks})", chunk):
+                    self._term_ids[row["term"]] = row["id"]
+        return {term: self._term_ids[term] for term in terms}
+
+    def _store(self, result: Dict[str, Any], stat: os.stat_result, digest: str):
+        """写入一个文件的分析结果；提取失败的文件也记录下来，内容不变时不再重试"""
+        file_id = self._upsert_file(result["path"], stat, digest, result["kind"], result["units"],
+                                    result["length"], result["error"])
+        terms = result["terms"]
+        if not terms:
+            return
+        ids = self._resolve_terms(list(terms))
+        self._conn.executemany(
+            "INSERT INTO postings (term_id, file_id, tf, locations) VALUES (?, ?, ?, ?)",
+            [(ids[term], file_id, count, locations) for term, (count, locations) in terms.items()])
+
+    def remove(self, paths: Iterable[Path]) -> int:
+        """从索引中删除文件，返回删除的文件数"""
+        removed = 0
+        with self._lock, self._conn:
+            for path in paths:
+                row = self._conn.execute("SELECT id FROM files WHERE path = ?", (_normalize(path),)).fetchone()
+                if row is not None:
+                    self._delete_file(row["id"])
+                    removed += 1
+        return removed
+
+    def prune(self) -> int:
+        """删除已不存在的文件的索引，返回删除的文件数"""
+        with self._lock:
+            paths = [row["path"] for row in self._conn.execute("SELECT path FROM files")]
+        return self.remove(p for p in paths if not os.path.exists(p))
+
+    # 查询
+    def _term_groups(self, query: str) -> List[List[int]]:
+        """把查询切分为词条组：组内任一词条出现即可，各组都要出现
+
+        单个汉字没有二元组可查，匹配所有以它开头或结尾的二元组（以及单字词条），
+        这样出现在一串汉字末尾的字也能查到；结尾匹配无法使用索引，需要扫描词条表。
+        """
+        groups = []
+        for token in dict.fromkeys(tokenize(query)):
+            if len(token) == 1 and _CJK_PATTERN.match(token):
+                rows = self._conn.execute(
+                    "SELECT id FROM terms WHERE term >= ? AND term < ? "
+                    "UNION SELECT id FROM terms WHERE term LIKE '_' || ?",
+                    (token, token + "\uffff", token))
+            else:
+                rows = self._conn.execute("SELECT id FROM terms WHERE term = ?", (token,))
+            groups.append([row["id"] for row in rows])
+        return groups
+
+    def search(self, query: str, limit: int = 20, kind: Optional[str] = None,
+               folder: Optional[Path] = None, max_locations: int = 10) -> List[Dict[str, Any]]:
+        """查询包含全部词条的文档，按 BM25 得分排序
+
+        每条结果包含 path、kind、score、unit（page 或 paragraph）和 locations（同时出现全部词条的位置，
+        没有这样的位置时为出现词条最多的位置）。
+        """
+        with self._lock:
+            groups = self._term_groups(query)
+            if not groups or not all(groups):
+                return []
+            total, average = self._conn.execute(
+                "SELECT COUNT(*), AVG(length) FROM files WHERE error IS NULL").fetchone()
+            if not total:
+                return []
+
+            # 每组：文件ID -> (词频, 位置集合)
+            postings: List[Dict[int, Tuple[int, set]]] = []
+            for term_ids in groups:
+                found: Dict[int, Tuple[int, set]] = {}
+                for start in range(0, len(term_ids), _SQL_CHUNK):
+                    chunk = term_ids[start:start + _SQL_CHUNK]
+                    marks = ",".join("?" * len(chunk))
+                    for row in self._conn.execute(
+                            f"SELECT file_id, tf, locations FROM postings WHERE term_id IN ({marks})", chunk):
+                        tf, locations = found.get(row["file_id"], (0, set()))
+                        locations.update(map(int, row["locations"].split(",")))
+                        found[row["file_id"]] = (tf + row["tf"], locations)
+                postings.append(found)
+
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for found in postings[1:]:
+                candidates &= found.keys()
+            if not candidates:
+                return []
+
+            lengths = {}
+            files = {}
+            candidate_list = list(candidates)
+            for start in range(0, len(candidate_list), _SQL_CHUNK):
+                chunk = candidate_list[start:start + _SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                sql = f"SELECT id, path, kind, length FROM files WHERE id IN ({marks})"
+                for row in self._conn.execute(sql, chunk):
+                    lengths[row["id"]] = row["length"]
+                    files[row["id"]] = row
+
+        folder_prefix = _normalize(folder) + os.sep if folder else None
+        scored = []
+        for file_id in candidates:
+            row = files.get(file_id)
+            if row is None or (kind and row["kind"] != kind):
+                continue
+            if folder_prefix and not row["path"].startswith(folder_prefix):
+                continue
+            norm = _K1 * (1 - _B + _B * lengths[file_id] / (average or 1))
+            score = 0.0
+            for found in postings:
+                tf = found[file_id][0]
+                idf = math.log(1 + (total - len(found) + 0.5) / (len(found) + 0.5))
+                score += idf * tf * (_K1 + 1) / (tf + norm)
+            scored.append((score, file_id))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        results = []
+        for score, file_id in scored[:limit]:
+            row = files[file_id]
+            hits: Dict[int, int] = {}
+            for found in postings:
+                for location in found[file_id][1]:
+                    hits[location] = hits.get(location, 0) + 1
+            best = max(hits.values())
+            locations = sorted(location for location, count in hits.items() if count == best)
+            results.append({
+                "path": row["path"],
+                "kind": row["kind"],
+                "score": round(score, 4),
+                "unit": UNITS[row["kind"]],
+                "locations": locations[:max_locations],
+            })
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        """索引中的文件数和词条数"""
+        with self._lock:
+            files = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            terms = self._conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        return {"files": files, "terms": terms}
+
+
+# 全局索引实例
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """获取全文索引实例"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex()
+    return _index
@@ -0,0 +1,507 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import atexit
+import io
+import logging
+import os
+import sys
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from xml.etree import ElementTree
+
+from .search_index import extract_docx, file_hash
+from ..utils.history import get_history
+from ..utils.output_writer import atomic_output
+from ..utils.settings import performance, worker_count
+from ..utils.validator import sniff_file_type
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+
+    HAVE_PIL = True
+except ImportError:
+    HAVE_PIL = False
+
+try:
+    from pypdf import PdfReader
+
+    HAVE_PYPDF = True
+except ImportError:
+    HAVE_PYPDF = False
+
+logger = logging.getLogger("WP_Express")
+
+THUMBNAIL_SIZE = (180, 240)
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+# 首页文字少于该字数时视为扫描件，显示页面中最大的图片
+_SCANNED_TEXT_CHARS = 30
+# 图片长边达到该像素数时即使有文字层（如 OCR 后的扫描件）也显示图片
+_SCANNED_IMAGE_SIDE = 1000
+# Word 文档只在前若干段中寻找图片，避免为了缩略图解析整个文档
+_DOCX_SCAN_PARAGRAPHS = 50
+_SNIPPET_CHARS = 300
+
+_A_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_R_EMBED = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed"
+_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_W_BODY = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}body"
+_W_P = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}p"
+_DC_TITLE = "{http://purl.org/dc/elements/1.1/}title"
+_APP_PAGES = "{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}Pages"
+
+# 能显示中文的字体，按平台依次尝试
+_CJK_FONTS = [
+    "C:/Windows/Fonts/msyh.ttc", "C:/Windows/Fonts/msyh.ttf", "C:/Windows/Fonts/simhei.ttf",
+    "C:/Windows/Fonts/simsun.ttc",
+    "/System/Library/Fonts/PingFang.ttc", "/System/Library/Fonts/STHeiti Light.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+]
+_fonts: Dict[int, "ImageFont.ImageFont"] = {}
+
+
+def _font(size: int):
+    """缩略图文字使用的字体（找不到中文字体时用 Pillow 内置字体）"""
+    font = _fonts.get(size)
+    if font is None:
+        for candidate in _CJK_FONTS:
+            if os.path.exists(candidate):
+                try:
+                    font = ImageFont.truetype(candidate, size)
+                    break
+                except OSError:
+                    continue
+        else:
+            font = ImageFont.load_default()
+        _fonts[size] = font
+    return font
+
+
+def _fit(image: "Image.Image", size: Tuple[int, int]) -> "Image.Image":
+    """缩小到不超过 size，转为可保存为 PNG 的模式"""
+    if image.mode == "CMYK":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    image.thumbnail(size, Image.Resampling.LANCZOS)
+    return image
+
+
+def _open_image(data: bytes, size: Tuple[int, int]) -> "Image.Image":
+    """从编码数据打开图片；JPEG 在解码时直接缩小"""
+    image = Image.open(io.BytesIO(data))
+    image.draft("RGB", (size[0] * 2, size[1] * 2))
+    return _fit(image, size)
+
+
+def render_snippet(text: str, size: Tuple[int, int] = THUMBNAIL_SIZE, aspect: float = 297 / 210) -> "Image.Image":
+    """把文字片段画在白色页面上（页面按 aspect 高宽比）"""
+    width = size[0] if size[0] * aspect <= size[1] else int(size[1] / aspect)
+    height = int(width * aspect)
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, width - 1, height - 1), outline=(200, 200, 200))
+
+    font = _font(max(8, width // 16))
+    margin = max(4, width // 12)
+    line_height = int(font.size * 1.4) if hasattr(font, "size") else 12
+    y = margin
+    remaining = _SNIPPET_CHARS
+    for paragraph in text.splitlines():
+        paragraph = " ".join(paragraph.split())[:remaining]
+        if not paragraph:
+            continue
+        remaining -= len(paragraph)
+        line = ""
+        for char in paragraph:
+            # 逐字换行，中文没有空格也能正确折行
+            if line and draw.textlength(line + char, font=font) > width - 2 * margin:
+                draw.text((margin, y), line, fill=(60, 60, 60), font=font)
+                y += line_height
+                line = char.lstrip()
+                if y + line_height > height - margin:
+                    return image
+            else:
+                line += char
+        draw.text((margin, y), line, fill=(60, 60, 60), font=font)
+        y += line_height
+        if y + line_height > height - margin or remaining <= 0:
+            break
+    return image
+
+
+def _largest_image(page):
+    """页面资源中像素最多的图片 XObject"""
+    best, best_area = None, 0
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources is not None else None
+    if xobjects is None:
+        return None
+    for ref in xobjects.get_object().values():
+        obj = ref.get_object()
+        if obj.get("/Subtype") != "/Image":
+            continue
+        area = int(obj.get("/Width", 0)) * int(obj.get("/Height", 0))
+        if area > best_area:
+            best, best_area = obj, area
+    return best
+
+
+def _decode_pdf_image(obj, size: Tuple[int, int]) -> "Image.Image":
+    """解码 PDF 图片；JPEG/JPEG2000 直接交给 Pillow 以便缩小解码"""
+    filters = obj.get("/Filter")
+    names = [str(f) for f in filters] if isinstance(filters, list) else [str(filters)]
+    if names and names[-1] in ("/DCTDecode", "/JPXDecode") and len(names) == 1:
+        return _open_image(obj._data, size)
+    return _fit(obj.decode_as_image(), size)
+
+
+def _pdf_thumbnail(path: Path, size: Tuple[int, int]) -> "Image.Image":
+    """PDF 首页缩略图：扫描件显示页面图片，其他显示文字片段"""
+    reader = PdfReader(str(path))
+    if reader.is_encrypted:
+        reader.decrypt("")
+    page = reader.pages[0]
+    text = page.extract_text() or ""
+    image_obj = _largest_image(page)
+
+    image = None
+    if image_obj is not None:
+        long_side = max(int(image_obj.get("/Width", 0)), int(image_obj.get("/Height", 0)))
+        if len(text.strip()) < _SCANNED_TEXT_CHARS or long_side >= _SCANNED_IMAGE_SIDE:
+            image = _decode_pdf_image(image_obj, size)
+    if image is None:
+        box = page.mediabox
+        aspect = float(box.height) / float(box.width) if float(box.width) else 297 / 210
+        image = render_snippet(text, size, aspect)
+    rotation = (page.get("/Rotate") or 0) % 360
+    if rotation:
+        image = image.rotate(-rotation, expand=True)
+    return image
+
+
+def _docx_first_image(archive: zipfile.ZipFile, rel_id: str) -> Optional[bytes]:
+    """按关系 ID 读取 Word 文档中的图片数据"""
+    with archive.open("word/_rels/document.xml.rels") as f:
+        for rel in ElementTree.parse(f).getroot().iter(f"{_REL_NS}Relationship"):
+            if rel.get("Id") == rel_id and rel.get("TargetMode") != "External":
+                target = rel.get("Target", "").lstrip("/")
+                name = target if target.startswith("word/") else f"word/{target}"
+                return archive.read(os.path.normpath(name).replace(os.sep, "/"))
+    return None
+
+
+def _docx_thumbnail(path: Path, size: Tuple[int, int]) -> "Image.Image":
+    """Word 首页缩略图：前几段中有图片时显示第一张图片，否则显示文字片段"""
+    with zipfile.ZipFile(path) as archive:
+        rel_id = None
+        with archive.open("word/document.xml") as f:
+            paragraphs = 0
+            for _, element in ElementTree.iterparse(f, events=("end",)):
+                if element.tag == f"{_A_NS}blip" and element.get(_R_EMBED):
+                    rel_id = element.get(_R_EMBED)
+                    break
+                if element.tag.endswith("}p"):
+                    paragraphs += 1
+                    if paragraphs >= _DOCX_SCAN_PARAGRAPHS:
+                        break
+        if rel_id is not None:
+            try:
+                data = _docx_first_image(archive, rel_id)
+                if data:
+                    return _open_image(data, size)
+            except Exception:
+                # EMF/WMF 等 Pillow 打不开的图片改用文字片段
+                pass
+
+    text = []
+    for _, paragraph in extract_docx(path):
+        text.append(paragraph)
+        if sum(len(t) for t in text) >= _SNIPPET_CHARS:
+            break
+    return render_snippet("\n".join(text), size)
+
+
+def render_thumbnail(path: Path, size: Tuple[int, int] = THUMBNAIL_SIZE) -> bytes:
+    """生成首页缩略图，返回 PNG 数据"""
+    if not HAVE_PIL:
+        raise RuntimeError("Pillow 未安装")
+    kind = {".pdf": "pdf", ".docx": "docx"}.get(Path(path).suffix.lower()) or sniff_file_type(path)
+    if kind == "pdf":
+        if not HAVE_PYPDF:
+            raise RuntimeError("pypdf 未安装")
+        image = _pdf_thumbnail(path, size)
+    elif kind == "docx":
+        image = _docx_thumbnail(path, size)
+    else:
+        raise ValueError(f"不支持预览的文件: {path}")
+    output = io.BytesIO()
+    image.save(output, "PNG")
+    return output.getvalue()
+
+
+def _docx_info(path: Path) -> Tuple[Optional[int], Dict[str, Any]]:
+    """Word 文档的页数（Word 保存时记录的统计值，可能没有）、正文段落数和标题"""
+    meta: Dict[str, Any] = {}
+    pages = None
+    with zipfile.ZipFile(path) as archive:
+        names = set(archive.namelist())
+        if "docProps/core.xml" in names:
+            with archive.open("docProps/core.xml") as f:
+                meta["title"] = ElementTree.parse(f).getroot().findtext(_DC_TITLE) or ""
+        if "docProps/app.xml" in names:
+            with archive.open("docProps/app.xml") as f:
+                text = ElementTree.parse(f).getroot().findtext(_APP_PAGES)
+            pages = int(text) if text and text.isdigit() else None
+        # 拆分位置按正文中的段落计数
+        paragraphs = 0
+        with archive.open("word/document.xml") as f:
+            depth = 0
+            for event, element in ElementTree.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth == 2 and element.tag == _W_P:
+                    paragraphs += 1
+                if depth <= 2:
+                    element.clear()
+        meta["paragraphs"] = paragraphs
+    return pages, meta
+
+
+def read_document_info(path: Path) -> Dict[str, Any]:
+    """读取文档的类型、页数和标题（Word 文档另有段落数）"""
+    path = Path(path)
+    kind = {".pdf": "pdf", ".docx": "docx"}.get(path.suffix.lower()) or sniff_file_type(path)
+    if kind == "pdf":
+        if not HAVE_PYPDF:
+            raise RuntimeError("pypdf 未安装")
+        reader = PdfReader(str(path))
+        if reader.is_encrypted:
+            reader.decrypt("")
+        title = (reader.metadata or {}).get("/Title")
+        return {"kind": kind, "pages": len(reader.pages), "meta": {"title": str(title) if title else ""}}
+    if kind == "docx":
+        pages, meta = _docx_info(path)
+        return {"kind": kind, "pages": pages, "meta": meta}
+    raise ValueError(f"不支持的文件: {path}")
+
+
+def document_info(path: Path) -> Dict[str, Any]:
+    """文档的类型、页数和标题，缓存在历史库的 doc_meta 表中（文件大小或修改时间变化后重新读取）"""
+    try:
+        history = get_history()
+        cached = history.get_doc_meta(path)
+    except Exception as e:
+        logger.debug(f"历史库不可用，不缓存文档信息: {e}")
+        history = cached = None
+    if cached is not None:
+        return {"kind": cached["kind"], "pages": cached["pages"], "meta": cached["meta"]}
+
+    stat = os.stat(path)
+    info = read_document_info(path)
+    if history is not None:
+        try:
+            history.put_doc_meta(path, info["kind"], info["pages"], info["meta"], stat)
+        except Exception as e:
+            logger.debug(f"无法缓存文档信息: {path}: {e}")
+    return info
+
+
+class ThumbnailCache:
+    """缩略图磁盘缓存：按内容哈希命名，总大小超过上限时删除最久未使用的缩略图"""
+
+    def __init__(self, directory: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.directory = Path(directory or Path.home() / ".WP_Express" / "thumbnails")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 键 -> 文件大小，最久未使用的在前（跨会话的顺序由文件修改时间保存）
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime_ns, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total += size
+
+    @property
+    def max_bytes(self) -> int:
+        """缓存大小上限，未指定时读取 performance.cache.thumbnail_bytes"""
+        return self._max_bytes or int(performance("cache.thumbnail_bytes", DEFAULT_CACHE_BYTES))
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.png"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缩略图，不存在时返回 None"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+            return data
+        except OSError:
+            with self._lock:
+                self._total -= self._entries.pop(key, 0)
+            return None
+
+    def put(self, key: str, data: bytes):
+        """写入缩略图，并按上限淘汰旧的缩略图"""
+        # 缓存丢失只需重新生成，不必逐个刷盘
+        with atomic_output(self._path(key), durable=False) as f:
+            f.write(data)
+        evicted = []
+        with self._lock:
+            self._total += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            limit = self.max_bytes
+            while self._total > limit and len(self._entries) > 1:
+                old_key, old_size = self._entries.popitem(last=False)
+                self._total -= old_size
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                self._path(old_key).unlink()
+            except OSError:
+                pass
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+
+class ThumbnailService:
+    """后台生成缩略图：请求立即返回 Future，同一文件的并发请求只生成一次
+
+    预取请求在单独的单线程队列中执行，不占用显示请求的线程；
+    要显示的文件还排在预取队列中时，取消预取并改为立即生成。
+    """
+
+    def __init__(self, cache: Optional[ThumbnailCache] = None, workers: Optional[int] = None,
+                 size: Tuple[int, int] = THUMBNAIL_SIZE):
+        self.cache = cache or ThumbnailCache()
+        self.size = size
+        self._executor = ThreadPoolExecutor(max_workers=workers or worker_count("preview", 2),
+                                            thread_name_prefix="thumbnail")
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnail-prefetch")
+        # 取消 Future 或任务已完成时，完成回调在持有锁的线程中立即执行，需要可重入锁
+        self._lock = threading.RLock()
+        self._pending: Dict[str, Future] = {}
+        self._prefetching = set()
+        # (路径, 大小, 修改时间) -> 内容哈希，文件未变时不重复计算
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+
+    def submit(self, path: Path, prefetch: bool = False) -> Future:
+        """请求缩略图，Future 的结果为 PNG 数据（无法预览时为 None）
+
+        prefetch 为 True 时只是提前生成写入缓存，排在所有显示请求之后。
+        """
+        key = os.path.normcase(os.path.abspath(path))
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None and not prefetch and future in self._prefetching and future.cancel():
+                future = None
+            if future is None:
+                executor = self._prefetch_executor if prefetch else self._executor
+                future = executor.submit(self._load, Path(path))
+                self._pending[key] = future
+                if prefetch:
+                    self._prefetching.add(future)
+                future.add_done_callback(lambda f, key=key: self._forget(key, f))
+        return future
+
+    def describe(self, path: Path) -> Future:
+        """请求文档信息（见 document_info），Future 的结果为字典（无法读取时为 None）"""
+        return self._executor.submit(self._describe, Path(path))
+
+    @staticmethod
+    def _describe(path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            return document_info(path)
+        except Exception as e:
+            logger.debug(f"无法读取文档信息: {path}: {e}")
+            return None
+
+    def _forget(self, key: str, future: Future):
+        with self._lock:
+            self._prefetching.discard(future)
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def _content_key(self, path: Path) -> str:
+        """缓存键：文件内容哈希加缩略图尺寸"""
+        stat = path.stat()
+        stat_key = (os.path.normcase(os.path.abspath(path)), stat.st_size, stat.st_mtime_ns)
+        digest = self._hashes.get(stat_key)
+        if digest is None:
+            digest = self._hashes[stat_key] = file_hash(path)
+        return f"{digest}_{self.size[0]}x{self.size[1]}"
+
+    def _load(self, path: Path) -> Optional[bytes]:
+        """读取缓存，未命中时生成并写入缓存"""
+        try:
+            key = self._content_key(path)
+            data = self.cache.get(key)
+            if data is None:
+                data = render_thumbnail(path, self.size)
+                self.cache.put(key, data)
+            return data
+        except Exception as e:
+            logger.debug(f"无法生成缩略图: {path}: {e}")
+            return None
+
+    def shutdown(self):
+        """停止后台线程，取消尚未开始的请求"""
+        for executor in (self._prefetch_executor, self._executor):
+            if sys.version_info >= (3, 9):
+                executor.shutdown(wait=False, cancel_futures=True)
+            else:
+                executor.shutdown(wait=False)
+
+
+# 全局缩略图服务实例
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_thumbnail_service() -> ThumbnailService:
+    """获取缩略图服务实例"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ThumbnailService()
+            atexit.register(_service.shutdown)
+    return _service
@@ -16,9 +16,15 @@ limitations under the License.
 """
 
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
 from .base import BaseHandler
+from .docx_media import append_image_pages, save_package
+from .image_pdf import read_image_infos
+from ..utils.file_utils import get_directory_index, reserve_filenames
+from ..utils.metrics import count_items, count_read, instrumented, stage
+from ..utils.output_writer import OutputBatch, atomic_output
+from ..utils.settings import performance, worker_count
 
 try:
     import docx
@@ -36,6 +42,7 @@ class WordHandler(BaseHandler):
         super().__init__()
         self.file_ext = ".docx"
 
+    @instrumented("word.create_single_file")
     def create_single_file(self, file_name: str, save_path: Optional[Path] = None) -> bool:
         """创建单个Word文档"""
         if not HAVE_DOCX:
@@ -59,7 +66,9 @@ class WordHandler(BaseHandler):
             # 创建文档
             doc = docx.Document()
             doc.add_paragraph("这是一个新Word文档")
-            doc.save(output_path)
+            with stage("serialize"), atomic_output(output_path) as f:
+                doc.save(f)
+            count_items(1)
 
             self.logger.info(f"创建Word文档: {output_path}")
             return True
@@ -68,12 +77,14 @@ class WordHandler(BaseHandler):
             self.logger.error(f"创建Word文档失败: {e}")
             return False
 
+    @instrumented("word.create_multiple")
     def create_multiple(self, count: int, prefix: str, save_path: Optional[Path] = None) -> bool:
         """批量创建Word文档"""
         if not HAVE_DOCX:
             self.logger.error("python-docx 未安装")
             return False
 
+        file_paths = []
         try:
             # 确定保存路径
             if save_path:
@@ -84,24 +95,34 @@ class WordHandler(BaseHandler):
             # 创建文件夹
             folder_path.mkdir(parents=True, exist_ok=True)
 
-            # 批量创建
-            for i in range(1, count + 1):
-                file_name = f"{prefix}_{i}{self.file_ext}"
-                file_path = folder_path / file_name
-
-                doc = docx.Document()
-                doc.add_paragraph(f"这是第 {i} 个文档")
-                doc.save(file_path)
+            # 批量创建（已存在的文件不会被覆盖，改用下一个可用的文件名）
+            file_paths = reserve_filenames(
+                [folder_path / f"{prefix}_{i}{self.file_ext}" for i in range(1, count + 1)])
+            with OutputBatch() as batch:
+                for i, file_path in enumerate(file_paths, start=1):
+                    doc = docx.Document()
+                    doc.add_paragraph(f"这是第 {i} 个文档")
+                    with stage("serialize"), batch.open(file_path) as f:
+                        doc.save(f)
+                    count_items(1)
 
             self.logger.info(f"批量创建 {count} 个Word文档到: {folder_path}")
             return True
 
         except Exception as e:
+            # 未写出的文件释放预留的文件名，避免之后的调用无谓地加上 _1 后缀
+            for path in file_paths:
+                if not path.exists():
+                    get_directory_index().release(path)
             self.logger.error(f"批量创建Word文档失败: {e}")
             return False
 
-    def merge_files(self, source_files: List[Path], output_path: Path) -> bool:
-        """合并Word文档"""
+    @instrumented("word.merge_files")
+    def merge_files(self, source_files: List[Path], output_path: Path, skip_duplicates: bool = False) -> bool:
+        """合并Word文档
+
+        skip_duplicates 为 True 时先按文本相似度去掉重复提交的文档。
+        """
         if not HAVE_DOCX:
             self.logger.error("python-docx 未安装")
             return False
@@ -110,22 +131,39 @@ class WordHandler(BaseHandler):
             self.logger.error("没有源文件")
             return False
 
+        # 解析之前先排除不存在或内容不符的文件
+        if not self.check_inputs(source_files):
+            return False
+
         try:
+            if skip_duplicates:
+                source_files = self.drop_duplicates(source_files)
+
             # 确保输出目录存在
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
             # 以第一个文档为基础
-            base_doc = docx.Document(source_files[0])
+            count_read(source_files[0])
+            with stage("parse"):
+                base_doc = docx.Document(source_files[0])
+            count_items(len(base_doc.element.body))
 
             # 合并其他文档
             for file_path in source_files[1:]:
-                current_doc = docx.Document(file_path)
-                base_doc.add_page_break()
-                for element in current_doc.element.body:
-                    base_doc.element.body.append(element)
+                count_read(file_path)
+                with stage("parse"):
+                    current_doc = docx.Document(file_path)
+                with stage("copy"):
+                    base_doc.add_page_break()
+                    # 先取出元素列表：append 会把元素从原文档移走，边遍历边移动会跳过元素
+                    elements = list(current_doc.element.body)
+                    for element in elements:
+                        base_doc.element.body.append(element)
+                count_items(len(elements))
 
             # 保存合并后的文档
-            base_doc.save(output_path)
+            with stage("serialize"), atomic_output(output_path) as f:
+                base_doc.save(f)
 
             self.logger.info(f"合并Word文档到: {output_path}")
             return True
@@ -134,12 +172,17 @@ class WordHandler(BaseHandler):
             self.logger.error(f"合并Word文档失败: {e}")
             return False
 
+    @instrumented("word.split_file")
     def split_file(self, source_path: Path, split_pos: int, output_dir: Optional[Path] = None) -> List[Path]:
         """拆分Word文档"""
         if not HAVE_DOCX:
             self.logger.error("python-docx 未安装")
             return []
 
+        if not self.check_inputs([source_path]):
+            return []
+
+        outputs = []
         try:
             # 确定输出目录
             if output_dir:
@@ -148,8 +191,11 @@ class WordHandler(BaseHandler):
                 save_dir = source_path.parent
 
             # 打开源文档
-            source_doc = docx.Document(source_path)
-            all_paragraphs = source_doc.element.body
+            count_read(source_path)
+            with stage("parse"):
+                source_doc = docx.Document(source_path)
+            # 先取出元素列表，移动元素时不会跳过后面的元素
+            all_paragraphs = list(source_doc.element.body)
 
             # 创建拆分文档
             doc1 = docx.Document()
@@ -157,26 +203,92 @@ class WordHandler(BaseHandler):
 
             # 拆分文档
             current_para = 0
-            for element in all_paragraphs:
-                if element.tag.endswith('p'):
-                    current_para += 1
-                    if current_para < split_pos:
-                        doc1.element.body.append(element)
-                    else:
-                        doc2.element.body.append(element)
+            with stage("copy"):
+                for element in all_paragraphs:
+                    if element.tag.endswith('p'):
+                        current_para += 1
+                        if current_para < split_pos:
+                            doc1.element.body.append(element)
+                        else:
+                            doc2.element.body.append(element)
+            count_items(current_para)
 
             # 生成输出路径
             source_name = source_path.stem
-            output1 = save_dir / f"{source_name}_拆分1{self.file_ext}"
-            output2 = save_dir / f"{source_name}_拆分2{self.file_ext}"
-
-            # 保存文档
-            doc1.save(output1)
-            doc2.save(output2)
+            outputs = reserve_filenames([
+                save_dir / f"{source_name}_拆分1{self.file_ext}",
+                save_dir / f"{source_name}_拆分2{self.file_ext}",
+            ])
+            output1, output2 = outputs
+
+            # 保存文档（两个文件一起提交）
+            with OutputBatch() as batch:
+                with stage("serialize"):
+                    with batch.open(output1) as f:
+                        doc1.save(f)
+                    with batch.open(output2) as f:
+                        doc2.save(f)
 
             self.logger.info(f"拆分Word文档: {output1}, {output2}")
             return [output1, output2]
 
         except Exception as e:
+            # 未写出的文件释放预留的文件名，避免之后的调用无谓地加上 _1 后缀
+            for path in outputs:
+                if not path.exists():
+                    get_directory_index().release(path)
             self.logger.error(f"拆分Word文档失败: {e}")
             return []
+
+    @instrumented("word.insert_images")
+    def insert_images(self, source_path: Optional[Path], image_files: Iterable[Path], output_path: Path,
+                      workers: Optional[int] = None) -> bool:
+        """把图片逐页追加到Word文档末尾（source_path 为 None 时新建文档）
+
+        图片尺寸只从文件头读取并缩放到版心；内容相同的图片在 word/media 中只存一份，
+        保存时图片从源文件直接复制，不经 python-docx 读入内存。
+        """
+        if not HAVE_DOCX:
+            self.logger.error("python-docx 未安装")
+            return False
+
+        image_files = [Path(p) for p in image_files]
+        if not image_files:
+            self.logger.error("没有图片文件")
+            return False
+        if source_path is not None and not self.check_inputs([source_path]):
+            return False
+
+        try:
+            with stage("parse"):
+                infos = read_image_infos(image_files, workers or worker_count("image", 8))
+                invalid = [p for p, info in zip(image_files, infos) if info is None]
+                if invalid:
+                    for path in invalid:
+                        self.logger.error(f"无法识别的图片: {path}")
+                    return False
+                if source_path is not None:
+                    count_read(source_path)
+                document = docx.Document(source_path)
+
+            with stage("copy"):
+                media = append_image_pages(document, infos)
+            count_items(len(infos))
+
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with stage("serialize"), atomic_output(output_path) as f:
+                save_package(document, f, int(performance("io_buffer_size", 1024 * 1024)))
+            for path in image_files:
+                count_read(path)
+
+            self.logger.info(f"插入图片到Word文档: {output_path}，共 {len(infos)} 张（新增 {media} 个图片文件）")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"插入图片到Word文档失败: {e}")
+            return False
+
+    def images_to_docx(self, image_files: Iterable[Path], output_path: Path,
+                       workers: Optional[int] = None) -> bool:
+        """把图片合成一个Word文档，每张图片一页"""
+        return self.insert_images(None, image_files, output_path, workers)
@@ -15,10 +15,21 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import io
+import time
 import tkinter as tk
 from pathlib import Path
 from tkinter import ttk, filedialog, messagebox
 
+try:
+    from PIL import Image, ImageTk
+
+    HAVE_PIL = True
+except ImportError:
+    HAVE_PIL = False
+
+from .core.thumbnails import get_thumbnail_service
+
 
 class BaseDialog:
     """对话框基类"""
@@ -68,6 +79,90 @@ class BaseDialog:
         self.dialog.destroy()
 
 
+class ThumbnailPreview(ttk.Label):
+    """首页缩略图预览：缩略图和页数、标题在后台读取，期间对话框照常响应"""
+
+    POLL_MS = 100
+    TITLE_CHARS = 20
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, text="", anchor=tk.CENTER, compound=tk.TOP, justify=tk.CENTER, **kwargs)
+        self.service = get_thumbnail_service()
+        self._future = None
+        self._info_future = None
+        self._photo = None
+        self._status = ""
+        self._caption = ""
+
+    def prefetch(self, paths):
+        """提前在后台生成缩略图（写入缓存，之后选中时直接显示）；排在选中文件的预览之后"""
+        if not HAVE_PIL:
+            return
+        for path in paths:
+            self.service.submit(Path(path), prefetch=True)
+
+    def show(self, path):
+        """显示文件的缩略图、页数和标题，path 为空时清空"""
+        self._photo = None
+        self._caption = ""
+        if not path or not Path(path).is_file():
+            self._future = self._info_future = None
+            self._status = ""
+            self._refresh()
+            return
+        # 没有 Pillow 时无法显示图片，只显示页数和标题
+        self._future = self.service.submit(Path(path)) if HAVE_PIL else None
+        self._info_future = self.service.describe(Path(path))
+        self._status = "正在生成预览…" if HAVE_PIL else ""
+        self._refresh()
+        if self._future is not None:
+            self._poll(self._future)
+        self._poll_info(self._info_future)
+
+    def _refresh(self):
+        """更新图片和说明文字"""
+        text = "\n".join(t for t in (self._status, self._caption) if t)
+        self.configure(image=self._photo or "", text=text)
+
+    def _poll(self, future):
+        """轮询后台结果；期间又选中了其他文件时丢弃旧结果"""
+        if future is not self._future or not self.winfo_exists():
+            return
+        if not future.done():
+            self.after(self.POLL_MS, self._poll, future)
+            return
+        data = None if future.cancelled() else future.result()
+        if data is None:
+            self._status = "无法预览"
+        else:
+            self._status = ""
+            self._photo = ImageTk.PhotoImage(Image.open(io.BytesIO(data)))
+        self._refresh()
+
+    def _poll_info(self, future):
+        """轮询文档信息（页数和标题）"""
+        if future is not self._info_future or not self.winfo_exists():
+            return
+        if not future.done():
+            self.after(self.POLL_MS, self._poll_info, future)
+            return
+        info = None if future.cancelled() else future.result()
+        self._caption = self._describe(info) if info else ""
+        self._refresh()
+
+    def _describe(self, info) -> str:
+        """页数和标题的说明文字"""
+        if info["kind"] == "pdf":
+            text = f"共 {info['pages']} 页"
+        else:
+            # Word 记录的页数由上次保存的程序决定，不一定准确，只显示段落数（拆分按段落计数）
+            text = f"共 {info['meta'].get('paragraphs', 0)} 段"
+        title = (info["meta"].get("title") or "").strip()
+        if title:
+            text += "\n" + (title if len(title) <= self.TITLE_CHARS else title[:self.TITLE_CHARS] + "…")
+        return text
+
+
 class BatchCreateDialog(BaseDialog):
     """批量创建对话框"""
 
@@ -145,7 +240,7 @@ class MergeDialog(BaseDialog):
     """合并文件对话框"""
 
     def __init__(self, parent, file_type, callback):
-        super().__init__(parent, f"合并{file_type}文件", 500, 400)
+        super().__init__(parent, f"合并{file_type}文件", 720, 460)
         self.file_type = file_type
         self.callback = callback
         self.files = []
@@ -157,11 +252,16 @@ class MergeDialog(BaseDialog):
         frame = ttk.Frame(self.main_frame)
         frame.pack(fill=tk.BOTH, expand=True, pady=5)
 
+        # 选中文件的首页预览
+        self.preview = ThumbnailPreview(frame, width=24)
+        self.preview.pack(side=tk.RIGHT, fill=tk.Y, padx=(10, 0))
+
         scrollbar = ttk.Scrollbar(frame)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         self.listbox = tk.Listbox(frame, yscrollcommand=scrollbar.set, height=6)
         self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.listbox.bind("<<ListboxSelect>>", self.show_preview)
 
         scrollbar.config(command=self.listbox.yview)
 
@@ -195,6 +295,14 @@ class MergeDialog(BaseDialog):
         ttk.Button(path_frame, text="浏览",
                    command=self.browse_save_path).pack(side=tk.LEFT)
 
+        # 去掉内容相近的重复文档（如改名后重复提交的同一份文件）
+        self.skip_duplicates = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            self.main_frame,
+            text="跳过内容重复的文档",
+            variable=self.skip_duplicates
+        ).pack(anchor=tk.W, pady=2)
+
         # 按钮
         self.add_button("取消", self.destroy, tk.LEFT)
         self.add_button("合并", self.merge_files, tk.RIGHT)
@@ -211,10 +319,16 @@ class MergeDialog(BaseDialog):
             filetypes=filetypes
         )
 
-        for file in files:
-            if file not in self.files:
-                self.files.append(file)
-                self.listbox.insert(tk.END, Path(file).name)
+        added = [file for file in dict.fromkeys(files) if file not in self.files]
+        for file in added:
+            self.files.append(file)
+            self.listbox.insert(tk.END, Path(file).name)
+        self.preview.prefetch(added)
+
+    def show_preview(self, event=None):
+        """显示选中文件的缩略图"""
+        selections = self.listbox.curselection()
+        self.preview.show(self.files[selections[0]] if selections else None)
 
     def remove_selected(self):
         """移除选中"""
@@ -222,11 +336,13 @@ class MergeDialog(BaseDialog):
         for idx in reversed(selections):
             self.listbox.delete(idx)
             self.files.pop(idx)
+        self.preview.show(None)
 
     def clear_list(self):
         """清空列表"""
         self.listbox.delete(0, tk.END)
         self.files.clear()
+        self.preview.show(None)
 
     def browse_save_path(self):
         """浏览保存路径"""
@@ -260,7 +376,7 @@ class MergeDialog(BaseDialog):
             messagebox.showerror("错误", "请选择保存路径")
             return
 
-        self.callback([Path(f) for f in self.files], Path(save_path))
+        self.callback([Path(f) for f in self.files], Path(save_path), self.skip_duplicates.get())
         self.destroy()
 
 
@@ -268,10 +384,14 @@ class SplitDialog(BaseDialog):
     """拆分文件对话框"""
 
     def __init__(self, parent, file_type, callback):
-        super().__init__(parent, f"拆分{file_type}文件", 400, 300)
+        super().__init__(parent, f"拆分{file_type}文件", 620, 340)
         self.file_type = file_type
         self.callback = callback
 
+        # 选中文件的首页预览
+        self.preview = ThumbnailPreview(self.main_frame, width=24)
+        self.preview.pack(side=tk.RIGHT, fill=tk.Y, padx=(10, 0))
+
         # 选择文件
         self.add_label(f"选择{file_type}文件:")
 
@@ -281,6 +401,7 @@ class SplitDialog(BaseDialog):
         self.file_var = tk.StringVar()
         self.file_entry = ttk.Entry(file_frame, textvariable=self.file_var)
         self.file_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        self.file_var.trace_add("write", lambda *_: self.preview.show(self.file_var.get()))
 
         ttk.Button(file_frame, text="浏览",
                    command=self.browse_file).pack(side=tk.LEFT)
@@ -448,9 +569,10 @@ class ConvertDialog(BaseDialog):
 
     def __init__(self, parent, convert_type, callback):
         title = "Word转PDF" if convert_type == "Word转PDF" else "PDF转Word"
-        super().__init__(parent, title, 400, 250)
+        super().__init__(parent, title, 400, 320)
         self.convert_type = convert_type
         self.callback = callback
+        self.sources = []
 
         # 源文件
         if convert_type == "Word转PDF":
@@ -484,10 +606,35 @@ class ConvertDialog(BaseDialog):
         ttk.Button(target_frame, text="浏览",
                    command=self.browse_target).pack(side=tk.LEFT)
 
+        # 批量转换：选择多个源文件，目标为输出目录（不选时输出到源文件所在目录）
+        self.batch = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            self.main_frame,
+            text="批量转换（选择多个文件，保存到目录）",
+            variable=self.batch,
+            command=self.toggle_batch
+        ).pack(anchor=tk.W, pady=2)
+
+        self.skip_duplicates = tk.BooleanVar(value=False)
+        self.skip_check = ttk.Checkbutton(
+            self.main_frame,
+            text="跳过内容重复的文档",
+            variable=self.skip_duplicates,
+            state=tk.DISABLED
+        )
+        self.skip_check.pack(anchor=tk.W, pady=2)
+
         # 按钮
         self.add_button("取消", self.destroy, tk.LEFT)
         self.add_button("转换", self.convert_file, tk.RIGHT)
 
+    def toggle_batch(self):
+        """切换单个/批量转换"""
+        self.sources = []
+        self.source_var.set("")
+        self.target_var.set("")
+        self.skip_check.configure(state=tk.NORMAL if self.batch.get() else tk.DISABLED)
+
     def browse_source(self):
         """浏览源文件"""
         if self.convert_type == "Word转PDF":
@@ -495,6 +642,16 @@ class ConvertDialog(BaseDialog):
         else:
             filetypes = [("PDF文档", "*.pdf"), ("所有文件", "*.*")]
 
+        if self.batch.get():
+            files = filedialog.askopenfilenames(
+                title="选择源文件",
+                filetypes=filetypes
+            )
+            if files:
+                self.sources = [Path(f) for f in files]
+                self.source_var.set(f"已选择 {len(files)} 个文件")
+            return
+
         file = filedialog.askopenfilename(
             title="选择源文件",
             filetypes=filetypes
@@ -505,6 +662,12 @@ class ConvertDialog(BaseDialog):
 
     def browse_target(self):
         """浏览目标文件"""
+        if self.batch.get():
+            path = filedialog.askdirectory(title="选择保存目录")
+            if path:
+                self.target_var.set(path)
+            return
+
         if self.convert_type == "Word转PDF":
             filetypes = [("PDF文档", "*.pdf"), ("所有文件", "*.*")]
             defaultext = ".pdf"
@@ -523,6 +686,15 @@ class ConvertDialog(BaseDialog):
 
     def convert_file(self):
         """转换文件"""
+        if self.batch.get():
+            if not self.sources:
+                messagebox.showerror("错误", "请选择源文件")
+                return
+            target = self.target_var.get()
+            self.callback(self.sources, Path(target) if target else None, True, self.skip_duplicates.get())
+            self.destroy()
+            return
+
         source = self.source_var.get()
         target = self.target_var.get()
 
@@ -536,3 +708,110 @@ class ConvertDialog(BaseDialog):
 
         self.callback(Path(source), Path(target) if target else None, False)
         self.destroy()
+
+
+class HistoryDialog(BaseDialog):
+    """任务历史对话框（按页查询，不一次性加载全部历史）"""
+
+    PAGE_SIZE = 100
+
+    def __init__(self, parent, history):
+        super().__init__(parent, "任务历史", 900, 520)
+        self.history = history
+        # 每一页第一条之前的翻页位置，用于返回上一页
+        self.page_starts = [None]
+        self.next_cursor = None
+
+        # 搜索条件
+        search_frame = ttk.Frame(self.main_frame)
+        search_frame.pack(fill=tk.X, pady=5)
+
+        ttk.Label(search_frame, text="关键字:").pack(side=tk.LEFT)
+        self.text_var = tk.StringVar()
+        text_entry = ttk.Entry(search_frame, textvariable=self.text_var, width=30)
+        text_entry.pack(side=tk.LEFT, padx=5)
+        text_entry.bind("<Return>", lambda event: self.search())
+
+        ttk.Label(search_frame, text="操作:").pack(side=tk.LEFT)
+        self.operation_var = tk.StringVar(value="全部")
+        ttk.Combobox(search_frame, textvariable=self.operation_var, state="readonly", width=20,
+                     values=["全部"] + history.operations()).pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(search_frame, text="最近天数:").pack(side=tk.LEFT)
+        self.days_var = tk.StringVar(value="90")
+        ttk.Entry(search_frame, textvariable=self.days_var, width=6).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(search_frame, text="查询", command=self.search).pack(side=tk.LEFT, padx=5)
+
+        # 结果列表
+        frame = ttk.Frame(self.main_frame)
+        frame.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        columns = ("time", "operation", "status", "duration", "inputs", "outputs")
+        self.tree = ttk.Treeview(frame, columns=columns, show="headings", height=14)
+        for column, text, width in (("time", "时间", 140), ("operation", "操作", 130), ("status", "状态", 60),
+                                    ("duration", "耗时", 70), ("inputs", "输入", 230), ("outputs", "输出", 230)):
+            self.tree.heading(column, text=text)
+            self.tree.column(column, width=width, anchor=tk.W)
+
+        scrollbar = ttk.Scrollbar(frame, command=self.tree.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # 翻页
+        self.page_label = ttk.Label(self.main_frame, text="")
+        self.page_label.pack(side=tk.LEFT, pady=10)
+        self.add_button("关闭", self.destroy, tk.RIGHT)
+        self.next_btn = self.add_button("下一页", self.next_page, tk.RIGHT)
+        self.prev_btn = self.add_button("上一页", self.prev_page, tk.RIGHT)
+
+        self.search()
+
+    def _query(self, before):
+        """查询一页"""
+        operation = self.operation_var.get()
+        try:
+            days = float(self.days_var.get())
+            since = time.time() - days * 86400 if days > 0 else None
+        except ValueError:
+            since = None
+        return self.history.search_jobs(text=self.text_var.get().strip(),
+                                        operation=None if operation == "全部" else operation,
+                                        since=since, before=before, limit=self.PAGE_SIZE)
+
+    def _show(self, before):
+        """显示从 before 开始的一页"""
+        jobs = self._query(before)
+        self.tree.delete(*self.tree.get_children())
+        for job in jobs:
+            self.tree.insert("", tk.END, values=(
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(job["started_at"])),
+                job["operation"],
+                "成功" if job["status"] == "ok" else "失败",
+                f"{job['duration'] or 0:.2f}s",
+                "; ".join(Path(p).name for p in job["inputs"]),
+                "; ".join(Path(p).name for p in job["outputs"]),
+            ))
+
+        self.next_cursor = (jobs[-1]["started_at"], jobs[-1]["id"]) if len(jobs) == self.PAGE_SIZE else None
+        self.page_label.config(text=f"第 {len(self.page_starts)} 页")
+        self.prev_btn.config(state=tk.NORMAL if len(self.page_starts) > 1 else tk.DISABLED)
+        self.next_btn.config(state=tk.NORMAL if self.next_cursor else tk.DISABLED)
+
+    def search(self):
+        """按条件重新查询"""
+        self.page_starts = [None]
+        self._show(None)
+
+    def next_page(self):
+        """下一页"""
+        if self.next_cursor:
+            self.page_starts.append(self.next_cursor)
+            self._show(self.next_cursor)
+
+    def prev_page(self):
+        """上一页"""
+        if len(self.page_starts) > 1:
+            self.page_starts.pop()
+            self._show(self.page_starts[-1])
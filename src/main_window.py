@@ -16,6 +16,7 @@ limitations under the License.
 """
 
 import logging
+import time
 import tkinter as tk
 from pathlib import Path
 from tkinter import ttk, messagebox
@@ -28,8 +29,10 @@ from .core.pdf_handler import PDFHandler
 from .core.word_handler import WordHandler
 from .dialogs import (
     BatchCreateDialog, MergeDialog,
-    SplitDialog, MoveDialog, ConvertDialog
+    SplitDialog, MoveDialog, ConvertDialog,
+    HistoryDialog
 )
+from .utils.history import get_history, migrate_recent_files
 
 
 class MainWindow:
@@ -65,6 +68,42 @@ class MainWindow:
         self.converter = Converter()
         self.logger = logging.getLogger("WPQuickPass")
 
+        # 任务历史和最近文件（旧版本保存在配置文件中的最近文件会迁移过来）
+        self.history = None
+        try:
+            self.history = get_history()
+            from config import get_config
+            migrate_recent_files(self.history, get_config())
+            days = int(get_config().get("options.history_days", 0) or 0)
+            if days > 0:
+                pruned = self.history.prune_jobs(time.time() - days * 86400)
+                if pruned:
+                    self.logger.info(f"删除 {pruned} 条 {days} 天前的任务记录")
+        except Exception as e:
+            self.logger.error(f"历史库初始化失败: {e}")
+
+    def run_job(self, operation, inputs, outputs, func, *args):
+        """执行一次操作并记录到任务历史"""
+        started = time.time()
+        result = func(*args)
+        if isinstance(result, list):
+            outputs = result
+
+        if self.history is not None:
+            try:
+                self.history.record_job(operation, inputs, outputs,
+                                        status="ok" if result else "failed",
+                                        started_at=started, finished_at=time.time())
+                if result:
+                    # 只把文档记入最近文件，输出目录不算
+                    for path in list(inputs) + list(outputs):
+                        kind = Path(path).suffix.lstrip(".").lower()
+                        if kind:
+                            self.history.add_recent(path, kind)
+            except Exception as e:
+                self.logger.error(f"记录任务历史失败: {e}")
+        return result
+
     def load_images(self):
         """加载图片"""
         # 图片资源 assets/images/*.png
@@ -205,6 +244,8 @@ class MainWindow:
         self.status_label = ttk.Label(frame, text="WP", anchor=tk.W)
         self.status_label.pack(side=tk.LEFT, padx=10)
 
+        ttk.Button(frame, text="📜 任务历史", command=self.on_history).pack(side=tk.RIGHT, padx=10)
+
     def center_window(self):
         """窗口居中"""
         self.root.update_idletasks()
@@ -224,7 +265,8 @@ class MainWindow:
         """Word批量生成"""
 
         def callback(count, prefix, save_path):
-            if self.word_handler.create_multiple(count, prefix, save_path):
+            if self.run_job("word.create_multiple", [], [(save_path or self.word_handler.default_save_path) / prefix],
+                            self.word_handler.create_multiple, count, prefix, save_path):
                 messagebox.showinfo("成功", f"创建了 {count} 个Word文档")
 
         BatchCreateDialog(self.root, "Word", callback)
@@ -233,7 +275,7 @@ class MainWindow:
         """Word移动/重命名"""
 
         def callback(source, target):
-            if self.word_handler.move_file(source, target):
+            if self.run_job("word.move_file", [source], [target], self.word_handler.move_file, source, target):
                 messagebox.showinfo("成功", "文件移动成功")
 
         MoveDialog(self.root, "Word", callback)
@@ -241,8 +283,9 @@ class MainWindow:
     def on_word_merge(self):
         """Word合并"""
 
-        def callback(files, output):
-            if self.word_handler.merge_files(files, output):
+        def callback(files, output, skip_duplicates):
+            if self.run_job("word.merge_files", files, [output], self.word_handler.merge_files,
+                            files, output, skip_duplicates):
                 messagebox.showinfo("成功", "文档合并成功")
 
         MergeDialog(self.root, "Word", callback)
@@ -251,7 +294,8 @@ class MainWindow:
         """Word拆分"""
 
         def callback(source, position, output_dir):
-            results = self.word_handler.split_file(source, position, output_dir)
+            results = self.run_job("word.split_file", [source], [],
+                                   self.word_handler.split_file, source, position, output_dir)
             if results:
                 messagebox.showinfo("成功", f"拆分为 {len(results)} 个文件")
 
@@ -262,7 +306,8 @@ class MainWindow:
         """PDF批量生成"""
 
         def callback(count, prefix, save_path):
-            if self.pdf_handler.create_multiple(count, prefix, save_path):
+            if self.run_job("pdf.create_multiple", [], [(save_path or self.pdf_handler.default_save_path) / prefix],
+                            self.pdf_handler.create_multiple, count, prefix, save_path):
                 messagebox.showinfo("成功", f"创建了 {count} 个PDF文档")
 
         BatchCreateDialog(self.root, "PDF", callback)
@@ -271,7 +316,7 @@ class MainWindow:
         """PDF移动/重命名"""
 
         def callback(source, target):
-            if self.pdf_handler.move_file(source, target):
+            if self.run_job("pdf.move_file", [source], [target], self.pdf_handler.move_file, source, target):
                 messagebox.showinfo("成功", "文件移动成功")
 
         MoveDialog(self.root, "PDF", callback)
@@ -279,8 +324,9 @@ class MainWindow:
     def on_pdf_merge(self):
         """PDF合并"""
 
-        def callback(files, output):
-            if self.pdf_handler.merge_files(files, output):
+        def callback(files, output, skip_duplicates):
+            if self.run_job("pdf.merge_files", files, [output], self.pdf_handler.merge_files,
+                            files, output, None, skip_duplicates):
                 messagebox.showinfo("成功", "文档合并成功")
 
         MergeDialog(self.root, "PDF", callback)
@@ -289,7 +335,8 @@ class MainWindow:
         """PDF拆分"""
 
         def callback(source, position, output_dir):
-            results = self.pdf_handler.split_file(source, position, output_dir)
+            results = self.run_job("pdf.split_file", [source], [],
+                                   self.pdf_handler.split_file, source, position, output_dir)
             if results:
                 messagebox.showinfo("成功", f"拆分为 {len(results)} 个文件")
 
@@ -299,12 +346,12 @@ class MainWindow:
     def on_word_to_pdf(self):
         """Word转PDF"""
 
-        def callback(source, target, batch=False):
+        def callback(source, target, batch=False, skip_duplicates=False):
             if batch:
-                # 批量转换
-                messagebox.showwarning("提示", "批量转换功能正在开发中")
+                self.convert_batch(source, target, skip_duplicates)
             else:
-                if self.converter.word_to_pdf(source, target):
+                if self.run_job("convert.word_to_pdf", [source], [target] if target else [],
+                                self.converter.word_to_pdf, source, target):
                     messagebox.showinfo("成功", "转换成功")
 
         ConvertDialog(self.root, "Word转PDF", callback)
@@ -312,16 +359,32 @@ class MainWindow:
     def on_pdf_to_word(self):
         """PDF转Word"""
 
-        def callback(source, target, batch=False):
+        def callback(source, target, batch=False, skip_duplicates=False):
             if batch:
-                # 批量转换
-                messagebox.showwarning("提示", "批量转换功能正在开发中")
+                self.convert_batch(source, target, skip_duplicates)
             else:
-                if self.converter.pdf_to_word(source, target):
+                if self.run_job("convert.pdf_to_word", [source], [target] if target else [],
+                                self.converter.pdf_to_word, source, target):
                     messagebox.showinfo("成功", "转换成功")
 
         ConvertDialog(self.root, "PDF转Word", callback)
 
+    def convert_batch(self, sources, output_dir, skip_duplicates):
+        """批量转换（按扩展名决定方向），可先跳过内容重复的文档"""
+        results = self.run_job("convert.batch", sources, [output_dir] if output_dir else [],
+                               self.converter.convert_batch, sources, output_dir, skip_duplicates)
+        if results:
+            messagebox.showinfo("成功", f"已转换 {len(results)}/{len(sources)} 个文件")
+        else:
+            messagebox.showerror("错误", "批量转换失败")
+
+    def on_history(self):
+        """任务历史"""
+        if self.history is None:
+            messagebox.showerror("错误", "历史库不可用")
+            return
+        HistoryDialog(self.root, self.history)
+
     def run(self):
         """运行主循环"""
         self.root.mainloop()
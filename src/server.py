@@ -0,0 +1,628 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+本地HTTP文档处理服务
+
+    python -m src.server serve --port 8765
+    python -m src.server loadtest --port 8765 --concurrency 8 --requests 100
+
+接口：
+    POST   /uploads                 上传文件（请求体即文件内容），返回 upload_id
+    POST   /jobs/merge              {"type": "pdf", "uploads": [...], "name": "合并文档", "dedup": "skip",
+                                     "skip_duplicates": true, "linearize": true, "compact": true}
+    POST   /jobs/split              {"type": "pdf", "upload": "...", "split_pos": 1, "linearize": true, "compact": true}
+    POST   /jobs/create             {"type": "word", "count": 3, "prefix": "文档"}
+    POST   /jobs/convert            {"direction": "word_to_pdf", "upload": "..."}
+    POST   /jobs/optimize           {"upload": "...", "dpi": 150, "quality": 75}
+    POST   /jobs/images             {"uploads": [...], "name": "图片文档", "page_size": "a4", "cleanup": "bw", "format": "pdf"}
+    POST   /jobs/stamp              {"uploads": [...], "text": "DRAFT", "position": "center", "opacity": 0.3}
+    POST   /jobs/transform          {"upload": "...", "operations": [{"op": "rotate", "degrees": 90, "pages": "1-3"},
+                                     {"op": "crop", "top": 36}, {"op": "delete", "pages": "-1"}]}
+    GET    /jobs/<job_id>/<name>    下载结果文件
+    DELETE /jobs/<job_id>           删除任务结果
+    GET    /health                  服务状态
+    GET    /metrics                 Prometheus格式的处理统计
+    GET    /metrics/jsonl           JSON Lines格式的最近操作记录
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import re
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from .utils.log_utils import apply_levels, forward_from, install_worker_logging, job_context, setup_queue_logging
+from .utils.metrics import get_metrics
+from .utils.settings import default_workers, on_change, performance, worker_count
+
+CHUNK_SIZE = 256 * 1024
+MAX_HEADER_SIZE = 64 * 1024
+_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# 图片合成PDF的页面尺寸（磅），original 表示与图片同大
+_PAGE_SIZES = {"original": None, "a4": (595.2756, 841.8898), "letter": (612.0, 792.0)}
+
+_STATUS_TEXT = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 411: "Length Required", 413: "Payload Too Large",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+def _handler_for(file_type: str):
+    """按文件类型创建处理器（每个任务独立实例）"""
+    from .core.pdf_handler import PDFHandler
+    from .core.word_handler import WordHandler
+
+    if file_type == "pdf":
+        return PDFHandler()
+    if file_type == "word":
+        return WordHandler()
+    raise ValueError(f"不支持的文件类型: {file_type}")
+
+
+def _init_worker(log_queue, level: str):
+    """工作进程初始化：日志交给主进程写出"""
+    install_worker_logging(log_queue, level)
+
+
+def _execute_job(job_id: str, operation: str, params: dict, job_dir: str) -> dict:
+    """在工作进程中执行任务，返回结果文件相对路径和本次的统计记录"""
+    try:
+        with job_context(job_id):
+            outputs = _run_operation(operation, params, job_dir)
+    finally:
+        records = get_metrics().drain()
+    return {"outputs": outputs, "metrics": records}
+
+
+def _pdf_options(params: dict) -> dict:
+    """PDF 专有的输出选项（Word 任务忽略）；服务的批量任务默认以对象流紧凑写出"""
+    if params.get("type") != "pdf":
+        return {}
+    return {"linearize": bool(params.get("linearize")), "compact": bool(params.get("compact", True))}
+
+
+def _check_filename(value) -> Optional[str]:
+    """检查客户端给出的文件名/前缀，返回错误说明（合法时返回 None）"""
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        return "必须是字符串"
+    if any(sep in value for sep in ("/", "\\", ":", "\0")) or ".." in value:
+        return "不能包含路径分隔符或 .."
+    return None
+
+
+def _inside(output_dir: Path, path: Path) -> Path:
+    """确认输出路径位于任务目录内（防止写到任务目录以外）"""
+    if not path.resolve().is_relative_to(output_dir.resolve()):
+        raise ValueError(f"输出路径不在任务目录内: {path}")
+    return path
+
+
+def _run_operation(operation: str, params: dict, job_dir: str) -> List[str]:
+    """执行具体操作"""
+    output_dir = Path(job_dir) / "output"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if operation == "merge":
+        handler = _handler_for(params["type"])
+        output_path = _inside(output_dir, output_dir / f"{params.get('name') or '合并文档'}{handler.file_ext}")
+        inputs = [Path(p) for p in params["inputs"]]
+        skip_duplicates = bool(params.get("skip_duplicates"))
+        options = _pdf_options(params)
+        if params.get("dedup"):
+            options["dedup"] = params["dedup"]
+        ok = handler.merge_files(inputs, output_path, skip_duplicates=skip_duplicates, **options)
+    elif operation == "optimize":
+        handler = _handler_for("pdf")
+        source = Path(params["inputs"][0])
+        ok = bool(handler.optimize(source, output_dir / f"{source.stem}_优化.pdf",
+                                   target_dpi=int(params.get("dpi", 150)),
+                                   jpeg_quality=int(params.get("quality", 75))))
+    elif operation == "images" and params.get("format") == "docx":
+        handler = _handler_for("word")
+        ok = handler.images_to_docx([Path(p) for p in params["inputs"]],
+                                    _inside(output_dir, output_dir / f"{params.get('name') or '图片文档'}.docx"),
+                                    workers=1)
+    elif operation == "images":
+        handler = _handler_for("pdf")
+        page_size = _PAGE_SIZES[params.get("page_size") or "original"]
+        # 服务的工作进程已经并行处理多个任务，清理在本进程内完成
+        ok = handler.images_to_pdf([Path(p) for p in params["inputs"]],
+                                   _inside(output_dir, output_dir / f"{params.get('name') or '图片文档'}.pdf"),
+                                   page_size,
+                                   workers=1, cleanup=params.get("cleanup") or None)
+    elif operation == "stamp":
+        handler = _handler_for("pdf")
+        outputs = handler.stamp([Path(p) for p in params["inputs"]], output_dir, params.get("text") or "DRAFT",
+                                position=params.get("position") or "center",
+                                font_size=float(params.get("font_size", 48)), angle=float(params.get("angle", 45)),
+                                opacity=float(params.get("opacity", 0.3)), workers=1,
+                                compact=bool(params.get("compact", True)))
+        ok = len(outputs) == len(params["inputs"])
+    elif operation == "transform":
+        handler = _handler_for("pdf")
+        source = Path(params["inputs"][0])
+        transform = handler.transform(source).apply_spec(params.get("operations") or [])
+        ok = transform.write(output_dir / f"{source.stem}_变换.pdf", compact=bool(params.get("compact", True)),
+                             linearize=bool(params.get("linearize")))
+    elif operation == "split":
+        handler = _handler_for(params["type"])
+        ok = bool(handler.split_file(Path(params["inputs"][0]), int(params["split_pos"]), output_dir,
+                                     **_pdf_options(params)))
+    elif operation == "create":
+        handler = _handler_for(params["type"])
+        prefix = params.get("prefix") or "文档"
+        _inside(output_dir, output_dir / prefix)
+        ok = handler.create_multiple(int(params["count"]), prefix, output_dir,
+                                     **_pdf_options(params))
+    elif operation == "convert":
+        from .core.converter import Converter
+
+        converter = Converter()
+        source = Path(params["inputs"][0])
+        if params["direction"] == "word_to_pdf":
+            ok = converter.word_to_pdf(source, output_dir / f"{source.stem}.pdf")
+        elif params["direction"] == "pdf_to_word":
+            ok = converter.pdf_to_word(source, output_dir / f"{source.stem}.docx")
+        else:
+            raise ValueError(f"不支持的转换方向: {params['direction']}")
+    else:
+        raise ValueError(f"不支持的操作: {operation}")
+
+    if not ok:
+        raise RuntimeError(f"{operation} 处理失败，详见服务日志")
+
+    return sorted(p.relative_to(output_dir).as_posix() for p in output_dir.rglob("*") if p.is_file())
+
+
+class HTTPError(Exception):
+    """带状态码的请求错误"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class DocumentServer:
+    """基于asyncio的本地文档处理服务"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, workers: Optional[int] = None,
+                 queue_size: Optional[int] = None, max_upload: int = 512 * 1024 * 1024, work_root: Optional[Path] = None):
+        self.host = host
+        self.port = port
+        self.workers = workers or worker_count("server", default_workers())
+        self._queue_size = queue_size
+        self.max_upload = max_upload
+        self.logger = logging.getLogger("WP_Express")
+
+        self.work_root = Path(work_root or tempfile.mkdtemp(prefix="wp_express_server_"))
+        self.upload_dir = self.work_root / "uploads"
+        self.job_root = self.work_root / "jobs"
+
+        self._pool = None
+        self._log_listener = None
+        self._server = None
+        self._pending = 0
+        self._slots = None
+        self._jobs: Dict[str, List[str]] = {}
+
+    # ---------- 生命周期 ----------
+
+    async def start(self):
+        """启动服务"""
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self.job_root.mkdir(parents=True, exist_ok=True)
+        # 使用spawn：工作进程不继承已接受的连接套接字（与Windows行为一致）
+        self._context = multiprocessing.get_context("spawn")
+        self._log_queue = self._context.Queue()
+        self._log_listener = forward_from(self._log_queue)
+        self._pool = self._create_pool()
+        self._slots = asyncio.Semaphore(self.workers)
+        # 排队上限、内存预算和日志级别在配置文件修改后直接生效，进程数需要重启服务
+        on_change(self._on_config_change)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_SIZE)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.logger.info(f"文档服务已启动: http://{self.host}:{self.port}，工作进程: {self.workers}")
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        """创建工作进程池"""
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context,
+                                   initializer=_init_worker,
+                                   initargs=(self._log_queue, logging.getLevelName(self.logger.getEffectiveLevel())))
+
+    def _on_config_change(self, config):
+        """配置文件重新加载"""
+        apply_levels(config.get("logging.levels"))
+        self.logger.info(f"配置已重新加载，排队上限: {self.queue_size}")
+
+    @property
+    def queue_size(self) -> int:
+        """排队上限（未在构造时指定时读取配置，修改后立即生效）"""
+        if self._queue_size is not None:
+            return self._queue_size
+        return int(performance("server_queue_size", 32))
+
+    def _check_memory(self, records: List[dict]):
+        """任务峰值内存超过 performance.max_rss_mb 时重建进程池，释放工作进程占用的内存"""
+        budget = int(performance("max_rss_mb", 0) or 0) * 1024 * 1024
+        if not budget:
+            return
+        peak = max((record.get("peak_rss", 0) for record in records), default=0)
+        if peak > budget:
+            self.logger.warning(f"工作进程内存 {peak / 1048576:.0f} MB 超过预算，重建进程池")
+            # 正在执行的任务会在旧进程池中继续完成
+            old_pool, self._pool = self._pool, self._create_pool()
+            old_pool.shutdown(wait=False)
+
+    async def serve_forever(self):
+        """启动并一直运行"""
+        await self.start()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        """关闭服务并清理临时文件"""
+        if self._server is not None:
+            self._server.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._log_listener is not None:
+            self._log_listener.stop()
+        shutil.rmtree(self.work_root, ignore_errors=True)
+        self.logger.info("文档服务已关闭")
+
+    # ---------- HTTP ----------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理单个连接（每个连接一个请求）"""
+        try:
+            try:
+                method, path, headers = await self._read_head(reader)
+                await self._dispatch(method, path, headers, reader, writer)
+            except HTTPError as e:
+                await self._send_json(writer, e.status, {"error": str(e)})
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                pass
+            except Exception as e:
+                self.logger.error(f"请求处理失败: {e}", exc_info=True)
+                await self._send_json(writer, 500, {"error": str(e)})
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _read_head(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str]]:
+        """读取请求行和请求头"""
+        raw = await reader.readuntil(b"\r\n\r\n")
+        lines = raw.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "请求行无效")
+
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        return method.upper(), unquote(target.split("?", 1)[0]), headers
+
+    async def _dispatch(self, method, path, headers, reader, writer):
+        """路由"""
+        parts = [p for p in path.split("/") if p]
+
+        if parts == ["health"] and method == "GET":
+            await self._send_json(writer, 200, {
+                "status": "ok", "workers": self.workers,
+                "pending": self._pending, "queue_size": self.queue_size,
+            })
+        elif parts == ["metrics"] and method == "GET":
+            await self._send_text(writer, 200, get_metrics().to_prometheus(), "text/plain; version=0.0.4")
+        elif parts == ["metrics", "jsonl"] and method == "GET":
+            await self._send_text(writer, 200, get_metrics().to_json_lines(), "application/x-ndjson")
+        elif parts == ["uploads"] and method == "POST":
+            upload_id = await self._receive_upload(headers, reader)
+            await self._send_json(writer, 201, {"upload_id": upload_id})
+        elif len(parts) == 2 and parts[0] == "jobs" and method == "POST":
+            try:
+                params = json.loads((await self._read_body(headers, reader, MAX_HEADER_SIZE)) or b"{}")
+            except ValueError:
+                raise HTTPError(400, "请求体不是有效的JSON")
+            job_id, outputs = await self._submit(parts[1], params)
+            await self._send_json(writer, 200, {
+                "job_id": job_id, "outputs": outputs,
+                "urls": [f"/jobs/{job_id}/{quote(name)}" for name in outputs],
+            })
+        elif len(parts) >= 3 and parts[0] == "jobs" and method == "GET":
+            await self._send_result(writer, parts[1], "/".join(parts[2:]))
+        elif len(parts) == 2 and parts[0] == "jobs" and method == "DELETE":
+            self._delete_job(parts[1])
+            await self._send_json(writer, 200, {"deleted": parts[1]})
+        else:
+            raise HTTPError(404 if method in ("GET", "POST", "DELETE") else 405, f"未知接口: {method} {path}")
+
+    @staticmethod
+    def _content_length(headers: Dict[str, str]) -> int:
+        """解析Content-Length"""
+        if "content-length" not in headers:
+            raise HTTPError(411, "缺少 Content-Length")
+        try:
+            return int(headers["content-length"])
+        except ValueError:
+            raise HTTPError(400, "Content-Length 无效")
+
+    async def _read_body(self, headers, reader, limit: int) -> bytes:
+        """读取较小的请求体"""
+        length = self._content_length(headers) if "content-length" in headers else 0
+        if length > limit:
+            raise HTTPError(413, "请求体过大")
+        return await reader.readexactly(length) if length else b""
+
+    async def _receive_upload(self, headers, reader: asyncio.StreamReader) -> str:
+        """把上传内容分块写入临时文件"""
+        length = self._content_length(headers)
+        if length > self.max_upload:
+            raise HTTPError(413, f"上传文件超过限制: {self.max_upload} 字节")
+
+        upload_id = uuid.uuid4().hex
+        target = self.upload_dir / upload_id
+        loop = asyncio.get_running_loop()
+        try:
+            with open(target, "wb") as f:
+                remaining = length
+                while remaining > 0:
+                    # 按块读取：套接字缓冲满时发送方自然被阻塞
+                    chunk = await reader.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise HTTPError(400, "上传内容不完整")
+                    await loop.run_in_executor(None, f.write, chunk)
+                    remaining -= len(chunk)
+        except BaseException:
+            target.unlink(missing_ok=True)
+            raise
+        return upload_id
+
+    async def _submit(self, operation: str, params: dict) -> Tuple[str, List[str]]:
+        """排队执行任务（队列满时直接拒绝）"""
+        if self._pending >= self.workers + self.queue_size:
+            raise HTTPError(503, "服务繁忙，请稍后重试")
+
+        upload_ids = params.get("uploads") or ([params["upload"]] if params.get("upload") else [])
+        inputs = []
+        for upload_id in upload_ids:
+            path = self.upload_dir / upload_id
+            if not _ID_PATTERN.match(upload_id) or not path.exists():
+                raise HTTPError(400, f"上传文件不存在: {upload_id}")
+            inputs.append(str(path))
+        if operation in ("merge", "split", "convert", "optimize", "images", "stamp", "transform") and not inputs:
+            raise HTTPError(400, "缺少输入文件")
+        for key in ("name", "prefix"):
+            error = _check_filename(params.get(key))
+            if error:
+                raise HTTPError(400, f"参数 {key} 无效: {error}")
+
+        job_id = uuid.uuid4().hex
+        job_dir = self.job_root / job_id
+        job_params = {**params, "inputs": inputs}
+
+        self._pending += 1
+        try:
+            async with self._slots:
+                started = time.perf_counter()
+                loop = asyncio.get_running_loop()
+                try:
+                    result = await loop.run_in_executor(
+                        self._pool, _execute_job, job_id, operation, job_params, str(job_dir))
+                except (ValueError, KeyError) as e:
+                    shutil.rmtree(job_dir, ignore_errors=True)
+                    raise HTTPError(400, f"参数错误: {e}")
+                except Exception as e:
+                    shutil.rmtree(job_dir, ignore_errors=True)
+                    raise HTTPError(500, str(e))
+        finally:
+            self._pending -= 1
+            for path in inputs:
+                Path(path).unlink(missing_ok=True)
+
+        outputs = result["outputs"]
+        for record in result["metrics"]:
+            get_metrics().add_dict(record)
+        self._check_memory(result["metrics"])
+        self._jobs[job_id] = outputs
+        with job_context(job_id):
+            self.logger.info(f"任务完成: {operation}，耗时 {time.perf_counter() - started:.2f}s")
+        return job_id, outputs
+
+    def _result_path(self, job_id: str, name: str) -> Path:
+        """定位结果文件（拒绝越界路径）"""
+        if job_id not in self._jobs or name not in self._jobs[job_id]:
+            raise HTTPError(404, "结果不存在")
+        return self.job_root / job_id / "output" / name
+
+    async def _send_result(self, writer: asyncio.StreamWriter, job_id: str, name: str):
+        """分块流式返回结果文件"""
+        path = self._result_path(job_id, name)
+        size = path.stat().st_size
+        content_type = {
+            ".pdf": "application/pdf",
+            ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        }.get(path.suffix.lower(), "application/octet-stream")
+        await self._send_head(writer, 200, {
+            "Content-Type": content_type,
+            "Content-Length": str(size),
+            "Content-Disposition": f"attachment; filename*=UTF-8''{quote(path.name)}",
+        })
+
+        loop = asyncio.get_running_loop()
+        with open(path, "rb") as f:
+            while True:
+                chunk = await loop.run_in_executor(None, f.read, CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+
+    def _delete_job(self, job_id: str):
+        """删除任务结果"""
+        if self._jobs.pop(job_id, None) is None:
+            raise HTTPError(404, "任务不存在")
+        shutil.rmtree(self.job_root / job_id, ignore_errors=True)
+
+    @staticmethod
+    async def _send_head(writer: asyncio.StreamWriter, status: int, headers: Dict[str, str]):
+        """发送状态行和响应头"""
+        lines = [f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}"]
+        lines += [f"{key}: {value}" for key, value in headers.items()]
+        lines += ["Connection: close", "", ""]
+        if status == 503:
+            lines.insert(1, "Retry-After: 1")
+        writer.write("\r\n".join(lines).encode("utf-8"))
+        await writer.drain()
+
+    async def _send_text(self, writer: asyncio.StreamWriter, status: int, text: str, content_type: str):
+        """发送文本响应"""
+        body = text.encode("utf-8")
+        await self._send_head(writer, status, {
+            "Content-Type": f"{content_type}; charset=utf-8",
+            "Content-Length": str(len(body)),
+        })
+        writer.write(body)
+        await writer.drain()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, data: dict):
+        """发送JSON响应"""
+        await self._send_text(writer, status, json.dumps(data, ensure_ascii=False), "application/json")
+
+
+# ---------- 本地压测 ----------
+
+async def _request(host: str, port: int, method: str, path: str, body: bytes = b"") -> Tuple[int, bytes]:
+    """发送一个HTTP请求"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+        writer.write(head.encode("utf-8") + body)
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), payload
+
+
+async def load_test(host: str, port: int, concurrency: int, requests: int, file_type: str = "pdf") -> dict:
+    """对本地服务做并发压测：上传 → 合并 → 下载"""
+    _, sample = await _request(host, port, "POST", "/jobs/create",
+                               json.dumps({"type": file_type, "count": 1, "prefix": "压测"}).encode())
+    created = json.loads(sample)
+    status, content = await _request(host, port, "GET", created["urls"][0])
+    await _request(host, port, "DELETE", f"/jobs/{created['job_id']}")
+
+    latencies = []
+    statuses: Dict[int, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            uploads = []
+            for _ in range(2):
+                _, payload = await _request(host, port, "POST", "/uploads", content)
+                uploads.append(json.loads(payload)["upload_id"])
+            status, payload = await _request(host, port, "POST", "/jobs/merge",
+                                             json.dumps({"type": file_type, "uploads": uploads}).encode())
+            if status == 200:
+                job = json.loads(payload)
+                status, _ = await _request(host, port, "GET", job["urls"][0])
+                await _request(host, port, "DELETE", f"/jobs/{job['job_id']}")
+            statuses[status] = statuses.get(status, 0) + 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed": round(elapsed, 3),
+        "throughput": round(requests / elapsed, 2) if elapsed else 0,
+        "p50": round(latencies[len(latencies) // 2], 4) if latencies else 0,
+        "p95": round(latencies[int(len(latencies) * 0.95) - 1], 4) if latencies else 0,
+        "statuses": statuses,
+    }
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="WP快通 本地文档处理服务")
+    sub = parser.add_subparsers(dest="command")
+
+    serve = sub.add_parser("serve", help="启动服务")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--workers", type=int, default=None)
+    serve.add_argument("--queue-size", type=int, default=None)
+
+    bench = sub.add_parser("loadtest", help="本地压测")
+    bench.add_argument("--host", default="127.0.0.1")
+    bench.add_argument("--port", type=int, default=8765)
+    bench.add_argument("--concurrency", type=int, default=8)
+    bench.add_argument("--requests", type=int, default=50)
+    bench.add_argument("--type", default="pdf", choices=["pdf", "word"])
+
+    args = parser.parse_args(argv)
+
+    if args.command == "loadtest":
+        result = asyncio.run(load_test(args.host, args.port, args.concurrency, args.requests, args.type))
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+
+    if args.command is None:
+        args = parser.parse_args(["serve"] + list(argv or sys.argv[1:]))
+
+    setup_queue_logging(console=True)
+    server = DocumentServer(args.host, args.port, args.workers, args.queue_size)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,9 +15,17 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import errno
+import fnmatch
+import os
 import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .settings import performance, worker_count
 
 
 def ensure_directory(path: Path) -> bool:
@@ -29,17 +37,124 @@ def ensure_directory(path: Path) -> bool:
         return False
 
 
+class _DirectoryState:
+    """单个目录的索引：已存在的文件名、已预留的文件名和编号提示"""
+
+    __slots__ = ("mtime_ns", "names", "reserved", "counters")
+
+    def __init__(self):
+        self.mtime_ns = None
+        self.names = set()
+        self.reserved = set()
+        self.counters = {}
+
+
+class DirectoryIndex:
+    """输出目录文件名索引：在内存中预留不冲突的文件名，目录修改时间变化时重新扫描"""
+
+    def __init__(self, max_directories: int = 256):
+        self.max_directories = max_directories
+        self._lock = threading.Lock()
+        self._dirs: "OrderedDict[str, _DirectoryState]" = OrderedDict()
+
+    def _state(self, directory: Path) -> _DirectoryState:
+        """获取目录索引（调用方需持有锁）"""
+        key = os.path.normcase(os.path.abspath(directory))
+        state = self._dirs.get(key)
+        if state is None:
+            state = self._dirs[key] = _DirectoryState()
+            if len(self._dirs) > self.max_directories:
+                self._dirs.popitem(last=False)
+        else:
+            self._dirs.move_to_end(key)
+
+        try:
+            mtime_ns = os.stat(key).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+
+        if state.mtime_ns is None or mtime_ns != state.mtime_ns:
+            state.mtime_ns = mtime_ns
+            state.names = set()
+            if mtime_ns is not None:
+                with os.scandir(key) as it:
+                    state.names = {os.path.normcase(entry.name) for entry in it}
+            # 已经写到磁盘上的预留名不再需要单独记录
+            state.reserved -= state.names
+        return state
+
+    @staticmethod
+    def _taken(state: _DirectoryState, name: str) -> bool:
+        name = os.path.normcase(name)
+        return name in state.names or name in state.reserved
+
+    def reserve(self, path: Path) -> Path:
+        """预留一个不冲突的文件名：path 可用时直接返回，否则依次尝试 stem_1、stem_2……"""
+        return self.reserve_many([path])[0]
+
+    def reserve_many(self, paths: List[Path]) -> List[Path]:
+        """批量预留文件名（同一目录只检查一次修改时间）"""
+        results = []
+        with self._lock:
+            states = {}
+            for path in paths:
+                path = Path(path)
+                parent = path.parent
+                state = states.get(parent)
+                if state is None:
+                    state = states[parent] = self._state(parent)
+
+                if self._taken(state, path.name):
+                    key = (path.stem, path.suffix)
+                    counter = state.counters.get(key, 1)
+                    while self._taken(state, f"{path.stem}_{counter}{path.suffix}"):
+                        counter += 1
+                    state.counters[key] = counter + 1
+                    path = parent / f"{path.stem}_{counter}{path.suffix}"
+
+                state.reserved.add(os.path.normcase(path.name))
+                results.append(path)
+        return results
+
+    def release(self, path: Path):
+        """释放未使用的预留文件名"""
+        with self._lock:
+            key = os.path.normcase(os.path.abspath(Path(path).parent))
+            state = self._dirs.get(key)
+            if state is not None:
+                state.reserved.discard(os.path.normcase(Path(path).name))
+
+    def invalidate(self, directory: Optional[Path] = None):
+        """清除索引（不指定目录时清除全部）"""
+        with self._lock:
+            if directory is None:
+                self._dirs.clear()
+            else:
+                self._dirs.pop(os.path.normcase(os.path.abspath(directory)), None)
+
+
+# 全局目录索引实例
+_directory_index = None
+_directory_index_lock = threading.Lock()
+
+
+def get_directory_index() -> DirectoryIndex:
+    """获取目录索引实例"""
+    global _directory_index
+    with _directory_index_lock:
+        if _directory_index is None:
+            _directory_index = DirectoryIndex(int(performance("cache.directory_index_dirs", 256)))
+    return _directory_index
+
+
 def get_unique_filename(path: Path) -> Path:
-    """获取唯一的文件名（避免覆盖）"""
-    if not path.exists():
-        return path
+    """获取唯一的文件名（避免覆盖），返回的文件名会被预留，并发调用不会得到相同结果"""
+    return get_directory_index().reserve(path)
+
 
-    counter = 1
-    while True:
-        new_path = path.parent / f"{path.stem}_{counter}{path.suffix}"
-        if not new_path.exists():
-            return new_path
-        counter += 1
+def reserve_filenames(paths: List[Path]) -> List[Path]:
+    """批量获取唯一的文件名"""
+    return get_directory_index().reserve_many(paths)
 
 
 def copy_file(source: Path, target: Path) -> bool:
@@ -60,6 +175,169 @@ def move_file(source: Path, target: Path) -> bool:
         return False
 
 
+class TransferResult:
+    """单个文件的移动/复制结果"""
+
+    __slots__ = ("source", "target", "ok", "method", "size", "error")
+
+    def __init__(self, source: Path, target: Path):
+        self.source = source
+        self.target = target
+        self.ok = False
+        self.method = None
+        self.size = 0
+        self.error = None
+
+    def __repr__(self) -> str:
+        status = self.method if self.ok else f"失败: {self.error}"
+        return f"TransferResult({str(self.source)!r} -> {str(self.target)!r}, {status})"
+
+
+def _copy_data(source: Path, target: Path, size: int, buffer_size: int, exclusive: bool = False) -> str:
+    """在内核中复制文件内容（不支持时退回普通读写），返回使用的方式
+
+    exclusive 为 True 时目标已存在即失败；复制中途出错时删除本次新建的目标文件，避免残留半截文件。
+    """
+    with open(source, 'rb') as fsrc:
+        created = exclusive or not os.path.lexists(target)
+        fdst = open(target, 'xb' if exclusive else 'wb')
+        try:
+            with fdst:
+                return _copy_stream(fsrc, fdst, size, buffer_size)
+        except BaseException:
+            if created:
+                try:
+                    os.unlink(target)
+                except OSError:
+                    pass
+            raise
+
+
+def _copy_stream(fsrc, fdst, size: int, buffer_size: int) -> str:
+    """在已打开的文件之间复制内容，返回使用的方式"""
+    if size > 0 and hasattr(os, "copy_file_range"):
+        try:
+            offset = 0
+            while offset < size:
+                sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            if offset >= size:
+                return "copy_file_range"
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+        fsrc.seek(0)
+        fdst.seek(0)
+        fdst.truncate()
+
+    if size > 0 and hasattr(os, "sendfile") and os.name != "nt":
+        try:
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            if offset >= size:
+                return "sendfile"
+        except OSError as e:
+            if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSOCK):
+                raise
+        fsrc.seek(0)
+        fdst.seek(0)
+        fdst.truncate()
+
+    shutil.copyfileobj(fsrc, fdst, buffer_size)
+    return "copy"
+
+
+def _transfer_one(result: TransferResult, move: bool, same_device: bool, overwrite: bool, buffer_size: int):
+    """移动或复制单个文件"""
+    try:
+        if not overwrite and os.path.lexists(result.target):
+            raise FileExistsError("目标文件已存在")
+
+        if move and same_device:
+            os.replace(result.source, result.target)
+            result.method = "rename"
+        else:
+            created = not os.path.lexists(result.target)
+            result.method = _copy_data(result.source, result.target, result.size, buffer_size,
+                                       exclusive=not overwrite)
+            try:
+                shutil.copystat(result.source, result.target)
+                if move:
+                    os.unlink(result.source)
+            except BaseException:
+                # 移动未完成时保留源文件，删除本次新建的目标，重试时不会因目标已存在而失败
+                if created:
+                    try:
+                        os.unlink(result.target)
+                    except OSError:
+                        pass
+                raise
+        result.ok = True
+    except Exception as e:
+        result.error = str(e)
+    return result
+
+
+def bulk_transfer(pairs: Iterable[Tuple[Path, Path]], move: bool = True, workers: Optional[int] = None,
+                  overwrite: bool = False, buffer_size: Optional[int] = None) -> List[TransferResult]:
+    """批量移动/复制文件，返回与输入顺序一致的结果列表
+
+    同一设备上的移动直接重命名；跨设备或复制时在线程池中用 copy_file_range/sendfile 复制。
+    开始前按目标设备检查剩余空间，空间不足的文件不会被处理。
+    workers 和 buffer_size 未指定时读取 performance 配置。
+    """
+    workers = workers or worker_count("transfer", 8)
+    buffer_size = buffer_size or int(performance("io_buffer_size", 1024 * 1024))
+    results = [TransferResult(Path(source), Path(target)) for source, target in pairs]
+    parent_devices = {}
+    same_device = {}
+    required = {}
+
+    for result in results:
+        try:
+            source_stat = os.stat(result.source)
+            result.size = source_stat.st_size
+            parent = result.target.parent
+            if parent not in parent_devices:
+                parent.mkdir(parents=True, exist_ok=True)
+                parent_devices[parent] = os.stat(parent).st_dev
+            device = parent_devices[parent]
+            same_device[id(result)] = source_stat.st_dev == device
+            if not (move and same_device[id(result)]):
+                required.setdefault(device, [parent, 0, []])
+                required[device][1] += result.size
+                required[device][2].append(result)
+        except Exception as e:
+            result.error = str(e)
+
+    # 预先检查各目标设备的剩余空间
+    for parent, needed, items in required.values():
+        try:
+            free = shutil.disk_usage(parent).free
+        except OSError:
+            continue
+        if needed > free:
+            for result in items:
+                result.error = f"目标磁盘空间不足: 需要 {needed} 字节，可用 {free} 字节"
+
+    todo = [result for result in results if result.error is None]
+    if workers <= 1 or len(todo) <= 1:
+        for result in todo:
+            _transfer_one(result, move, same_device[id(result)], overwrite, buffer_size)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(
+                lambda r: _transfer_one(r, move, same_device[id(r)], overwrite, buffer_size), todo))
+
+    return results
+
+
 def delete_file(path: Path) -> bool:
     """删除文件"""
     try:
@@ -78,15 +356,128 @@ def get_file_size(path: Path) -> int:
         return 0
 
 
-def list_files(directory: Path, extensions: Optional[List[str]] = None) -> List[Path]:
-    """列出目录中的文件"""
-    if not directory.exists() or not directory.is_dir():
-        return []
+class FileEntry:
+    """扫描到的文件（复用 DirEntry 缓存的类型信息，stat 延迟获取）"""
+
+    __slots__ = ("_entry", "path")
+
+    def __init__(self, entry: os.DirEntry):
+        self._entry = entry
+        self.path = Path(entry.path)
+
+    @property
+    def name(self) -> str:
+        return self._entry.name
+
+    @property
+    def suffix(self) -> str:
+        return self.path.suffix
+
+    def stat(self) -> os.stat_result:
+        """文件信息（Windows 上通常直接来自目录列表，无需额外系统调用）"""
+        return self._entry.stat()
 
-    files = []
-    for item in directory.iterdir():
-        if item.is_file():
-            if extensions is None or item.suffix.lower() in extensions:
-                files.append(item)
+    @property
+    def size(self) -> int:
+        return self.stat().st_size
 
-    return files
+    def __fspath__(self) -> str:
+        return self._entry.path
+
+    def __repr__(self) -> str:
+        return f"FileEntry({self._entry.path!r})"
+
+
+def _normalize_extensions(extensions: Optional[Iterable[str]]) -> Optional[set]:
+    """统一扩展名格式：小写并带点"""
+    if extensions is None:
+        return None
+    return {ext.lower() if ext.startswith('.') else f".{ext.lower()}" for ext in extensions}
+
+
+def _scan_directory(directory: str, extensions: Optional[set], pattern: Optional[str],
+                    follow_symlinks: bool) -> Tuple[List[FileEntry], List[str]]:
+    """扫描单个目录，返回匹配的文件和子目录"""
+    files, subdirs = [], []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=follow_symlinks):
+                        subdirs.append(entry.path)
+                    elif entry.is_file():
+                        name = entry.name
+                        if extensions is not None and os.path.splitext(name)[1].lower() not in extensions:
+                            continue
+                        if pattern is not None and not fnmatch.fnmatch(name, pattern):
+                            continue
+                        files.append(FileEntry(entry))
+                except OSError:
+                    continue
+    except OSError:
+        # 无权限或目录在扫描过程中被删除
+        pass
+    return files, subdirs
+
+
+def iter_files(directory: Path, extensions: Optional[Iterable[str]] = None, pattern: Optional[str] = None,
+               recursive: bool = False, workers: int = 1, follow_symlinks: bool = False) -> Iterator[FileEntry]:
+    """逐个产出目录中的文件，扫描到即可开始处理
+
+    extensions 如 [".pdf", ".docx"]；pattern 为文件名通配符，如 "*报告*.pdf"；
+    recursive 为 True 时扫描子目录，workers > 1 时并行扫描子目录；
+    follow_symlinks 为 True 时进入链接指向的目录，每个目录（按设备号和 inode）只扫描一次。
+    """
+    extensions = _normalize_extensions(extensions)
+    root = os.fspath(directory)
+    if not os.path.isdir(root):
+        return
+
+    # 跟随符号链接递归时，链接可能指回上层目录形成环，记录已访问的目录
+    visited = set() if follow_symlinks and recursive else None
+
+    def unvisited(paths: List[str]) -> List[str]:
+        if visited is None:
+            return paths
+        result = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            key = (st.st_dev, st.st_ino)
+            if key not in visited:
+                visited.add(key)
+                result.append(path)
+        return result
+
+    unvisited([root])
+    if workers <= 1:
+        pending = [root]
+        while pending:
+            files, subdirs = _scan_directory(pending.pop(), extensions, pattern, follow_symlinks)
+            yield from files
+            if recursive:
+                pending.extend(reversed(unvisited(subdirs)))
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {executor.submit(_scan_directory, root, extensions, pattern, follow_symlinks)}
+        try:
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs = future.result()
+                    if recursive:
+                        running |= {executor.submit(_scan_directory, subdir, extensions, pattern, follow_symlinks)
+                                    for subdir in unvisited(subdirs)}
+                    yield from files
+        finally:
+            # 调用方提前结束迭代时不再继续扫描
+            for future in running:
+                future.cancel()
+
+
+def list_files(directory: Path, extensions: Optional[List[str]] = None) -> List[Path]:
+    """列出目录中的文件"""
+    return [entry.path for entry in iter_files(directory, extensions)]
@@ -0,0 +1,293 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("WP_Express")
+
+# 版本 3：重新创建版本 2 中删除的 doc_meta 表
+SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recent_files (
+    path TEXT PRIMARY KEY,
+    kind TEXT,
+    opened_at REAL NOT NULL,
+    open_count INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_recent_opened ON recent_files (opened_at DESC);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    operation TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    duration REAL,
+    inputs TEXT NOT NULL DEFAULT '[]',
+    outputs TEXT NOT NULL DEFAULT '[]',
+    error TEXT,
+    metrics TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_started ON jobs (started_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_operation ON jobs (operation, started_at DESC);
+
+CREATE TABLE IF NOT EXISTS job_files (
+    job_id INTEGER NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_job_files_path ON job_files (path);
+CREATE INDEX IF NOT EXISTS idx_job_files_job ON job_files (job_id);
+
+CREATE TABLE IF NOT EXISTS doc_meta (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    kind TEXT,
+    pages INTEGER,
+    meta TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_doc_meta_updated ON doc_meta (updated_at);
+"""
+
+
+def _normalize(path) -> str:
+    """统一路径写法，保证同一文件只有一条记录"""
+    return os.path.normcase(os.path.abspath(str(path)))
+
+
+def _like_pattern(text: str) -> str:
+    """包含 text 的 LIKE 模式（转义 %、_ 和转义符本身，配合 ESCAPE '\\' 使用）"""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class HistoryStore:
+    """任务历史、最近文件和文档元数据存储（SQLite WAL 模式）"""
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path or Path.home() / ".WP_Express" / "history.db")
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # GUI 回调和后台线程共用一个连接，由锁保证串行
+        self._conn = sqlite3.connect(str(self.db_path), timeout=10, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._migrate()
+
+    def _migrate(self):
+        """创建或升级表结构"""
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                self._conn.executescript(_SCHEMA)
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    # 最近文件
+    def add_recent(self, path: Path, kind: Optional[str] = None, limit: int = 100):
+        """记录最近使用的文件，只保留最近 limit 条"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO recent_files (path, kind, opened_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET opened_at = excluded.opened_at, "
+                "open_count = open_count + 1, kind = COALESCE(excluded.kind, kind)",
+                (_normalize(path), kind, time.time()))
+            self._conn.execute(
+                "DELETE FROM recent_files WHERE path NOT IN "
+                "(SELECT path FROM recent_files ORDER BY opened_at DESC LIMIT ?)", (limit,))
+
+    def recent_files(self, limit: int = 20, kind: Optional[str] = None) -> List[str]:
+        """最近使用的文件，最新的在前"""
+        sql = "SELECT path FROM recent_files"
+        args: List[Any] = []
+        if kind:
+            sql += " WHERE kind = ?"
+            args.append(kind)
+        sql += " ORDER BY opened_at DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            return [row["path"] for row in self._conn.execute(sql, args)]
+
+    def import_recent_files(self, paths: Iterable[str]):
+        """导入旧配置中的最近文件列表（列表中靠前的视为较新）"""
+        now = time.time()
+        rows = [(_normalize(p), now - i) for i, p in enumerate(paths)]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO recent_files (path, opened_at) VALUES (?, ?)", rows)
+
+    # 任务历史
+    def record_job(self, operation: str, inputs: Iterable[Path] = (), outputs: Iterable[Path] = (),
+                   status: str = "ok", started_at: Optional[float] = None,
+                   finished_at: Optional[float] = None, error: Optional[str] = None,
+                   metrics: Optional[Dict[str, Any]] = None) -> int:
+        """记录一次任务，返回任务编号"""
+        inputs = [str(p) for p in inputs]
+        outputs = [str(p) for p in outputs]
+        finished_at = finished_at or time.time()
+        started_at = started_at or finished_at
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (operation, status, started_at, finished_at, duration, inputs, outputs, "
+                "error, metrics) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (operation, status, started_at, finished_at, finished_at - started_at,
+                 json.dumps(inputs, ensure_ascii=False), json.dumps(outputs, ensure_ascii=False),
+                 error, json.dumps(metrics, ensure_ascii=False) if metrics else None))
+            job_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO job_files (job_id, role, path) VALUES (?, ?, ?)",
+                [(job_id, "input", _normalize(p)) for p in inputs]
+                + [(job_id, "output", _normalize(p)) for p in outputs])
+        return job_id
+
+    def search_jobs(self, text: str = "", operation: Optional[str] = None, status: Optional[str] = None,
+                    since: Optional[float] = None, until: Optional[float] = None,
+                    before: Optional[Tuple[float, int]] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """按条件查询任务，最新的在前
+
+        每次只取一页：before 传入上一页最后一条的 (started_at, id) 即可继续向前翻页，
+        不需要 OFFSET 扫描，也不会把全部历史读进内存。
+        text 为绝对路径时按路径前缀查询，可以使用 job_files.path 索引；
+        其他关键字按包含匹配，需要扫描文件表。
+        """
+        clauses, args = [], []
+        if text and os.path.isabs(text):
+            # 该文件或该目录下的文件参与过的任务
+            prefix = _normalize(text)
+            if text.endswith(("/", os.sep)) and not prefix.endswith(os.sep):
+                prefix += os.sep
+            clauses.append("id IN (SELECT job_id FROM job_files WHERE path >= ? AND path < ?)")
+            args += [prefix, prefix + "\U0010ffff"]
+        elif text:
+            # 文件路径包含关键字，或操作名包含关键字
+            clauses.append("(operation LIKE ? ESCAPE '\\' "
+                           "OR id IN (SELECT job_id FROM job_files WHERE path LIKE ? ESCAPE '\\'))")
+            args += [_like_pattern(text), _like_pattern(os.path.normcase(text))]
+        if operation:
+            clauses.append("operation = ?")
+            args.append(operation)
+        if status:
+            clauses.append("status = ?")
+            args.append(status)
+        if since is not None:
+            clauses.append("started_at >= ?")
+            args.append(since)
+        if until is not None:
+            clauses.append("started_at < ?")
+            args.append(until)
+        if before is not None:
+            clauses.append("(started_at < ? OR (started_at = ? AND id < ?))")
+            args += [before[0], before[0], before[1]]
+
+        sql = "SELECT * FROM jobs"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY started_at DESC, id DESC LIMIT ?"
+        args.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [self._job_dict(row) for row in rows]
+
+    def operations(self) -> List[str]:
+        """历史中出现过的操作名称"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT operation FROM jobs ORDER BY 1")]
+
+    def prune_jobs(self, older_than: float) -> int:
+        """删除早于指定时间的任务记录，返回删除条数"""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM jobs WHERE started_at < ?", (older_than,)).rowcount
+
+    @staticmethod
+    def _job_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["inputs"] = json.loads(job["inputs"])
+        job["outputs"] = json.loads(job["outputs"])
+        job["metrics"] = json.loads(job["metrics"]) if job["metrics"] else None
+        return job
+
+    # 文档元数据缓存
+    def get_doc_meta(self, path: Path) -> Optional[Dict[str, Any]]:
+        """读取缓存的文档元数据；文件大小或修改时间变化后视为失效"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM doc_meta WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (_normalize(path), stat.st_size, stat.st_mtime_ns)).fetchone()
+        if row is None:
+            return None
+        meta = dict(row)
+        meta["meta"] = json.loads(meta["meta"]) if meta["meta"] else {}
+        return meta
+
+    def put_doc_meta(self, path: Path, kind: Optional[str] = None, pages: Optional[int] = None,
+                     meta: Optional[Dict[str, Any]] = None, stat: Optional[os.stat_result] = None):
+        """缓存文档元数据（stat 为读取文档前的文件信息，未指定时以当前文件大小和修改时间为准）"""
+        stat = stat or os.stat(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO doc_meta (path, size, mtime_ns, kind, pages, meta, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (_normalize(path), stat.st_size, stat.st_mtime_ns, kind, pages,
+                 json.dumps(meta or {}, ensure_ascii=False), time.time()))
+
+
+def migrate_recent_files(store: HistoryStore, config) -> bool:
+    """把配置文件中的 paths.recent_files 迁移到历史库，并从配置中删除"""
+    recent = config.get("paths.recent_files")
+    if recent is None:
+        return False
+    if recent:
+        store.import_recent_files(recent)
+        logger.info(f"迁移最近文件 {len(recent)} 条到历史库")
+    config.config.get("paths", {}).pop("recent_files", None)
+    config.save()
+    return True
+
+
+# 全局历史库实例
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history() -> HistoryStore:
+    """获取历史库实例"""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = HistoryStore()
+    return _history
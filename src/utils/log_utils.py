@@ -0,0 +1,191 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(job_id)s] %(message)s'
+
+# 当前任务ID，写入每条日志
+_job_id = contextvars.ContextVar("wp_express_job_id", default=None)
+
+# 按时间轮转的间隔（秒）
+_ROTATE_INTERVALS = {"S": 1, "M": 60, "H": 3600, "D": 86400, "MIDNIGHT": 86400}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def current_job_id() -> Optional[str]:
+    """当前任务ID"""
+    return _job_id.get()
+
+
+@contextlib.contextmanager
+def job_context(job_id: str):
+    """在此范围内记录的日志都带上任务ID"""
+    token = _job_id.set(job_id)
+    try:
+        yield
+    finally:
+        _job_id.reset(token)
+
+
+class JobIdFilter(logging.Filter):
+    """为日志记录补充任务ID（需在产生日志的线程中执行）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "job_id"):
+            record.job_id = _job_id.get() or "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """结构化JSON日志格式"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "job_id": getattr(record, "job_id", "-"),
+            "module": record.module,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class SizeTimedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """按大小和时间轮转的日志文件（任一条件满足即轮转）"""
+
+    def __init__(self, filename, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                 when: str = "midnight", encoding: str = "utf-8"):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding=encoding, delay=True)
+        self.when = when.upper()
+        self.rollover_at = self._next_rollover(time.time())
+
+    def _next_rollover(self, now: float) -> float:
+        """计算下一次按时间轮转的时刻"""
+        if self.when not in _ROTATE_INTERVALS:
+            return float("inf")
+        if self.when == "MIDNIGHT":
+            local = time.localtime(now)
+            midnight = time.mktime((local.tm_year, local.tm_mon, local.tm_mday, 0, 0, 0, 0, 0, -1))
+            return midnight + 86400
+        return now + _ROTATE_INTERVALS[self.when]
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_rollover(time.time())
+
+
+class _ForwardHandler(logging.Handler):
+    """把队列中的记录交给同名记录器处理（用于接收其他进程的日志）"""
+
+    def emit(self, record: logging.LogRecord):
+        logging.getLogger(record.name).handle(record)
+
+
+def apply_levels(levels: Optional[Dict[str, str]]):
+    """按模块设置日志级别，如 {"WP_Express": "INFO", "WP_Express.server": "DEBUG"}"""
+    for name, level in (levels or {}).items():
+        logging.getLogger(name or None).setLevel(str(level).upper())
+
+
+def setup_queue_logging(log_file: Optional[Path] = None, console: bool = True, level: str = "INFO",
+                        json_format: bool = False, max_bytes: int = 10 * 1024 * 1024,
+                        backup_count: int = 5, rotate_when: str = "midnight",
+                        levels: Optional[Dict[str, str]] = None) -> logging.handlers.QueueListener:
+    """配置非阻塞日志：记录器只把日志放入队列，由后台线程写文件和控制台"""
+    global _listener
+    stop_logging()
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if log_file is not None:
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = SizeTimedRotatingFileHandler(log_file, max_bytes, backup_count, rotate_when)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if console:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        handlers.append(stream_handler)
+
+    # 无界队列：put 永远不会阻塞调用线程
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(JobIdFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(str(level).upper())
+    apply_levels(levels)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def forward_from(log_queue) -> logging.handlers.QueueListener:
+    """接收其他进程放入 log_queue 的日志，交给本进程的处理器"""
+    listener = logging.handlers.QueueListener(log_queue, _ForwardHandler())
+    listener.start()
+    return listener
+
+
+def install_worker_logging(log_queue, level: str = "INFO"):
+    """工作进程中调用：所有日志放入 log_queue 交给主进程处理"""
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(JobIdFilter())
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(str(level).upper())
+
+
+def stop_logging():
+    """停止后台日志线程并写完队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,396 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .log_utils import current_job_id, job_context
+
+# 当前线程/协程正在记录的操作
+_current_record = contextvars.ContextVar("wp_express_metrics_record", default=None)
+# 请求对下一个顶层操作做性能分析：(模式, 输出目录)
+_profile_request = contextvars.ContextVar("wp_express_profile_request", default=None)
+
+
+def peak_rss() -> int:
+    """进程自启动以来的峰值内存（高水位，字节），无法获取时返回0"""
+    try:
+        if sys.platform.startswith('win'):
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb)
+            return counters.PeakWorkingSetSize
+
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为KB，macOS 为字节
+        return usage if sys.platform == 'darwin' else usage * 1024
+    except Exception:
+        return 0
+
+
+class OperationRecord:
+    """一次操作的统计数据"""
+
+    def __init__(self, operation: str, job_id: Optional[str] = None):
+        self.operation = operation
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.started = time.time()
+        self.wall = 0.0
+        self.cpu = 0.0
+        # 进程内存高水位，以及本次操作使高水位上升了多少（之前已达到的峰值不计入）
+        self.peak_rss = 0
+        self.peak_rss_delta = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.items = 0
+        self.stages: Dict[str, float] = {}
+        self.status = "ok"
+        self.error = None
+        self.profile_path = None
+        self.children: List["OperationRecord"] = []
+
+    def attach(self, child: "OperationRecord"):
+        """挂上嵌套的子操作；子操作期间的读写和处理数计入本操作"""
+        self.children.append(child)
+        self.bytes_read += child.bytes_read
+        self.bytes_written += child.bytes_written
+        self.items += child.items
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """记录一个阶段的耗时（同名阶段累加）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def to_dict(self) -> dict:
+        """转换为字典"""
+        return {
+            "operation": self.operation,
+            "job_id": self.job_id,
+            "started": self.started,
+            "wall": round(self.wall, 6),
+            "cpu": round(self.cpu, 6),
+            "peak_rss": self.peak_rss,
+            "peak_rss_delta": self.peak_rss_delta,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "items": self.items,
+            "stages": {name: round(value, 6) for name, value in self.stages.items()},
+            "status": self.status,
+            "error": self.error,
+            "profile": self.profile_path,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "OperationRecord":
+        """从字典恢复记录（包括子操作）"""
+        record = cls(data["operation"], data.get("job_id"))
+        for key in ("started", "wall", "cpu", "peak_rss", "peak_rss_delta", "bytes_read", "bytes_written",
+                    "items", "stages", "status", "error"):
+            if key in data:
+                setattr(record, key, data[key])
+        record.profile_path = data.get("profile")
+        record.children = [cls.from_dict(child) for child in data.get("children", [])]
+        return record
+
+
+class MetricsRegistry:
+    """操作统计注册表：保留最近的记录并按操作汇总"""
+
+    def __init__(self, max_records: int = 1000):
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=max_records)
+        self._totals: Dict[tuple, dict] = {}
+        self._stage_totals: Dict[tuple, float] = {}
+        self._peak_rss = 0
+        self.json_lines_path: Optional[Path] = None
+
+    @contextlib.contextmanager
+    def track(self, operation: str, job_id: Optional[str] = None, profile: Optional[str] = None,
+              profile_dir: Optional[Path] = None):
+        """记录一次操作；profile 可选 "cprofile" 或 "pyinstrument"，仅对本次操作生效
+
+        在另一个操作内部调用时（如流水线调用处理器），记录挂到外层操作上，不单独计入汇总。
+        """
+        parent = _current_record.get()
+        if profile is None and parent is None and _profile_request.get() is not None:
+            profile, profile_dir = _profile_request.get()
+        # 没有外层任务时以本次操作作为任务，操作期间的日志都带上任务ID
+        record = OperationRecord(operation, job_id or current_job_id())
+        token = _current_record.set(record)
+        profiler = self._start_profiler(profile)
+
+        rss_start = peak_rss()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            with job_context(record.job_id):
+                yield record
+        except BaseException as e:
+            record.status = "error"
+            record.error = str(e)
+            raise
+        finally:
+            record.wall = time.perf_counter() - wall_start
+            record.cpu = time.thread_time() - cpu_start
+            record.peak_rss = peak_rss()
+            record.peak_rss_delta = max(0, record.peak_rss - rss_start)
+            if profiler is not None:
+                record.profile_path = self._stop_profiler(profile, profiler, record, profile_dir)
+            _current_record.reset(token)
+            if parent is not None:
+                parent.attach(record)
+            else:
+                self.add(record)
+
+    def add(self, record: OperationRecord):
+        """加入一条记录（也用于合并其他进程返回的记录）"""
+        with self._lock:
+            self._records.append(record)
+            key = (record.operation, record.status)
+            totals = self._totals.setdefault(key, {
+                "count": 0, "wall": 0.0, "cpu": 0.0,
+                "bytes_read": 0, "bytes_written": 0, "items": 0,
+            })
+            totals["count"] += 1
+            totals["wall"] += record.wall
+            totals["cpu"] += record.cpu
+            totals["bytes_read"] += record.bytes_read
+            totals["bytes_written"] += record.bytes_written
+            totals["items"] += record.items
+            for name, value in record.stages.items():
+                stage_key = (record.operation, name)
+                self._stage_totals[stage_key] = self._stage_totals.get(stage_key, 0.0) + value
+            self._peak_rss = max(self._peak_rss, record.peak_rss)
+
+        if self.json_lines_path is not None:
+            try:
+                with open(self.json_lines_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record.to_dict(), ensure_ascii=False) + "\n")
+            except OSError:
+                pass
+
+    def add_dict(self, data: dict):
+        """从字典恢复一条记录并加入"""
+        self.add(OperationRecord.from_dict(data))
+
+    def records(self) -> List[OperationRecord]:
+        """最近的记录"""
+        with self._lock:
+            return list(self._records)
+
+    def drain(self) -> List[dict]:
+        """取出并清空最近的记录（工作进程把记录交回主进程时使用）"""
+        with self._lock:
+            records = [record.to_dict() for record in self._records]
+            self._records.clear()
+        return records
+
+    def to_json_lines(self) -> str:
+        """导出为JSON Lines"""
+        return "".join(json.dumps(record.to_dict(), ensure_ascii=False) + "\n" for record in self.records())
+
+    def to_prometheus(self) -> str:
+        """导出为Prometheus文本格式"""
+
+        def labels(**kwargs) -> str:
+            return "{" + ",".join(f'{k}="{v}"' for k, v in kwargs.items()) + "}"
+
+        with self._lock:
+            totals = dict(self._totals)
+            stage_totals = dict(self._stage_totals)
+            peak = self._peak_rss
+
+        metrics = [
+            ("wp_express_operations_total", "counter", "处理的操作数", "count"),
+            ("wp_express_operation_wall_seconds_total", "counter", "操作累计耗时（秒）", "wall"),
+            ("wp_express_operation_cpu_seconds_total", "counter", "操作累计CPU时间（秒）", "cpu"),
+            ("wp_express_bytes_read_total", "counter", "读取的字节数", "bytes_read"),
+            ("wp_express_bytes_written_total", "counter", "写入的字节数", "bytes_written"),
+            ("wp_express_items_total", "counter", "处理的页面/元素数", "items"),
+        ]
+        lines = []
+        for name, kind, help_text, field in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (operation, status), values in sorted(totals.items()):
+                lines.append(f"{name}{labels(operation=operation, status=status)} {values[field]}")
+
+        lines.append("# HELP wp_express_stage_seconds_total 各阶段累计耗时（秒）")
+        lines.append("# TYPE wp_express_stage_seconds_total counter")
+        for (operation, stage_name), value in sorted(stage_totals.items()):
+            lines.append(f"wp_express_stage_seconds_total{labels(operation=operation, stage=stage_name)} {value}")
+
+        lines.append("# HELP wp_express_peak_rss_bytes 进程峰值内存（高水位，字节）")
+        lines.append("# TYPE wp_express_peak_rss_bytes gauge")
+        lines.append(f"wp_express_peak_rss_bytes {peak}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Path):
+        """按扩展名导出到文件（.prom 为Prometheus文本，其他为JSON Lines）"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = self.to_prometheus() if path.suffix == ".prom" else self.to_json_lines()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    @staticmethod
+    def _start_profiler(profile: Optional[str]):
+        """按需启动性能分析器"""
+        if profile == "cprofile":
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        if profile == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                return None
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        return None
+
+    @staticmethod
+    def _stop_profiler(profile: str, profiler, record: OperationRecord, profile_dir: Optional[Path]) -> str:
+        """停止分析器并保存结果"""
+        profile_dir = profile_dir or Path.home() / ".WP_Express" / "profiles"
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        if profile == "cprofile":
+            profiler.disable()
+            path = profile_dir / f"{record.operation}_{record.job_id}.prof"
+            profiler.dump_stats(str(path))
+        else:
+            profiler.stop()
+            path = profile_dir / f"{record.operation}_{record.job_id}.html"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+        return str(path)
+
+
+@contextlib.contextmanager
+def profiling(mode: str = "cprofile", profile_dir: Optional[Path] = None):
+    """在此范围内执行的顶层操作都做性能分析（"cprofile" 或 "pyinstrument"）"""
+    token = _profile_request.set((mode, profile_dir))
+    try:
+        yield
+    finally:
+        _profile_request.reset(token)
+
+
+def current_record() -> Optional[OperationRecord]:
+    """当前正在记录的操作（没有时返回None）"""
+    return _current_record.get()
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """记录当前操作的一个阶段（不在记录中时什么也不做）"""
+    record = _current_record.get()
+    if record is None:
+        yield
+    else:
+        with record.stage(name):
+            yield
+
+
+def count_read(path: Path):
+    """累计读取字节数"""
+    record = _current_record.get()
+    if record is not None:
+        try:
+            record.bytes_read += Path(path).stat().st_size
+        except OSError:
+            pass
+
+
+def count_written(path: Path):
+    """累计写入字节数"""
+    record = _current_record.get()
+    if record is not None:
+        try:
+            record.bytes_written += Path(path).stat().st_size
+        except OSError:
+            pass
+
+
+def count_items(count: int):
+    """累计处理的页面/元素数"""
+    record = _current_record.get()
+    if record is not None:
+        record.items += count
+
+
+def instrumented(operation: str):
+    """装饰器：记录处理器方法的统计数据，返回假值时标记为失败"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_metrics().track(operation) as record:
+                result = func(*args, **kwargs)
+                if not result:
+                    record.status = "failed"
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+# 全局统计实例
+_metrics_instance = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """获取统计实例"""
+    global _metrics_instance
+    if _metrics_instance is None:
+        _metrics_instance = MetricsRegistry()
+    return _metrics_instance
@@ -0,0 +1,183 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import contextlib
+import os
+import uuid
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .metrics import current_record, stage
+from .settings import performance
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+
+def _buffer_size(buffer_size: Optional[int]) -> int:
+    """写缓冲区大小，未指定时读取 performance.io_buffer_size"""
+    return buffer_size or int(performance("io_buffer_size", DEFAULT_BUFFER_SIZE))
+
+
+def temp_path_for(path: Path) -> Path:
+    """同目录下的临时文件路径（保留扩展名，供只接受文件路径的外部程序使用）"""
+    return path.with_name(f".{path.stem}.{uuid.uuid4().hex[:8]}.tmp{path.suffix}")
+
+
+def _fsync_file(path: Path):
+    """把文件内容刷到磁盘（Windows 需要可写句柄）"""
+    fd = os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_directory(directory: Path):
+    """把目录项（重命名结果）刷到磁盘；Windows 不支持打开目录，直接跳过"""
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _count_written(size: int):
+    """累计写入字节数到当前操作的统计"""
+    record = current_record()
+    if record is not None:
+        record.bytes_written += size
+
+
+def replace_atomically(temp_path: Path, path: Path, durable: bool = True):
+    """把已写完的临时文件原子地替换为最终文件"""
+    if durable:
+        with stage("fsync"):
+            _fsync_file(temp_path)
+    os.replace(temp_path, path)
+    if durable:
+        with stage("fsync"):
+            _fsync_directory(path.parent)
+
+
+@contextlib.contextmanager
+def atomic_output(path: Path, durable: bool = True, buffer_size: Optional[int] = None):
+    """原子写出单个文件：写入同目录临时文件，成功后重命名为最终文件，失败时删除临时文件"""
+    path = Path(path)
+    temp_path = temp_path_for(path)
+    try:
+        with open(temp_path, "wb", buffering=_buffer_size(buffer_size)) as f:
+            yield f
+            f.flush()
+            size = f.tell()
+        replace_atomically(temp_path, path, durable)
+        _count_written(size)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            temp_path.unlink()
+        raise
+
+
+class OutputBatch:
+    """批量原子写出：文件先写到临时文件，每 fsync_every 个文件统一重命名，并且每个目录只刷一次
+
+    只有目录刷盘是按批进行的，文件内容的 fsync 没有合并（这是有意的取舍：
+    重命名前内容必须落盘，否则断电后可能留下空文件）。因此 durable 为 True 时，
+    写出 N 个文件仍要 N 次文件 fsync，另加每批每个目录一次目录 fsync，
+    刷盘开销随文件数增长，不是每批固定一次。
+    通过 open 写出的文件在关闭前用已打开的句柄 fsync，
+    add_file 加入的外部文件在提交时重新打开后 fsync。
+    """
+
+    def __init__(self, fsync_every: Optional[int] = None, durable: bool = True, buffer_size: Optional[int] = None):
+        self.fsync_every = max(1, fsync_every or int(performance("fsync_every", 64)))
+        self.durable = durable
+        self.buffer_size = _buffer_size(buffer_size)
+        # (临时文件, 最终文件, 大小, 内容是否已刷盘)
+        self._pending: List[Tuple[Path, Path, int, bool]] = []
+        self.committed: List[Path] = []
+
+    @contextlib.contextmanager
+    def open(self, path: Path):
+        """写出一个文件，内容在提交时才出现在最终路径"""
+        path = Path(path)
+        temp_path = temp_path_for(path)
+        try:
+            with open(temp_path, "wb", buffering=self.buffer_size) as f:
+                yield f
+                f.flush()
+                size = f.tell()
+                if self.durable:
+                    with stage("fsync"):
+                        os.fsync(f.fileno())
+        except BaseException:
+            with contextlib.suppress(OSError):
+                temp_path.unlink()
+            raise
+
+        self._pending.append((temp_path, path, size, self.durable))
+        if len(self._pending) >= self.fsync_every:
+            self.commit()
+
+    def add_file(self, temp_path: Path, path: Path):
+        """加入由外部程序写好的临时文件（见 temp_path_for）"""
+        self._pending.append((temp_path, path, temp_path.stat().st_size, False))
+        if len(self._pending) >= self.fsync_every:
+            self.commit()
+
+    def commit(self):
+        """提交已写完的文件"""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        if self.durable:
+            with stage("fsync"):
+                for temp_path, _, _, synced in pending:
+                    if not synced:
+                        _fsync_file(temp_path)
+
+        directories = set()
+        for temp_path, path, size, _ in pending:
+            os.replace(temp_path, path)
+            directories.add(path.parent)
+            self.committed.append(path)
+            _count_written(size)
+
+        if self.durable:
+            with stage("fsync"):
+                for directory in directories:
+                    _fsync_directory(directory)
+
+    def discard(self):
+        """丢弃尚未提交的文件"""
+        pending, self._pending = self._pending, []
+        for temp_path, _, _, _ in pending:
+            with contextlib.suppress(OSError):
+                temp_path.unlink()
+
+    def __enter__(self) -> "OutputBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 出错时尚未提交的文件一并丢弃，不留下半成品
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
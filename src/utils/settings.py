@@ -0,0 +1,68 @@
+"""
+WP快通（文档处理）软件
+Copyright [2026] [郭宇轩]
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+from typing import Any, Callable
+
+
+def _get_config():
+    """获取全局配置；在没有配置模块的环境中（如单独导入 src）返回 None"""
+    try:
+        from config import get_config
+    except ImportError:
+        return None
+    return get_config()
+
+
+def get_setting(key: str, default: Any = None) -> Any:
+    """读取配置项，配置不可用或未设置时返回默认值（配置文件修改后自动生效）"""
+    config = _get_config()
+    if config is None:
+        return default
+    return config.get(key, default)
+
+
+def performance(key: str, default: Any = None) -> Any:
+    """读取 performance 配置项"""
+    return get_setting(f"performance.{key}", default)
+
+
+def worker_count(operation: str, default: int) -> int:
+    """某类操作的并发数：先看 workers.<operation>，再看 workers.default，都未设置时使用 default"""
+    for key in (f"workers.{operation}", "workers.default"):
+        try:
+            value = int(performance(key, 0) or 0)
+        except (TypeError, ValueError):
+            value = 0
+        if value > 0:
+            return value
+    return max(1, default)
+
+
+def default_workers() -> int:
+    """CPU 密集任务的默认并发数"""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def on_change(callback: Callable[[Any], None]) -> bool:
+    """配置文件重新加载后回调，返回是否注册成功"""
+    config = _get_config()
+    if config is None:
+        return False
+    config.add_listener(callback)
+    config.start_watching()
+    return True
@@ -15,8 +15,14 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import os
 import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .settings import worker_count
 
 
 def validate_file_path(path: Path, must_exist: bool = True) -> tuple:
@@ -61,6 +67,181 @@ def validate_directory_path(path: Path, must_exist: bool = True) -> tuple:
         return False, f"路径无效: {e}"
 
 
+# 批量验证的结果代码
+OK = "ok"
+EMPTY = "empty"
+INVALID = "invalid"
+NOT_FOUND = "not_found"
+PARENT_NOT_FOUND = "parent_not_found"
+NOT_A_FILE = "not_a_file"
+NOT_A_DIRECTORY = "not_a_directory"
+UNREADABLE = "unreadable"
+TYPE_MISMATCH = "type_mismatch"
+
+MESSAGES = {
+    OK: "验证通过",
+    EMPTY: "路径不能为空",
+    INVALID: "路径无效",
+    NOT_FOUND: "文件不存在",
+    PARENT_NOT_FOUND: "父目录不存在",
+    NOT_A_FILE: "路径不是文件",
+    NOT_A_DIRECTORY: "路径不是目录",
+    UNREADABLE: "文件无法读取",
+    TYPE_MISMATCH: "文件内容与类型不符",
+}
+
+# 扩展名对应的文件类型
+FILE_TYPES = {".pdf": "pdf", ".docx": "docx"}
+
+# 同一目录下待验证的路径少于该数量时逐个 stat，否则整体扫描一次目录
+_SCAN_THRESHOLD = 16
+
+
+class PathCheck:
+    """单个路径的验证结果"""
+
+    __slots__ = ("path", "code", "detected")
+
+    def __init__(self, path, code: str = OK, detected: Optional[str] = None):
+        self.path = path
+        self.code = code
+        self.detected = detected
+
+    @property
+    def ok(self) -> bool:
+        return self.code == OK
+
+    @property
+    def message(self) -> str:
+        return MESSAGES.get(self.code, self.code)
+
+    def __repr__(self) -> str:
+        return f"PathCheck({str(self.path)!r}, {self.code})"
+
+
+def sniff_file_type(path: Path) -> Optional[str]:
+    """根据文件头判断类型：pdf、docx、zip，无法识别时返回 None"""
+    with open(path, 'rb') as f:
+        header = f.read(1024)
+        if header.startswith(b"%PDF-"):
+            return "pdf"
+        if not header.startswith(b"PK\x03\x04"):
+            # PDF 规范允许文件头前有少量垃圾字节
+            return "pdf" if b"%PDF-" in header else None
+
+        # Office 文档通常把 [Content_Types].xml 作为第一个条目，先看本地文件头
+        name_len = int.from_bytes(header[26:28], "little")
+        if header[30:30 + name_len] == b"[Content_Types].xml":
+            return "docx"
+        f.seek(0)
+        try:
+            with zipfile.ZipFile(f) as archive:
+                archive.getinfo("[Content_Types].xml")
+            return "docx"
+        except (KeyError, zipfile.BadZipFile):
+            return "zip"
+
+
+def _list_directory(directory: str) -> Optional[Dict[str, os.DirEntry]]:
+    """扫描目录，返回 {规范化文件名: DirEntry}；目录不存在时返回 None"""
+    try:
+        with os.scandir(directory) as it:
+            return {os.path.normcase(entry.name): entry for entry in it}
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def _lookup(directory: str, names: List[str]) -> Optional[Dict[str, Optional[str]]]:
+    """查询目录中的若干名字，返回 {规范化文件名: "file" / "dir" / None}；目录不存在时返回 None"""
+    if len(names) < _SCAN_THRESHOLD:
+        if not os.path.isdir(directory):
+            return None
+        kinds = {}
+        for name in names:
+            full = os.path.join(directory, name)
+            kinds[os.path.normcase(name)] = "dir" if os.path.isdir(full) else "file" if os.path.exists(full) else None
+        return kinds
+
+    entries = _list_directory(directory)
+    if entries is None:
+        return None
+    kinds = {}
+    for name in names:
+        entry = entries.get(os.path.normcase(name))
+        if entry is None:
+            kinds[os.path.normcase(name)] = None
+        else:
+            kinds[os.path.normcase(name)] = "dir" if entry.is_dir() else "file"
+    return kinds
+
+
+def _sniff_check(check: PathCheck, expected: str) -> PathCheck:
+    """读取文件头并与期望类型比较"""
+    try:
+        check.detected = sniff_file_type(Path(check.path))
+    except OSError:
+        check.code = UNREADABLE
+        return check
+    if check.detected != expected:
+        check.code = TYPE_MISMATCH
+    return check
+
+
+def validate_paths(paths: Iterable[Path], must_exist: bool = True, kind: str = "file",
+                   expected_type: Optional[str] = None, sniff: bool = True,
+                   workers: Optional[int] = None) -> List[PathCheck]:
+    """批量验证路径，按父目录分组，每个目录只检查一次，结果顺序与输入一致
+
+    kind 为 "file" 或 "directory"；expected_type 为 "pdf" / "docx"，不指定时按扩展名推断，
+    sniff 为真时读取文件头，内容与类型不符的文件返回 TYPE_MISMATCH。
+    """
+    results: List[PathCheck] = []
+    groups: Dict[str, List[PathCheck]] = {}
+    for path in paths:
+        check = PathCheck(path)
+        results.append(check)
+        if not path or str(path).strip() == "":
+            check.code = EMPTY
+            continue
+        try:
+            full = os.path.abspath(path)
+        except (TypeError, ValueError):
+            check.code = INVALID
+            continue
+        groups.setdefault(os.path.dirname(full), []).append(check)
+
+    to_sniff = []
+    for directory, checks in groups.items():
+        names = [os.path.basename(os.path.abspath(check.path)) for check in checks]
+        kinds = _lookup(directory, names)
+        for check, name in zip(checks, names):
+            found = kinds.get(os.path.normcase(name)) if kinds is not None else None
+            if kinds is None:
+                check.code = PARENT_NOT_FOUND if not must_exist else NOT_FOUND
+            elif found is None:
+                if must_exist:
+                    check.code = NOT_FOUND
+            elif kind == "file" and found != "file":
+                check.code = NOT_A_FILE
+            elif kind == "directory" and found != "dir":
+                check.code = NOT_A_DIRECTORY
+            elif kind == "file" and sniff:
+                expected = expected_type or FILE_TYPES.get(Path(name).suffix.lower())
+                if expected:
+                    to_sniff.append((check, expected))
+
+    # 读取文件头是小块随机读，交给线程池并发完成
+    workers = workers or worker_count("validate", 8)
+    if workers > 1 and len(to_sniff) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(to_sniff))) as executor:
+            list(executor.map(lambda item: _sniff_check(*item), to_sniff))
+    else:
+        for check, expected in to_sniff:
+            _sniff_check(check, expected)
+
+    return results
+
+
 def validate_file_name(name: str) -> tuple:
     """验证文件名"""
     if not name or name.strip() == "":